@@ -1,10 +1,27 @@
 from fastapi import FastAPI, HTTPException, Request
 from pydantic import BaseModel
-import requests
+from typing import Optional
+import httpx
+import asyncio
+import time
+import uuid
 import os
 import json
 import hmac
 import hashlib
+import heapq
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from chromadb import HttpClient
+from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("companion")
 
 SHARED_SECRET=bytes.fromhex("43dcfe2513f76b10cd10a9ac3d82cfbb281eeba7038615238a2f46c4c9661d2a")
 app = FastAPI()
@@ -12,7 +29,8 @@ app = FastAPI()
 class BeaconRequest(BaseModel):
     note: str = ""
 
-# List of Rune endpoints (use localhost ports!)
+# Runes known at deploy time (use localhost ports!). These are always in the
+# registry; any other Rune registers itself through /runes/register
 RUNES = {
     "Rune00": "http://localhost:6000",
     "Rune0A": "http://localhost:6001",
@@ -20,32 +38,274 @@ RUNES = {
     "Rune0C": "http://localhost:6003",
     "Rune0D": "http://localhost:6004",
 }
+# Static Runes that serve /responses and watch their inbox; a self-registered
+# Rune says so itself with accepts_responses
+RESPONSE_RUNES = {"Rune00"}
+
+# Per-rune request timeout, and the overall budget for one heartbeat fan-out
+HEARTBEAT_TIMEOUT = float(os.getenv("HEARTBEAT_TIMEOUT", "2"))
+HEARTBEAT_DEADLINE = float(os.getenv("HEARTBEAT_DEADLINE", "2.5"))
+
+# How often the background poller refreshes the liveness registry
+HEARTBEAT_POLL_INTERVAL = float(os.getenv("HEARTBEAT_POLL_INTERVAL", "10"))
+
+# Pooled client shared by every outbound request to the Runes
+http_client = None
+
+# Last known liveness of each Rune, maintained by the background poller
+rune_liveness = {}
+# When each Rune was last checked (epoch seconds), for staleness reporting
+liveness_checked_at = {}
+heartbeat_poller_task = None
+
+# How long a self-registered Rune stays listed without a successful heartbeat
+RUNE_LEASE_SECONDS = float(os.getenv("RUNE_LEASE_SECONDS", "60"))
+
+# Live Rune registry: rune id -> {"url", "lease_seconds", "expires_at", "registered_at",
+# "accepts_responses"}. Static Runes have no lease and never expire
+rune_registry = {
+    rune: {"url": url, "lease_seconds": None, "expires_at": None, "registered_at": None,
+           "accepts_responses": rune in RESPONSE_RUNES}
+    for rune, url in RUNES.items()
+}
+# Guards rune_registry, rune_liveness and liveness_checked_at: sync endpoints
+# change them from the threadpool while the event loop reads and expires them
+registry_lock = threading.Lock()
 
 # Path where Companion stores optional human responses to Runes
-RESPONSES_DIR = "/responses"
+RESPONSES_DIR = os.getenv("RESPONSES_DIR", "/responses")
 
 # Ensure response folder exists
 os.makedirs(RESPONSES_DIR, exist_ok=True)
 
+# ChromaDB holding every Rune's memory_<rune> collection
+CHROMADB_HOST = os.getenv("CHROMADB_HOST", "localhost")
+CHROMADB_PORT = int(os.getenv("CHROMADB_PORT", "8001"))
+# Budget for one federated search across all collections, and how long the
+# list of Rune collections is reused before asking ChromaDB again
+FEDERATED_SEARCH_DEADLINE = float(os.getenv("FEDERATED_SEARCH_DEADLINE", "3"))
+COLLECTION_LIST_TTL = float(os.getenv("COLLECTION_LIST_TTL", "30"))
+# Federated searches run their blocking ChromaDB calls on their own bounded pool:
+# a query that misses the deadline keeps running, but it can only tie up these
+# workers, never the default executor other to_thread work depends on
+FEDERATED_SEARCH_WORKERS = int(os.getenv("FEDERATED_SEARCH_WORKERS", "8"))
+search_executor = ThreadPoolExecutor(max_workers=FEDERATED_SEARCH_WORKERS, thread_name_prefix="federated-search")
+
+# One pooled ChromaDB client and embedding model shared by every search. Startup
+# and the search workers may both create them, so creation is serialized
+memory_client = None
+embedding_function = None
+memory_client_lock = threading.Lock()
+memory_collections = {"collections": {}, "listed_at": 0.0}
+
+# Timeout for pushing a response straight to a Rune before falling back to its inbox
+RESPONSE_PUSH_TIMEOUT = float(os.getenv("RESPONSE_PUSH_TIMEOUT", "2"))
+
 class ResponseMessage(BaseModel):
     message: str
 
-@app.get("/heartbeat")
-def check_heartbeats():
+class RuneRegistration(BaseModel):
+    rune_id: str
+    url: str
+    lease_seconds: Optional[float] = None
+    accepts_responses: bool = False
+
+def live_runes():
+    """
+    Expire lapsed leases and return the live registry as rune id -> base URL.
     """
-    Check heartbeat of all Runes and report their status.
+    now = time.time()
+    with registry_lock:
+        for rune, entry in list(rune_registry.items()):
+            if entry["expires_at"] is not None and entry["expires_at"] < now:
+                del rune_registry[rune]
+                rune_liveness.pop(rune, None)
+                liveness_checked_at.pop(rune, None)
+        return {rune: entry["url"] for rune, entry in rune_registry.items()}
+
+def renew_lease(rune, now=None):
+    """
+    Push a self-registered Rune's lease expiry forward (caller holds registry_lock).
+    """
+    entry = rune_registry.get(rune)
+    if entry is not None and entry["lease_seconds"] is not None:
+        entry["expires_at"] = (now or time.time()) + entry["lease_seconds"]
+
+@app.post("/runes/register")
+def register_rune(registration: RuneRegistration):
+    """
+    Register a Rune (or renew its lease) so fan-out endpoints include it.
+    """
+    with registry_lock:
+        entry = rune_registry.get(registration.rune_id)
+        if entry is not None and entry["lease_seconds"] is None:
+            # Static Runes keep their permanent entry; only the URL and capabilities can move
+            entry["url"] = registration.url
+            entry["accepts_responses"] = registration.accepts_responses or registration.rune_id in RESPONSE_RUNES
+            return {"status": "registered", "rune": registration.rune_id, "lease_seconds": None}
+
+        lease_seconds = registration.lease_seconds or RUNE_LEASE_SECONDS
+        rune_registry[registration.rune_id] = {
+            "url": registration.url,
+            "lease_seconds": lease_seconds,
+            "expires_at": time.time() + lease_seconds,
+            "registered_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "accepts_responses": registration.accepts_responses
+        }
+    return {"status": "registered", "rune": registration.rune_id, "lease_seconds": lease_seconds}
+
+@app.delete("/runes/{rune_id}")
+def deregister_rune(rune_id: str):
     """
+    Remove a Rune from the registry.
+    """
+    with registry_lock:
+        if rune_registry.pop(rune_id, None) is None:
+            raise HTTPException(status_code=404, detail=f"Unknown rune: {rune_id}")
+        rune_liveness.pop(rune_id, None)
+        liveness_checked_at.pop(rune_id, None)
+    return {"status": "deregistered", "rune": rune_id}
+
+@app.get("/runes")
+def list_runes():
+    """
+    List the Runes currently in the registry.
+    """
+    live_runes()
+    now = time.time()
+    with registry_lock:
+        return {
+            rune: {
+                "url": entry["url"],
+                "registered_at": entry["registered_at"],
+                "accepts_responses": entry["accepts_responses"],
+                "lease_remaining": None if entry["expires_at"] is None else round(entry["expires_at"] - now, 1)
+            }
+            for rune, entry in rune_registry.items()
+        }
+
+@app.on_event("startup")
+async def open_http_client():
+    """
+    Create the pooled HTTP client used to talk to the Runes and start the heartbeat poller.
+    """
+    global http_client, heartbeat_poller_task
+    http_client = httpx.AsyncClient(
+        timeout=HEARTBEAT_TIMEOUT,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+    )
+    try:
+        await asyncio.to_thread(get_memory_client)
+    except Exception as e:
+        logger.warning(f"[Companion] ChromaDB not reachable yet: {e}")
+    heartbeat_poller_task = asyncio.create_task(heartbeat_poller())
+
+@app.on_event("shutdown")
+async def close_http_client():
+    """
+    Stop the heartbeat poller and close the pooled HTTP client.
+    """
+    if heartbeat_poller_task is not None:
+        heartbeat_poller_task.cancel()
+    if http_client is not None:
+        await http_client.aclose()
+    search_executor.shutdown(wait=False, cancel_futures=True)
+
+async def fetch_heartbeat(url):
+    """
+    Check a single Rune's heartbeat, timing the round trip.
+    """
+    start = time.monotonic()
+    try:
+        response = await http_client.get(f"{url}/heartbeat")
+        latency_ms = round((time.monotonic() - start) * 1000, 1)
+        if response.status_code == 200:
+            data = response.json()
+            return {"status": "present", "id": data.get("rune", "unknown"), "latency_ms": latency_ms}
+        return {"status": "error", "id": "unknown", "latency_ms": latency_ms}
+    except Exception:
+        latency_ms = round((time.monotonic() - start) * 1000, 1)
+        return {"status": "unreachable", "id": "unknown", "latency_ms": latency_ms}
+
+async def poll_heartbeats(runes):
+    """
+    Check every Rune concurrently, reporting whatever finished within the deadline.
+    """
+    tasks = {rune: asyncio.create_task(fetch_heartbeat(url)) for rune, url in runes.items()}
+    if not tasks:
+        return {}
+
+    done, pending = await asyncio.wait(tasks.values(), timeout=HEARTBEAT_DEADLINE)
+    for task in pending:
+        task.cancel()
+
     status_report = {}
-    for rune, url in RUNES.items():
-        try:
-            response = requests.get(f"{url}/heartbeat", timeout=2)
-            if response.status_code == 200:
-                data = response.json()
-                status_report[rune] = {"status": "present", "id": data.get("rune", "unknown")}
+    for rune, task in tasks.items():
+        if task in done:
+            status_report[rune] = task.result()
+        else:
+            status_report[rune] = {"status": "timeout", "id": "unknown", "latency_ms": None}
+    return status_report
+
+def update_liveness(status_report):
+    """
+    Fold one round of heartbeat results into the liveness registry.
+    """
+    now = time.time()
+    checked = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(now))
+    with registry_lock:
+        for rune, result in status_report.items():
+            if rune not in rune_registry:
+                continue
+            entry = rune_liveness.setdefault(rune, {"last_seen": None, "consecutive_failures": 0})
+            entry["status"] = result["status"]
+            entry["id"] = result["id"]
+            entry["last_latency_ms"] = result["latency_ms"]
+            entry["last_checked"] = checked
+            if result["status"] == "present":
+                entry["last_seen"] = checked
+                entry["consecutive_failures"] = 0
+                # A Rune that answers its heartbeat keeps its registration alive
+                renew_lease(rune, now)
             else:
-                status_report[rune] = {"status": "error", "id": "unknown"}
+                entry["consecutive_failures"] += 1
+            liveness_checked_at[rune] = now
+
+async def heartbeat_poller():
+    """
+    Keep the liveness registry fresh so /heartbeat never has to fan out itself.
+    """
+    while True:
+        try:
+            update_liveness(await poll_heartbeats(live_runes()))
         except Exception as e:
-            status_report[rune] = {"status": "unreachable", "id": "unknown"}
+            logger.error(f"[Companion] Heartbeat poll failed: {e}")
+        await asyncio.sleep(HEARTBEAT_POLL_INTERVAL)
+
+@app.get("/heartbeat")
+async def check_heartbeats(live: bool = False):
+    """
+    Report the status of all Runes from the liveness registry.
+    Pass live=true to poll every Rune right now instead.
+    """
+    runes = live_runes()
+    if live:
+        update_liveness(await poll_heartbeats(runes))
+
+    now = time.time()
+    status_report = {}
+    with registry_lock:
+        for rune in runes:
+            if rune not in rune_liveness:
+                status_report[rune] = {"status": "unknown", "id": "unknown", "stale": True, "age_seconds": None}
+                continue
+            age = now - liveness_checked_at[rune]
+            status_report[rune] = {
+                **rune_liveness[rune],
+                "age_seconds": round(age, 1),
+                # Older than two poll intervals means the poller has fallen behind
+                "stale": age > 2 * HEARTBEAT_POLL_INTERVAL
+            }
     return status_report
 
 @app.get("/beacons")
@@ -54,7 +314,7 @@ def check_beacons():
     Check if any Rune has raised a beacon asking for help.
     """
     beacon_report = {}
-    for rune in RUNES.keys():
+    for rune in live_runes():
         beacon_file = f"/data/{rune.lower()}/beacon.json"
         if os.path.exists(beacon_file):
             with open(beacon_file, "r") as f:
@@ -67,33 +327,195 @@ def check_beacons():
             beacon_report[rune] = {"beacon": False, "note": ""}
     return beacon_report
 
+def drop_response_file(rune_id, payload):
+    """
+    Save a response in the Rune's inbox (/responses/<rune id>/) for its watcher to pick up.
+    The file is renamed into place so the watcher only ever sees complete files.
+    """
+    inbox_dir = os.path.join(RESPONSES_DIR, rune_id.lower())
+    os.makedirs(inbox_dir, exist_ok=True)
+
+    file_name = f"{time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())}-{uuid.uuid4().hex[:8]}.json"
+    tmp_path = os.path.join(inbox_dir, f".{file_name}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(payload, f, indent=2)
+    os.replace(tmp_path, os.path.join(inbox_dir, file_name))
+    return file_name
+
+async def push_response(url, payload):
+    """
+    Deliver a response straight to a Rune's /responses endpoint.
+    """
+    response = await http_client.post(f"{url}/responses", json=payload, timeout=RESPONSE_PUSH_TIMEOUT)
+    response.raise_for_status()
+    result = response.json()
+    if result.get("status") != "received":
+        raise RuntimeError(f"Rune did not accept the response: {result}")
+
 @app.post("/respond/{rune_id}")
-def respond_to_beacon(rune_id: str, response: ResponseMessage):
+async def respond_to_beacon(rune_id: str, response: ResponseMessage):
     """
-    Save a response message for a specific Rune to read later.
+    Send a response message to a specific Rune.
+    The response is pushed to the Rune directly; if it cannot be reached the
+    message is saved to its inbox for the Rune to read later. Runes that
+    neither serve /responses nor watch an inbox are refused.
     """
-    filepath = os.path.join(RESPONSES_DIR, f"{rune_id}.json")
-    with open(filepath, "w") as f:
-        json.dump({"message": response.message}, f, indent=2)
-    return {"status": "saved", "rune": rune_id}
-import requests
+    payload = {
+        "message": response.message,
+        "rune_id": rune_id,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    }
 
-@app.get("/memories")
-def get_memories():
-    try:
-        query_payload = {
-            "collection_name": "memory",
-            "query_texts": ["*"],
-            "n_results": 10
+    live_runes()
+    with registry_lock:
+        entry = next((dict(entry) for rune, entry in rune_registry.items() if rune.lower() == rune_id.lower()), None)
+    if entry is not None and not entry["accepts_responses"]:
+        raise HTTPException(status_code=409, detail=f"{rune_id} does not accept responses")
+
+    url = entry["url"] if entry is not None else None
+    push_error = "rune is not registered"
+    if url is not None:
+        start = time.monotonic()
+        try:
+            await push_response(url, payload)
+            latency_ms = round((time.monotonic() - start) * 1000, 1)
+            return {"status": "delivered", "rune": rune_id, "delivery": "push", "latency_ms": latency_ms}
+        except Exception as e:
+            push_error = str(e) or type(e).__name__
+
+    file_name = await asyncio.to_thread(drop_response_file, rune_id, payload)
+    return {"status": "saved", "rune": rune_id, "delivery": "file", "file": file_name, "push_error": push_error}
+
+def get_memory_client():
+    """
+    Get the shared ChromaDB client, connecting on first use.
+    """
+    global memory_client, embedding_function
+    with memory_client_lock:
+        if memory_client is None:
+            memory_client = HttpClient(host=CHROMADB_HOST, port=CHROMADB_PORT)
+        if embedding_function is None:
+            embedding_function = DefaultEmbeddingFunction()
+        return memory_client
+
+def embed_query(query):
+    """
+    Embed a search query with the shared embedding model.
+    """
+    get_memory_client()
+    return embedding_function([query])[0]
+
+def list_memory_collections():
+    """
+    Get every Rune memory collection (memory_<rune>), cached for COLLECTION_LIST_TTL.
+    """
+    now = time.monotonic()
+    if now - memory_collections["listed_at"] > COLLECTION_LIST_TTL:
+        client = get_memory_client()
+        collections = {}
+        for collection in client.list_collections():
+            name = collection if isinstance(collection, str) else collection.name
+            if name.startswith("memory_"):
+                collections[name] = client.get_collection(name)
+        memory_collections["collections"] = collections
+        memory_collections["listed_at"] = now
+    return memory_collections["collections"]
+
+def query_collection(collection, query_embedding, n_results, where):
+    """
+    Query one Rune's collection with an already computed query embedding.
+    """
+    query_args = {
+        "query_embeddings": [query_embedding],
+        "n_results": n_results,
+        "include": ["documents", "metadatas", "distances"]
+    }
+    if where:
+        query_args["where"] = where
+    return collection.query(**query_args)
+
+async def federated_search(query, n_results=10, where=None):
+    """
+    Search every Rune's memories at once and merge the closest hits.
+    The query is embedded once and sent to all collections concurrently;
+    collections that miss the deadline are reported and left out. The
+    deadline covers listing the collections and embedding the query too.
+    """
+    start = time.monotonic()
+    deadline = start + FEDERATED_SEARCH_DEADLINE
+    loop = asyncio.get_running_loop()
+
+    listing = loop.run_in_executor(search_executor, list_memory_collections)
+    embedding = loop.run_in_executor(search_executor, embed_query, query)
+    done, pending = await asyncio.wait([listing, embedding], timeout=FEDERATED_SEARCH_DEADLINE)
+    for task in pending:
+        task.cancel()
+    if pending:
+        return {
+            "query": query,
+            "results": [],
+            "collections": {},
+            "error": "ChromaDB did not list collections and embed the query within the deadline",
+            "elapsed_ms": round((time.monotonic() - start) * 1000, 1)
         }
-        response = requests.post("http://localhost:8000/api/v2/query", json=query_payload)
-        
-        if response.status_code == 200:
-            results = response.json()
-            documents = results.get("documents", [[]])[0]
-            return {"memories": documents}
-        else:
-            return {"error": f"Failed to fetch memories: {response.status_code}"}
+    collections, query_embedding = listing.result(), embedding.result()
+
+    tasks = {
+        name: loop.run_in_executor(search_executor, query_collection, collection, query_embedding, n_results, where)
+        for name, collection in collections.items()
+    }
+    remaining = max(0.0, deadline - time.monotonic())
+    done, pending = (await asyncio.wait(tasks.values(), timeout=remaining)) if tasks else (set(), set())
+    for task in pending:
+        task.cancel()
+
+    hits = []
+    collection_status = {}
+    for name, task in tasks.items():
+        if task not in done:
+            collection_status[name] = "timeout"
+            continue
+        if task.exception() is not None:
+            collection_status[name] = f"error: {task.exception()}"
+            continue
+
+        results = task.result()
+        collection_status[name] = "ok"
+        for i, memory_id in enumerate(results["ids"][0]):
+            metadata = results["metadatas"][0][i] or {}
+            hits.append({
+                "rune_id": metadata.get("rune_id", name[len("memory_"):]),
+                "collection": name,
+                "id": memory_id,
+                "document": results["documents"][0][i],
+                "metadata": metadata,
+                "distance": results["distances"][0][i]
+            })
+
+    return {
+        "query": query,
+        "results": heapq.nsmallest(n_results, hits, key=lambda hit: hit["distance"]),
+        "collections": collection_status,
+        "elapsed_ms": round((time.monotonic() - start) * 1000, 1)
+    }
+
+@app.get("/memories/search")
+async def search_all_memories(query: str, limit: int = 10, type: str = None):
+    """
+    Search the memories of every Rune and return the closest matches, attributed to their Rune.
+    """
+    try:
+        return await federated_search(query, n_results=limit, where={"type": type} if type else None)
     except Exception as e:
         return {"error": str(e)}
 
+@app.get("/memories")
+async def get_memories(query: str = "*", limit: int = 10):
+    """
+    Return the documents of the closest memories across all Runes.
+    """
+    try:
+        results = await federated_search(query, n_results=limit)
+        return {"memories": [hit["document"] for hit in results["results"]]}
+    except Exception as e:
+        return {"error": str(e)}
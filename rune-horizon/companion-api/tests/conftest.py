@@ -0,0 +1,20 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Keep the response inboxes of the module under test out of /responses
+os.environ.setdefault("RESPONSES_DIR", tempfile.mkdtemp(prefix="companion-test-"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """A registry of its own, starting from the static Runes, with no liveness recorded yet"""
+    monkeypatch.setattr(main, "rune_registry", {rune: dict(entry) for rune, entry in main.rune_registry.items()})
+    monkeypatch.setattr(main, "rune_liveness", {})
+    monkeypatch.setattr(main, "liveness_checked_at", {})
+    return main.rune_registry
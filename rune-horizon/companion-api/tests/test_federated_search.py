@@ -0,0 +1,97 @@
+import asyncio
+import threading
+import time
+
+import main
+
+
+class _Collection:
+    """Stands in for one Rune's ChromaDB collection"""
+
+    def __init__(self, hits=(), delay=0.0, error=None):
+        self.hits = hits
+        self.delay = delay
+        self.error = error
+
+    def query(self, **kwargs):
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return {
+            "ids": [[memory_id for memory_id, _ in self.hits]],
+            "documents": [[f"doc {memory_id}" for memory_id, _ in self.hits]],
+            "metadatas": [[{"rune_id": "rune"} for _ in self.hits]],
+            "distances": [[distance for _, distance in self.hits]],
+        }
+
+
+def _search(monkeypatch, collections, deadline=0.5, list_delay=0.0):
+    def list_collections():
+        time.sleep(list_delay)
+        return collections
+
+    monkeypatch.setattr(main, "FEDERATED_SEARCH_DEADLINE", deadline)
+    monkeypatch.setattr(main, "list_memory_collections", list_collections)
+    monkeypatch.setattr(main, "embed_query", lambda query: [1.0, 0.0])
+    return asyncio.run(main.federated_search("cats", n_results=3))
+
+
+def test_hits_from_every_collection_are_merged_by_distance(monkeypatch):
+    result = _search(monkeypatch, {
+        "memory_a": _Collection([("a1", 0.3), ("a2", 0.9)]),
+        "memory_b": _Collection([("b1", 0.1), ("b2", 0.5)]),
+    })
+
+    assert [hit["id"] for hit in result["results"]] == ["b1", "a1", "b2"]
+    assert [hit["collection"] for hit in result["results"]] == ["memory_b", "memory_a", "memory_b"]
+    assert result["collections"] == {"memory_a": "ok", "memory_b": "ok"}
+
+
+def test_slow_and_failing_collections_leave_partial_results(monkeypatch):
+    started = time.monotonic()
+    result = _search(monkeypatch, {
+        "memory_fast": _Collection([("f1", 0.2)]),
+        "memory_slow": _Collection([("s1", 0.1)], delay=2.0),
+        "memory_broken": _Collection(error=RuntimeError("boom")),
+    }, deadline=0.3)
+
+    assert time.monotonic() - started < 1.5
+    assert [hit["id"] for hit in result["results"]] == ["f1"]
+    assert result["collections"]["memory_slow"] == "timeout"
+    assert result["collections"]["memory_broken"] == "error: boom"
+
+
+def test_deadline_covers_listing_the_collections(monkeypatch):
+    started = time.monotonic()
+    result = _search(monkeypatch, {"memory_a": _Collection([("a1", 0.3)])}, deadline=0.2, list_delay=2.0)
+
+    assert time.monotonic() - started < 1.5
+    assert result["results"] == [] and "error" in result
+
+
+def test_deadline_is_shared_by_listing_and_querying(monkeypatch):
+    started = time.monotonic()
+    result = _search(monkeypatch, {"memory_a": _Collection([("a1", 0.3)], delay=0.3)}, deadline=0.5, list_delay=0.3)
+
+    assert time.monotonic() - started < 0.9
+    assert result["collections"] == {"memory_a": "timeout"}
+
+
+def test_concurrent_callers_share_one_client(monkeypatch):
+    created = []
+
+    def slow_client(**kwargs):
+        time.sleep(0.05)
+        created.append(kwargs)
+        return object()
+
+    monkeypatch.setattr(main, "memory_client", None)
+    monkeypatch.setattr(main, "embedding_function", object())
+    monkeypatch.setattr(main, "HttpClient", slow_client)
+    threads = [threading.Thread(target=main.get_memory_client) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(created) == 1
@@ -0,0 +1,53 @@
+import asyncio
+
+import main
+
+
+def _result(status):
+    return {"status": status, "id": "unknown", "latency_ms": 1.0}
+
+
+def test_slow_runes_are_reported_as_timed_out(monkeypatch):
+    async def fetch(url):
+        await asyncio.sleep(5 if url == "http://slow" else 0)
+        return _result("present")
+
+    monkeypatch.setattr(main, "fetch_heartbeat", fetch)
+    monkeypatch.setattr(main, "HEARTBEAT_DEADLINE", 0.1)
+    report = asyncio.run(main.poll_heartbeats({"Fast": "http://fast", "Slow": "http://slow"}))
+
+    assert report["Fast"]["status"] == "present"
+    assert report["Slow"] == {"status": "timeout", "id": "unknown", "latency_ms": None}
+
+
+def test_heartbeat_answers_from_the_liveness_registry(registry, monkeypatch):
+    main.update_liveness({"Rune00": _result("present"), "Rune0A": _result("unreachable")})
+
+    async def no_poll(runes):
+        raise AssertionError("/heartbeat must not poll the runes itself")
+
+    monkeypatch.setattr(main, "poll_heartbeats", no_poll)
+    report = asyncio.run(main.check_heartbeats())
+
+    assert report["Rune00"]["status"] == "present" and not report["Rune00"]["stale"]
+    assert report["Rune0A"]["consecutive_failures"] == 1 and report["Rune0A"]["last_seen"] is None
+    assert report["Rune0B"] == {"status": "unknown", "id": "unknown", "stale": True, "age_seconds": None}
+
+
+def test_old_liveness_is_flagged_stale(registry):
+    main.update_liveness({"Rune00": _result("present")})
+    main.liveness_checked_at["Rune00"] -= 3 * main.HEARTBEAT_POLL_INTERVAL
+
+    report = asyncio.run(main.check_heartbeats())
+    assert report["Rune00"]["stale"]
+
+
+def test_live_heartbeat_refreshes_the_registry(registry, monkeypatch):
+    async def poll(runes):
+        return {rune: _result("present") for rune in runes}
+
+    monkeypatch.setattr(main, "poll_heartbeats", poll)
+    report = asyncio.run(main.check_heartbeats(live=True))
+
+    assert all(entry["status"] == "present" for entry in report.values())
+    assert set(main.rune_liveness) == set(registry)
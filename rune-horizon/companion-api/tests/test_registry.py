@@ -0,0 +1,58 @@
+import time
+
+import pytest
+from fastapi import HTTPException
+
+import main
+
+
+def _register(rune_id, url="http://localhost:6005", lease_seconds=None, accepts_responses=False):
+    return main.register_rune(main.RuneRegistration(rune_id=rune_id, url=url, lease_seconds=lease_seconds,
+                                                    accepts_responses=accepts_responses))
+
+
+def test_registered_rune_joins_the_live_registry(registry):
+    result = _register("Rune0F", lease_seconds=30)
+
+    assert result == {"status": "registered", "rune": "Rune0F", "lease_seconds": 30}
+    assert main.live_runes()["Rune0F"] == "http://localhost:6005"
+    assert 29 < main.list_runes()["Rune0F"]["lease_remaining"] <= 30
+
+
+def test_lapsed_lease_expires_the_rune(registry):
+    _register("Rune0F", lease_seconds=30)
+    main.update_liveness({"Rune0F": {"status": "present", "id": "Rune0F", "latency_ms": 1.0}})
+    registry["Rune0F"]["expires_at"] = time.time() - 1
+
+    assert "Rune0F" not in main.live_runes()
+    assert "Rune0F" not in main.rune_liveness and "Rune0F" not in main.liveness_checked_at
+
+
+def test_present_heartbeat_renews_the_lease(registry):
+    _register("Rune0F", lease_seconds=30)
+    registry["Rune0F"]["expires_at"] = time.time() + 1
+
+    main.update_liveness({"Rune0F": {"status": "present", "id": "Rune0F", "latency_ms": 1.0}})
+    assert registry["Rune0F"]["expires_at"] > time.time() + 29
+
+    registry["Rune0F"]["expires_at"] = time.time() + 1
+    main.update_liveness({"Rune0F": {"status": "unreachable", "id": "unknown", "latency_ms": 1.0}})
+    assert registry["Rune0F"]["expires_at"] < time.time() + 2
+
+
+def test_static_runes_keep_their_permanent_entry(registry):
+    result = _register("Rune0A", url="http://localhost:7001", lease_seconds=30)
+
+    assert result["lease_seconds"] is None
+    assert registry["Rune0A"]["expires_at"] is None
+    assert main.live_runes()["Rune0A"] == "http://localhost:7001"
+
+
+def test_deregistered_rune_leaves_the_registry(registry):
+    _register("Rune0F")
+
+    assert main.deregister_rune("Rune0F") == {"status": "deregistered", "rune": "Rune0F"}
+    assert "Rune0F" not in main.live_runes()
+    with pytest.raises(HTTPException) as error:
+        main.deregister_rune("Rune0F")
+    assert error.value.status_code == 404
@@ -0,0 +1,68 @@
+import asyncio
+import json
+import os
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+import main
+
+
+def _respond(rune_id, message="hello"):
+    return asyncio.run(main.respond_to_beacon(rune_id, main.ResponseMessage(message=message)))
+
+
+def _inbox(rune_id):
+    inbox_dir = os.path.join(main.RESPONSES_DIR, rune_id.lower())
+    return sorted(os.listdir(inbox_dir)) if os.path.isdir(inbox_dir) else []
+
+
+def test_response_is_pushed_to_a_capable_rune(registry, monkeypatch):
+    pushed = []
+
+    async def push(url, payload):
+        pushed.append((url, payload["message"]))
+
+    monkeypatch.setattr(main, "push_response", push)
+    result = _respond("rune00")
+
+    assert result["delivery"] == "push"
+    assert pushed == [("http://localhost:6000", "hello")]
+
+
+def test_unreachable_rune_gets_the_response_in_its_inbox(registry, monkeypatch):
+    async def unreachable(url, payload):
+        raise httpx.ConnectError("connection refused")
+
+    monkeypatch.setattr(main, "push_response", unreachable)
+    before = _inbox("Rune00")
+    result = _respond("Rune00", "kept")
+
+    assert result["delivery"] == "file" and result["push_error"] == "connection refused"
+    assert sorted(set(_inbox("Rune00")) - set(before)) == [result["file"]]
+    with open(os.path.join(main.RESPONSES_DIR, "rune00", result["file"])) as f:
+        assert json.load(f)["message"] == "kept"
+
+
+def test_runes_without_an_inbox_are_refused(registry, monkeypatch):
+    async def push(url, payload):
+        raise AssertionError("nothing may be pushed to a rune that cannot take it")
+
+    monkeypatch.setattr(main, "push_response", push)
+    main.register_rune(main.RuneRegistration(rune_id="Rune0F", url="http://localhost:6005"))
+
+    for rune_id in ("Rune0A", "Rune0F"):
+        with pytest.raises(HTTPException) as refused:
+            _respond(rune_id)
+        assert refused.value.status_code == 409
+        assert not _inbox(rune_id)
+
+
+def test_registration_records_response_capability(registry):
+    main.register_rune(main.RuneRegistration(rune_id="Rune10", url="http://localhost:6010", accepts_responses=True))
+
+    runes = main.list_runes()
+    assert runes["Rune10"]["accepts_responses"] is True
+    assert runes["Rune00"]["accepts_responses"] is True
+    assert runes["Rune0A"]["accepts_responses"] is False
@@ -1,24 +1,25 @@
 import requests
 import json
 
-def inspect_memory(server="http://chromadb:8000", query="*"):
+def inspect_memory(server="http://localhost:4033", query="*", limit=10):
     try:
-        query_payload = {
-            "collection_name": "memory",
-            "query_texts": [query],
-            "n_results": 10
-        }
-        response = requests.post(f"{server}/api/v2/query", json=query_payload)
+        # companion-api searches every Rune's memory collection at once
+        response = requests.get(f"{server}/memories/search", params={"query": query, "limit": limit})
         if response.status_code == 200:
             results = response.json()
-            memories = results.get("documents", [[]])[0]
+            if "error" in results:
+                print(f"Failed to query memory: {results['error']}")
+                return
             print("\n--- Recent Memories ---")
-            for idx, memory in enumerate(memories, 1):
-                print(f"{idx}. {memory}")
+            for idx, hit in enumerate(results.get("results", []), 1):
+                print(f"{idx}. [{hit['rune_id']}] {hit['document']} (distance {hit['distance']:.3f})")
+            unavailable = {name: status for name, status in results.get("collections", {}).items() if status != "ok"}
+            if unavailable:
+                print(f"\nUnavailable collections: {unavailable}")
         else:
             print(f"Failed to query memory: {response.status_code} - {response.text}")
     except Exception as e:
         print(f"Error querying memory: {e}")
 
 if __name__ == "__main__":
-    inspect_memory(server="http://localhost:8000", query="*")
+    inspect_memory(server="http://localhost:4033", query="*")
@@ -0,0 +1,68 @@
+import json
+import logging
+import os
+import time
+import urllib.request
+
+# Companion registration: a rune advertises RUNE_URL (as reachable from the
+# companion) and renews its lease every RUNE_REGISTER_INTERVAL seconds.
+# This module has no dependencies so every rune image can ship the same copy.
+COMPANION_URL = os.getenv("COMPANION_URL")
+RUNE_URL = os.getenv("RUNE_URL")
+RUNE_REGISTER_INTERVAL = float(os.getenv("RUNE_REGISTER_INTERVAL", "30"))
+COMPANION_REQUEST_TIMEOUT = float(os.getenv("COMPANION_REQUEST_TIMEOUT", "5"))
+
+logger = logging.getLogger("rune.registry")
+
+
+def companion_request(method: str, path: str, payload: dict = None):
+    """Send a JSON request to companion-api"""
+    data = json.dumps(payload).encode() if payload is not None else None
+    request = urllib.request.Request(
+        f"{COMPANION_URL}{path}",
+        data=data,
+        method=method,
+        headers={"Content-Type": "application/json"}
+    )
+    with urllib.request.urlopen(request, timeout=COMPANION_REQUEST_TIMEOUT) as response:
+        return json.load(response)
+
+
+def register_once(rune_id: str, accepts_responses: bool = False):
+    """Register this rune with companion-api (or renew its lease), returning whether it worked"""
+    try:
+        companion_request("POST", "/runes/register",
+                          {"rune_id": rune_id, "url": RUNE_URL, "accepts_responses": accepts_responses})
+        return True
+    except Exception as e:
+        logger.warning(f"[Registry] Companion registration failed: {e}")
+        return False
+
+
+def register_with_companion_loop(rune_id: str, accepts_responses: bool = False):
+    """Background task that registers this rune with companion-api and keeps the lease fresh"""
+    if not COMPANION_URL or not RUNE_URL:
+        logger.info("[Registry] COMPANION_URL or RUNE_URL not set, skipping companion registration")
+        return
+
+    logger.info(f"[Registry] Registering {rune_id} at {RUNE_URL} with {COMPANION_URL}")
+    registered = False
+    while True:
+        if register_once(rune_id, accepts_responses):
+            if not registered:
+                logger.info(f"[Registry] {rune_id} registered with companion")
+            registered = True
+        else:
+            registered = False
+        time.sleep(RUNE_REGISTER_INTERVAL)
+
+
+def deregister_from_companion(rune_id: str):
+    """Remove this rune from the companion registry"""
+    if not COMPANION_URL or not RUNE_URL:
+        return
+    try:
+        companion_request("DELETE", f"/runes/{rune_id}")
+        logger.info("[Registry] Deregistered from companion")
+    except Exception as e:
+        logger.warning(f"[Registry] Companion deregistration failed: {e}")
@@ -0,0 +1,206 @@
+import hashlib
+import json
+import os
+import threading
+import zlib
+import logging
+from collections import OrderedDict
+
+import numpy as np
+from chromadb.api.types import EmbeddingFunction
+from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
+
+logger = logging.getLogger("rune.embedding_cache")
+
+# The cache (about 77MB at the default size) lives in the rune's state volume, outside /data
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "/state/embedding_cache")
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "50000"))
+
+_KEY_BYTES = 16
+
+
+class CachedEmbeddingFunction(EmbeddingFunction):
+    """Embedding function that serves repeated texts from an on-disk vector cache.
+
+    Vectors live in a memory-mapped float32 file of EMBEDDING_CACHE_SIZE slots,
+    with parallel memory-mapped files holding each slot's key (a hash of the
+    embedding function's identity and the text) and a CRC32 of key and vector.
+    The slot index is rebuilt from the key file on startup and every hit is
+    checked against its CRC, so a slot whose pages only partly reached disk
+    before a crash is discarded instead of served. When the cache is full the
+    least recently used slot is reused.
+    """
+
+    def __init__(self, base=None, cache_dir: str = EMBEDDING_CACHE_DIR, capacity: int = EMBEDDING_CACHE_SIZE):
+        self._base = base or DefaultEmbeddingFunction()
+        self._identity = _model_identity(self._base)
+        self._capacity = capacity
+        name = _model_name(self._base)
+        safe_name = "".join(c if c.isalnum() or c in "-_." else "_" for c in name)
+        safe_name += "-" + hashlib.sha256(self._identity.encode()).hexdigest()[:8]
+        self._vectors_path = os.path.join(cache_dir, f"{safe_name}.f32")
+        self._keys_path = os.path.join(cache_dir, f"{safe_name}.keys")
+        self._checks_path = os.path.join(cache_dir, f"{safe_name}.crc")
+        self._dim_path = os.path.join(cache_dir, f"{safe_name}.dim")
+        self._cache_dir = cache_dir
+
+        self._vectors = None
+        self._keys = None
+        self._checks = None
+        self._checked_existing = False
+        self._slots = OrderedDict()  # key -> slot, least recently used first
+        self._free_slots = []
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, text: str):
+        """Cache key for a text under this model"""
+        return hashlib.sha256(f"{self._identity}\0{text}".encode()).digest()[:_KEY_BYTES]
+
+    @staticmethod
+    def _check(key: bytes, vector):
+        """CRC32 binding a slot's key to its vector"""
+        return zlib.crc32(np.ascontiguousarray(vector, dtype=np.float32).tobytes(), zlib.crc32(key))
+
+    def _open(self, dim: int):
+        """Map the cache files, creating them for `dim`-sized vectors if needed"""
+        os.makedirs(self._cache_dir, exist_ok=True)
+        expected_size = self._capacity * dim * 4
+        paths = (self._vectors_path, self._keys_path, self._checks_path)
+        if os.path.exists(self._vectors_path) and os.path.getsize(self._vectors_path) != expected_size:
+            logger.warning("[Embedding] Cache shape changed, starting a fresh embedding cache")
+            for path in paths:
+                if os.path.exists(path):
+                    os.remove(path)
+
+        mode = "r+" if all(os.path.exists(path) for path in paths) else "w+"
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode=mode, shape=(self._capacity, dim))
+        self._keys = np.memmap(self._keys_path, dtype=np.uint8, mode=mode, shape=(self._capacity, _KEY_BYTES))
+        self._checks = np.memmap(self._checks_path, dtype=np.uint32, mode=mode, shape=(self._capacity,))
+        with open(self._dim_path, "w") as f:
+            f.write(str(dim))
+
+        empty = bytes(_KEY_BYTES)
+        for slot in range(self._capacity):
+            key = self._keys[slot].tobytes()
+            if key == empty:
+                self._free_slots.append(slot)
+            else:
+                self._slots[key] = slot
+        self._free_slots.reverse()
+        logger.info(f"[Embedding] Embedding cache ready with {len(self._slots)} cached vectors")
+
+    def _open_existing(self):
+        """Map a cache left by a previous run, if there is one"""
+        self._checked_existing = True
+        try:
+            if os.path.exists(self._dim_path):
+                with open(self._dim_path, "r") as f:
+                    self._open(int(f.read().strip()))
+        except Exception as e:
+            logger.warning(f"[Embedding] Ignoring unreadable embedding cache: {e}")
+            self._vectors = None
+            self._keys = None
+            self._checks = None
+            self._slots.clear()
+            self._free_slots.clear()
+
+    def _lookup(self, key: bytes):
+        """Get a cached vector, verifying the slot still belongs to the key and is intact"""
+        slot = self._slots.get(key)
+        if slot is None:
+            return None
+        vector = np.array(self._vectors[slot])
+        if self._keys[slot].tobytes() != key or self._checks[slot] != self._check(key, vector):
+            # Torn by a crash (or taken by another key): drop it and embed afresh
+            del self._slots[key]
+            self._keys[slot] = 0
+            self._free_slots.append(slot)
+            return None
+        self._slots.move_to_end(key)
+        return vector
+
+    def _store(self, key: bytes, vector):
+        """Write a vector into a free (or the least recently used) slot"""
+        if key in self._slots:
+            slot = self._slots.pop(key)
+        elif self._free_slots:
+            slot = self._free_slots.pop()
+        else:
+            _, slot = self._slots.popitem(last=False)
+        # The pages may reach disk in any order; the CRC catches a slot that is only partly written
+        self._vectors[slot] = vector
+        self._keys[slot] = np.frombuffer(key, dtype=np.uint8)
+        self._checks[slot] = self._check(key, vector)
+        self._slots[key] = slot
+
+    def __call__(self, input):
+        if self._capacity <= 0:
+            return self._base(input)
+
+        keys = [self._key(text) for text in input]
+        embeddings = [None] * len(input)
+        with self._lock:
+            if not self._checked_existing:
+                self._open_existing()
+            if self._vectors is not None:
+                for i, key in enumerate(keys):
+                    embeddings[i] = self._lookup(key)
+
+            self.hits += sum(1 for embedding in embeddings if embedding is not None)
+
+        # Embed each distinct missing text once
+        missing = OrderedDict()
+        for i, embedding in enumerate(embeddings):
+            if embedding is None:
+                missing.setdefault(keys[i], input[i])
+
+        if not missing:
+            return embeddings
+
+        with self._lock:
+            self.misses += len(missing)
+        computed = dict(zip(missing, (np.asarray(v, dtype=np.float32) for v in self._base(list(missing.values())))))
+
+        with self._lock:
+            try:
+                if self._vectors is None:
+                    self._open(len(next(iter(computed.values()))))
+                for key, vector in computed.items():
+                    self._store(key, vector)
+            except Exception as e:
+                logger.warning(f"[Embedding] Failed to update embedding cache: {e}")
+
+        return [embedding if embedding is not None else computed[keys[i]] for i, embedding in enumerate(embeddings)]
+
+    def flush(self):
+        """Write cached vectors through to disk"""
+        with self._lock:
+            if self._vectors is not None:
+                self._vectors.flush()
+                self._keys.flush()
+                self._checks.flush()
+
+    def stats(self):
+        """Hit/miss counters for status reporting"""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "cached": len(self._slots)}
+
+
+def _model_name(function):
+    """Short name of an embedding function, for cache file names"""
+    try:
+        return function.name()
+    except Exception:
+        return type(function).__name__
+
+
+def _model_identity(function):
+    """Everything that decides which vectors an embedding function returns: its name and config"""
+    try:
+        config = function.get_config()
+    except Exception:
+        config = {}
+    model = getattr(function, "MODEL_NAME", None) or getattr(function, "model_name", None)
+    return json.dumps({"name": _model_name(function), "model": model, "config": config}, sort_keys=True, default=str)
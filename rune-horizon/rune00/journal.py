@@ -0,0 +1,743 @@
+import asyncio
+import bisect
+import json
+import os
+import threading
+import time
+import zlib
+import logging
+from datetime import datetime, timedelta, timezone
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger("rune.journal")
+
+JOURNAL_DIR = os.getenv("JOURNAL_DIR", "/data/journal")
+# Sidecar sparse indexes, one per journal file. They are rebuilt from the
+# journal on demand, so they live in the rune's state volume rather than /data
+JOURNAL_INDEX_DIR = os.getenv("JOURNAL_INDEX_DIR", "/state/journal_index")
+# Placeholder the journal records for a field with no real value
+UNDEFINED = "undefined"
+# Lines between index points: a range read parses at most this many lines it does not need
+JOURNAL_INDEX_EVERY = int(os.getenv("JOURNAL_INDEX_EVERY", "64"))
+
+# Per-file sparse index: file name -> {"inode", "size", "every", "lines",
+# "points", "min_epoch", "max_epoch", "ordered"}. Each point is (largest
+# timestamp before offset, offset); the first element never decreases, so a
+# range read can binary-search for the last point it may skip to, even if
+# timestamps in the file are out of order. "size" is how far the file has been
+# indexed and "lines" counts lines since the last point.
+_journal_indexes = {}
+_journal_lock = threading.Lock()
+
+# Journal writer: append_journal buffers entries, a background writer appends
+# each batch to the day's file with a single write. A day's file rotates to
+# YYYY-MM-DD.1.jsonl, .2, ... once it reaches JOURNAL_MAX_FILE_BYTES.
+# JOURNAL_FSYNC is "always" (every batch), "interval" (at most every
+# JOURNAL_FSYNC_INTERVAL seconds) or "never" (leave it to the OS).
+JOURNAL_FLUSH_INTERVAL = float(os.getenv("JOURNAL_FLUSH_INTERVAL", "1.0"))
+JOURNAL_BATCH_SIZE = int(os.getenv("JOURNAL_BATCH_SIZE", "256"))
+JOURNAL_BUFFER_SIZE = int(os.getenv("JOURNAL_BUFFER_SIZE", "10000"))
+JOURNAL_MAX_FILE_BYTES = int(os.getenv("JOURNAL_MAX_FILE_BYTES", str(16 * 1024 * 1024)))
+JOURNAL_FSYNC = os.getenv("JOURNAL_FSYNC", "interval")
+JOURNAL_FSYNC_INTERVAL = float(os.getenv("JOURNAL_FSYNC_INTERVAL", "5"))
+
+_journal_buffer = []
+_journal_flush_waiters = []
+_journal_cond = threading.Condition()
+_journal_writer_thread = None
+_journal_out = {"path": None, "file": None, "day": None, "segment": 0, "last_fsync": 0.0}
+_journal_write_lock = threading.Lock()
+
+# Cold journal archive: days older than JOURNAL_ARCHIVE_AFTER_DAYS are moved into
+# one compressed file per day under JOURNAL_ARCHIVE_DIR. Each archiving pass
+# appends an independent zstd (if available) or gzip frame, and manifest.json
+# records every frame's byte range, entry count, timestamp range and the raw
+# files (name, inode, size) it replaced, so reads only decompress frames that
+# overlap their range. The archive lives in the rune's state volume, outside /data.
+JOURNAL_ARCHIVE_DIR = os.getenv("JOURNAL_ARCHIVE_DIR", "/state/journal_archive")
+# Leave archived raw files in place (e.g. when JOURNAL_DIR is a checked-in
+# directory). Reads still skip them and new lines for their day go to a new segment.
+JOURNAL_ARCHIVE_KEEP_RAW = os.getenv("JOURNAL_ARCHIVE_KEEP_RAW", "0") == "1"
+JOURNAL_ARCHIVE_AFTER_DAYS = int(os.getenv("JOURNAL_ARCHIVE_AFTER_DAYS", "7"))
+JOURNAL_ARCHIVE_INTERVAL = float(os.getenv("JOURNAL_ARCHIVE_INTERVAL", "3600"))
+JOURNAL_ARCHIVE_CODEC = os.getenv("JOURNAL_ARCHIVE_CODEC", "zstd" if zstandard is not None else "gzip")
+
+_archive_manifest = None
+
+
+def parse_timestamp(value):
+    """Parse an ISO-8601 journal timestamp into epoch seconds (None if invalid)"""
+    if not isinstance(value, str):
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def journal_file_date(file_name: str):
+    """Get the day a journal file covers from its name (YYYY-MM-DD...jsonl)"""
+    try:
+        return datetime.strptime(file_name[:10], "%Y-%m-%d").date()
+    except ValueError:
+        return None
+
+
+def journal_file_key(file_name: str):
+    """Sort key for journal files: (day, rotation segment)"""
+    parts = file_name[:-len(".jsonl")].split(".")
+    segment = int(parts[1]) if len(parts) == 2 and parts[1].isdigit() else 0
+    return parts[0], segment
+
+
+def journal_file_name(day: str, segment: int):
+    """Name of a day's journal file for a rotation segment"""
+    return f"{day}.jsonl" if segment == 0 else f"{day}.{segment}.jsonl"
+
+
+def list_journal_files():
+    """Journal file names in the order they were written"""
+    if not os.path.isdir(JOURNAL_DIR):
+        return []
+    return sorted((file_name for file_name in os.listdir(JOURNAL_DIR) if file_name.endswith(".jsonl")),
+                  key=journal_file_key)
+
+
+def _index_path(file_name: str):
+    return os.path.join(JOURNAL_INDEX_DIR, f"{file_name}.idx")
+
+
+def _new_index(inode: int):
+    return {"inode": inode, "size": 0, "every": JOURNAL_INDEX_EVERY, "lines": 0,
+            "points": [], "min_epoch": None, "max_epoch": None, "ordered": True}
+
+
+def _load_index(file_name: str, stat):
+    """Get a file's index from memory or disk, starting over if the file was replaced"""
+    index = _journal_indexes.get(file_name)
+    if index is None and os.path.exists(_index_path(file_name)):
+        try:
+            with open(_index_path(file_name), "r") as f:
+                index = json.load(f)
+        except Exception as e:
+            logger.warning(f"[Journal] Rebuilding unreadable index for {file_name}: {e}")
+
+    if index is not None and (index["inode"] != stat.st_ino or stat.st_size < index["size"]
+                              or index["every"] != JOURNAL_INDEX_EVERY):
+        logger.info(f"[Journal] Journal file {file_name} was rotated or truncated, re-indexing")
+        index = None
+    if index is None:
+        index = _new_index(stat.st_ino)
+    _journal_indexes[file_name] = index
+    return index
+
+
+def _save_index(file_name: str, index: dict):
+    """Persist a file's index atomically"""
+    try:
+        os.makedirs(JOURNAL_INDEX_DIR, exist_ok=True)
+        tmp_path = f"{_index_path(file_name)}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(index, f)
+        os.replace(tmp_path, _index_path(file_name))
+    except Exception as e:
+        logger.warning(f"[Journal] Failed to persist journal index for {file_name}: {e}")
+
+
+def _extend_index(file_name: str, index: dict, size: int):
+    """Index complete lines appended since the index was last updated"""
+    with open(os.path.join(JOURNAL_DIR, file_name), "rb") as f:
+        f.seek(index["size"])
+        data = f.read(size - index["size"])
+
+    # Only index up to the last newline; a partial line is picked up next time
+    end = data.rfind(b"\n")
+    if end < 0:
+        return False
+
+    offset = index["size"]
+    for raw_line in data[:end + 1].splitlines(keepends=True):
+        start = offset
+        offset += len(raw_line)
+        entry, epoch = _parse_entry(raw_line)
+        if epoch is None:
+            continue
+
+        if index["lines"] % index["every"] == 0:
+            index["points"].append((index["max_epoch"] if index["max_epoch"] is not None else epoch, start))
+        index["lines"] += 1
+
+        if index["max_epoch"] is not None and epoch < index["max_epoch"]:
+            index["ordered"] = False
+        index["max_epoch"] = epoch if index["max_epoch"] is None else max(index["max_epoch"], epoch)
+        index["min_epoch"] = epoch if index["min_epoch"] is None else min(index["min_epoch"], epoch)
+
+    index["size"] = offset
+    return True
+
+
+def _refresh_index(file_name: str):
+    """Bring a file's index up to date with what is on disk"""
+    try:
+        stat = os.stat(os.path.join(JOURNAL_DIR, file_name))
+    except FileNotFoundError:
+        _journal_indexes.pop(file_name, None)
+        return None
+
+    index = _load_index(file_name, stat)
+    if stat.st_size > index["size"] and _extend_index(file_name, index, stat.st_size):
+        _save_index(file_name, index)
+    return index
+
+
+def _seek_offset(index: dict, since: float):
+    """Byte offset before which every indexed line is older than `since`"""
+    if since is None or not index["points"]:
+        return 0
+    position = bisect.bisect_left([point[0] for point in index["points"]], since) - 1
+    return index["points"][max(position, 0)][1]
+
+
+def _matches_type(entry: dict, entry_type: str):
+    """Check an entry against a type: its "type", an event name, or a field it gives a real value"""
+    if entry.get("type") == entry_type or entry.get("event") == entry_type:
+        return True
+    return entry.get(entry_type) not in (None, "", UNDEFINED)
+
+
+def _parse_entry(raw_line: bytes):
+    """Parse a journal line into (entry, epoch), or (None, None) if it has no valid timestamp"""
+    try:
+        entry = json.loads(raw_line)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return None, None
+    epoch = parse_timestamp(entry.get("timestamp")) if isinstance(entry, dict) else None
+    return (entry, epoch) if epoch is not None else (None, None)
+
+
+def _read_file_range(f, index: dict, since: float, until: float, entry_type: str, limit: int, epochs: list = None):
+    """Read the entries of one open journal file in [since, until), starting from the indexed offset"""
+    entries = []
+    f.seek(_seek_offset(index, since))
+    # Never read past what is indexed, so a half-written line is left alone
+    remaining = index["size"] - f.tell()
+    while remaining > 0:
+        raw_line = f.readline(remaining)
+        remaining -= len(raw_line)
+        entry, epoch = _parse_entry(raw_line)
+        if epoch is None or (since is not None and epoch < since):
+            continue
+        if until is not None and epoch >= until:
+            if index["ordered"]:
+                break
+            continue
+        if entry_type and not _matches_type(entry, entry_type):
+            continue
+        entries.append(entry)
+        if epochs is not None:
+            epochs.append(epoch)
+        if limit is not None and len(entries) >= limit:
+            break
+    return entries
+
+
+def _snapshot_journal_range(since: float, until: float):
+    """Plan a range read under the journal lock: (source, index or archived day, open file or None) in read order"""
+    plan = []
+    with _journal_lock:
+        manifest = _load_archive_manifest()
+        archived_sources = _archived_sources(manifest["days"].values())
+        # Archived days sort ahead of the day's raw files
+        sources = [((day, -1), day) for day in manifest["days"]]
+        sources += [(journal_file_key(file_name), file_name) for file_name in list_journal_files()]
+
+        for _, source in sorted(sources):
+            # Whole days outside the range never need to be opened
+            file_date = journal_file_date(source)
+            if file_date is not None:
+                day_start = datetime.combine(file_date, datetime.min.time(), timezone.utc).timestamp()
+                if (until is not None and day_start >= until) or (since is not None and day_start + 86400 <= since):
+                    continue
+
+            if not source.endswith(".jsonl"):
+                # The archiver appends frames to the day in place
+                day = manifest["days"][source]
+                plan.append((source, dict(day, frames=list(day["frames"])), None))
+                continue
+
+            try:
+                if _source_key(source) in archived_sources:
+                    continue
+                index = _refresh_index(source)
+                if index is None or index["max_epoch"] is None:
+                    continue
+                if (since is not None and index["max_epoch"] < since) or \
+                        (until is not None and index["min_epoch"] >= until):
+                    continue
+                # An open handle keeps the file readable if the archiver removes it meanwhile
+                f = open(os.path.join(JOURNAL_DIR, source), "rb")
+                plan.append((source, dict(index, points=list(index["points"])), f))
+            except Exception as e:
+                logger.error(f"[Journal] Error indexing journal {source}: {e}")
+    return plan
+
+
+def read_journal_range(since: float = None, until: float = None, entry_type: str = None, limit: int = None,
+                       with_epochs: bool = False):
+    """Read journal entries with since <= timestamp < until (epoch seconds), in file order.
+
+    Archived days are read first for each day (they hold its earliest
+    entries), decompressing only the frames that overlap the range. Only the
+    index refresh and snapshot hold the journal lock; reading and
+    decompressing run outside it. With `with_epochs`, returns (entries,
+    epochs) with each entry's parsed timestamp alongside it.
+    """
+    plan = _snapshot_journal_range(since, until)
+    entries = []
+    epochs = [] if with_epochs else None
+    try:
+        for source, snapshot, f in plan:
+            if limit is not None and len(entries) >= limit:
+                break
+            remaining = None if limit is None else limit - len(entries)
+            try:
+                if f is None:
+                    entries.extend(_read_archived_day(snapshot, since, until, entry_type, remaining, epochs))
+                else:
+                    entries.extend(_read_file_range(f, snapshot, since, until, entry_type, remaining, epochs))
+            except Exception as e:
+                logger.error(f"[Journal] Error reading journal {source}: {e}")
+    finally:
+        for _, _, f in plan:
+            if f is not None:
+                f.close()
+
+    return (entries, epochs) if with_epochs else entries
+
+
+def read_journal_entries(hours_back: int = 1):
+    """Read journal entries from the last `hours_back` hours"""
+    if not os.path.exists(JOURNAL_DIR):
+        logger.warning("[Journal] No journal directory found")
+        return []
+
+    cutoff = (datetime.now(timezone.utc) - timedelta(hours=hours_back)).timestamp()
+    journal_entries = read_journal_range(since=cutoff)
+    logger.info(f"[Journal] Found {len(journal_entries)} recent journal entries")
+    return journal_entries
+
+
+def read_journal_day(day):
+    """Read every journal entry recorded on one day (a date), in file order"""
+    day_start = datetime.combine(day, datetime.min.time(), timezone.utc).timestamp()
+    return read_journal_range(since=day_start, until=day_start + 86400)
+
+
+def _open_journal_file(day: str, line_size: int):
+    """Get the file `day`'s next line goes to and how many bytes it has room for, rotating by day and size"""
+    out = _journal_out
+    if out["day"] != day:
+        # Carry on from the newest segment already written for this day
+        segments = [journal_file_key(file_name)[1] for file_name in list_journal_files()
+                    if journal_file_key(file_name)[0] == day]
+        _close_journal_file()
+        out["day"] = day
+        out["segment"] = max(segments, default=0)
+        # An archived file that was kept in place must not grow
+        if _is_archived(journal_file_name(day, out["segment"])):
+            out["segment"] += 1
+
+    path = os.path.join(JOURNAL_DIR, journal_file_name(day, out["segment"]))
+    current_size = os.path.getsize(path) if os.path.exists(path) else 0
+    if current_size and current_size + line_size > JOURNAL_MAX_FILE_BYTES:
+        _close_journal_file()
+        out["segment"] += 1
+        path = os.path.join(JOURNAL_DIR, journal_file_name(day, out["segment"]))
+        current_size = 0
+        logger.info(f"[Journal] Rotated journal to {os.path.basename(path)}")
+
+    if out["path"] != path:
+        _close_journal_file()
+        out["file"] = open(path, "ab")
+        out["path"] = path
+    return out["file"], JOURNAL_MAX_FILE_BYTES - current_size
+
+
+def _close_journal_file():
+    """Close the journal file being written, syncing it unless fsync is off"""
+    out = _journal_out
+    if out["file"] is not None:
+        out["file"].flush()
+        if JOURNAL_FSYNC != "never":
+            os.fsync(out["file"].fileno())
+        out["file"].close()
+    out["file"] = None
+    out["path"] = None
+
+
+def _write_journal_batch(batch: list):
+    """Append buffered entries to their day files, one write per file.
+
+    A batch is all or nothing: if any write fails, every file it touched is
+    truncated back to where the batch started, so retrying it cannot
+    duplicate the lines that did land.
+    """
+    os.makedirs(JOURNAL_DIR, exist_ok=True)
+    by_day = {}
+    for day, line in batch:
+        by_day.setdefault(day, []).append(line.encode())
+
+    out = _journal_out
+    starts = {}
+    try:
+        for day in sorted(by_day):
+            lines = by_day[day]
+            while lines:
+                f, room = _open_journal_file(day, len(lines[0]))
+                if out["path"] not in starts:
+                    starts[out["path"]] = os.path.getsize(out["path"])
+                # Fill the file up to its size limit (always at least one line)
+                count, size = 1, len(lines[0])
+                while count < len(lines) and size + len(lines[count]) <= room:
+                    size += len(lines[count])
+                    count += 1
+                f.write(b"".join(lines[:count]))
+                f.flush()
+                lines = lines[count:]
+
+        now = time.monotonic()
+        if out["file"] is not None and (JOURNAL_FSYNC == "always" or
+                                        (JOURNAL_FSYNC == "interval" and now - out["last_fsync"] >= JOURNAL_FSYNC_INTERVAL)):
+            os.fsync(out["file"].fileno())
+            out["last_fsync"] = now
+    except Exception:
+        # Close first: closing flushes whatever the failed write left buffered
+        try:
+            _close_journal_file()
+        except Exception:
+            out["file"] = None
+            out["path"] = None
+        for path, start in starts.items():
+            try:
+                os.truncate(path, start)
+            except OSError as e:
+                logger.error(f"[Journal] Could not roll {os.path.basename(path)} back to {start} bytes: {e}")
+        raise
+
+
+def _journal_writer_loop():
+    """Append buffered entries to their day files in one pass per JOURNAL_BATCH_SIZE entries or JOURNAL_FLUSH_INTERVAL seconds, retrying a batch that failed"""
+    global _journal_buffer
+    logger.info("[Journal] Journal writer started")
+    batch = []
+    while True:
+        with _journal_cond:
+            while not _journal_buffer and not _journal_flush_waiters and not batch:
+                _journal_cond.wait()
+            deadline = time.monotonic() + JOURNAL_FLUSH_INTERVAL
+            while len(_journal_buffer) < JOURNAL_BATCH_SIZE and not _journal_flush_waiters:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                _journal_cond.wait(remaining)
+            batch.extend(_journal_buffer)
+            _journal_buffer = []
+            waiters = _journal_flush_waiters[:]
+            _journal_flush_waiters.clear()
+            _journal_cond.notify_all()
+
+        try:
+            with _journal_write_lock:
+                _write_journal_batch(batch)
+            batch = []
+            ok = True
+        except Exception as e:
+            # Keep the batch and try again on the next pass
+            logger.error(f"[Journal] Failed to write {len(batch)} journal entries: {e}")
+            ok = False
+            time.sleep(1)
+
+        for waiter in waiters:
+            waiter.ok = ok
+            waiter.set()
+
+
+def start_journal_writer():
+    """Start the background journal writer if it is not already running"""
+    global _journal_writer_thread
+    with _journal_cond:
+        if _journal_writer_thread is None or not _journal_writer_thread.is_alive():
+            _journal_writer_thread = threading.Thread(target=_journal_writer_loop, daemon=True)
+            _journal_writer_thread.start()
+
+
+def append_journal(entry: dict, timeout: float = 5.0):
+    """Buffer a journal entry for the next batched write, stamping it if it has no timestamp.
+
+    Raises ValueError for a timestamp that is present but cannot be parsed.
+    """
+    entry = dict(entry)
+    epoch = parse_timestamp(entry.get("timestamp"))
+    if epoch is None:
+        if entry.get("timestamp") is not None:
+            raise ValueError(f"Unparseable journal timestamp: {entry['timestamp']!r}")
+        epoch = time.time()
+        entry["timestamp"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(epoch))
+    day = time.strftime("%Y-%m-%d", time.gmtime(epoch))
+    line = json.dumps(entry) + "\n"
+
+    start_journal_writer()
+    with _journal_cond:
+        # Day-file appends are lagging: wait up to `timeout` for the writer to
+        # drain the buffer below JOURNAL_BUFFER_SIZE rather than let it grow
+        if not _journal_cond.wait_for(lambda: len(_journal_buffer) < JOURNAL_BUFFER_SIZE, timeout):
+            logger.error("[Journal] Journal buffer is full, dropping entry")
+            return False
+        _journal_buffer.append((day, line))
+        if len(_journal_buffer) >= JOURNAL_BATCH_SIZE:
+            _journal_cond.notify_all()
+    return True
+
+
+def flush_journal(timeout: float = 10.0):
+    """Synchronously write every buffered journal entry"""
+    if _journal_writer_thread is None or not _journal_writer_thread.is_alive():
+        return True
+
+    flushed = threading.Event()
+    with _journal_cond:
+        _journal_flush_waiters.append(flushed)
+        _journal_cond.notify_all()
+    if not flushed.wait(timeout):
+        logger.error("[Journal] Journal flush timed out")
+        return False
+    return flushed.ok
+
+
+def _load_archive_manifest():
+    """Get the archive manifest, loading it from disk on first use (caller holds the lock)"""
+    global _archive_manifest
+    if _archive_manifest is None:
+        _archive_manifest = {"days": {}}
+        manifest_path = os.path.join(JOURNAL_ARCHIVE_DIR, "manifest.json")
+        if os.path.exists(manifest_path):
+            try:
+                with open(manifest_path, "r") as f:
+                    _archive_manifest = json.load(f)
+            except Exception as e:
+                logger.error(f"[Journal] Unreadable journal archive manifest, archived days are hidden: {e}")
+    return _archive_manifest
+
+
+def _save_archive_manifest(manifest: dict):
+    """Persist the archive manifest atomically"""
+    manifest_path = os.path.join(JOURNAL_ARCHIVE_DIR, "manifest.json")
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, manifest_path)
+
+
+def _compressor(codec: str):
+    if codec == "zstd":
+        return zstandard.ZstdCompressor().compressobj()
+    return zlib.compressobj(6, zlib.DEFLATED, 31)
+
+
+def _decompressor(codec: str):
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is needed to read zstd journal archives")
+        return zstandard.ZstdDecompressor().decompressobj()
+    return zlib.decompressobj(31)
+
+
+def _iter_frame_lines(path: str, frame: dict):
+    """Stream the lines of one compressed frame, decompressing a chunk at a time"""
+    decompressor = _decompressor(frame["codec"])
+    pending = b""
+    with open(path, "rb") as f:
+        f.seek(frame["offset"])
+        remaining = frame["length"]
+        while remaining > 0:
+            chunk = f.read(min(remaining, 64 * 1024))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            lines = (pending + decompressor.decompress(chunk)).split(b"\n")
+            pending = lines.pop()
+            yield from lines
+    if pending:
+        yield pending
+
+
+def _read_archived_day(day: dict, since: float, until: float, entry_type: str, limit: int, epochs: list = None):
+    """Read the entries of one archived day in [since, until), skipping frames outside the range"""
+    entries = []
+    path = os.path.join(JOURNAL_ARCHIVE_DIR, day["file"])
+    for frame in day["frames"]:
+        if (since is not None and frame["max_epoch"] < since) or (until is not None and frame["min_epoch"] >= until):
+            continue
+        for raw_line in _iter_frame_lines(path, frame):
+            entry, epoch = _parse_entry(raw_line)
+            if epoch is None or (since is not None and epoch < since) or (until is not None and epoch >= until):
+                continue
+            if entry_type and not _matches_type(entry, entry_type):
+                continue
+            entries.append(entry)
+            if epochs is not None:
+                epochs.append(epoch)
+            if limit is not None and len(entries) >= limit:
+                return entries
+    return entries
+
+
+def _archive_day(day: str, file_names: list, manifest: dict):
+    """Compress a day's raw journal files into a new frame of its archive file"""
+    archive_day = manifest["days"].get(day, {"file": f"{day}.jsonl.{'zst' if JOURNAL_ARCHIVE_CODEC == 'zstd' else 'gz'}",
+                                             "frames": []})
+    path = os.path.join(JOURNAL_ARCHIVE_DIR, archive_day["file"])
+    codec = archive_day["frames"][0]["codec"] if archive_day["frames"] else JOURNAL_ARCHIVE_CODEC
+    # Drop anything a crashed pass appended without recording it in the manifest
+    end = max((frame["offset"] + frame["length"] for frame in archive_day["frames"]), default=0)
+
+    sources = []
+    frame = {"codec": codec, "offset": end, "length": 0, "entries": 0, "raw_bytes": 0,
+             "min_epoch": None, "max_epoch": None, "sources": sources}
+    compressor = _compressor(codec)
+    with open(path, "ab") as out:
+        out.truncate(end)
+        for file_name in file_names:
+            source_path = os.path.join(JOURNAL_DIR, file_name)
+            stat = os.stat(source_path)
+            sources.append([file_name, stat.st_ino, stat.st_size])
+            with open(source_path, "rb") as f:
+                for raw_line in f:
+                    if not raw_line.endswith(b"\n"):
+                        raw_line += b"\n"
+                    _, epoch = _parse_entry(raw_line)
+                    if epoch is not None:
+                        frame["entries"] += 1
+                        frame["min_epoch"] = epoch if frame["min_epoch"] is None else min(frame["min_epoch"], epoch)
+                        frame["max_epoch"] = epoch if frame["max_epoch"] is None else max(frame["max_epoch"], epoch)
+                    frame["raw_bytes"] += len(raw_line)
+                    out.write(compressor.compress(raw_line))
+        out.write(compressor.flush())
+        out.flush()
+        os.fsync(out.fileno())
+        frame["length"] = out.tell() - end
+
+    if frame["min_epoch"] is None:
+        frame["min_epoch"] = frame["max_epoch"] = 0.0
+    return archive_day, frame
+
+
+def _source_key(file_name: str):
+    """(name, inode, size) of a raw journal file, as archive frames record their sources (None if missing)"""
+    try:
+        stat = os.stat(os.path.join(JOURNAL_DIR, file_name))
+    except FileNotFoundError:
+        return None
+    return file_name, stat.st_ino, stat.st_size
+
+
+def _archived_sources(days):
+    """(name, inode, size) of every raw file the given archived days hold.
+
+    The size is part of the key because a removed file's inode can be reused
+    by a new file of the same name.
+    """
+    return {tuple(source) for day in days for frame in day["frames"] for source in frame["sources"]}
+
+
+def _is_archived(file_name: str):
+    """Whether a raw journal file on disk is already in the archive"""
+    with _journal_lock:
+        day = _load_archive_manifest()["days"].get(file_name[:10])
+        return day is not None and _source_key(file_name) in _archived_sources([day])
+
+
+def _remove_journal_file(file_name: str):
+    """Delete a raw journal file and its index (caller holds the lock)"""
+    os.remove(os.path.join(JOURNAL_DIR, file_name))
+    _journal_indexes.pop(file_name, None)
+    if os.path.exists(_index_path(file_name)):
+        os.remove(_index_path(file_name))
+
+
+def archive_journal():
+    """Move raw journal days older than JOURNAL_ARCHIVE_AFTER_DAYS into the compressed archive"""
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=JOURNAL_ARCHIVE_AFTER_DAYS)).date()
+    days = {}
+    for file_name in list_journal_files():
+        file_date = journal_file_date(file_name)
+        if file_date is not None and file_date < cutoff:
+            days.setdefault(file_name[:10], []).append(file_name)
+    if not days:
+        return 0
+
+    os.makedirs(JOURNAL_ARCHIVE_DIR, exist_ok=True)
+    archived = 0
+    for day, file_names in sorted(days.items()):
+        try:
+            with _journal_lock:
+                manifest = _load_archive_manifest()
+                # Files already archived (kept, or left by an interrupted pass) only need removing
+                done = _archived_sources([manifest["days"][day]]) if day in manifest["days"] else set()
+                for file_name in list(file_names):
+                    if _source_key(file_name) in done:
+                        if not JOURNAL_ARCHIVE_KEEP_RAW:
+                            _remove_journal_file(file_name)
+                        file_names.remove(file_name)
+            if not file_names:
+                continue
+            archive_day, frame = _archive_day(day, file_names, manifest)
+
+            # Commit only if nothing was appended to the day while it was compressed
+            with _journal_write_lock, _journal_lock:
+                for file_name, inode, size in frame["sources"]:
+                    stat = os.stat(os.path.join(JOURNAL_DIR, file_name))
+                    if stat.st_ino != inode or stat.st_size != size:
+                        raise RuntimeError(f"{file_name} changed while it was archived")
+
+                archive_day["frames"].append(frame)
+                manifest["days"][day] = archive_day
+                _save_archive_manifest(manifest)
+
+                if _journal_out["day"] == day:
+                    _close_journal_file()
+                    _journal_out["day"] = None
+                if not JOURNAL_ARCHIVE_KEEP_RAW:
+                    for file_name in file_names:
+                        _remove_journal_file(file_name)
+
+            archived += 1
+            logger.info(f"[Journal] Archived {frame['entries']} entries of {day} "
+                        f"({frame['raw_bytes']} -> {frame['length']} bytes, {frame['codec']})")
+        except Exception as e:
+            logger.error(f"[Journal] Failed to archive journal day {day}: {e}")
+
+    return archived
+
+
+async def journal_archive_loop():
+    """Background task that archives cold journal days every JOURNAL_ARCHIVE_INTERVAL seconds"""
+    logger.info(f"[Journal] Starting journal archiver (days older than {JOURNAL_ARCHIVE_AFTER_DAYS}, "
+                f"{JOURNAL_ARCHIVE_CODEC})")
+    while True:
+        await asyncio.to_thread(archive_journal)
+        await asyncio.sleep(JOURNAL_ARCHIVE_INTERVAL)
+
+
+async def async_read_journal_entries(hours_back: int = 1):
+    """Async version of read_journal_entries, reading files off the event loop"""
+    return await asyncio.to_thread(read_journal_entries, hours_back)
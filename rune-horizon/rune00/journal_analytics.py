@@ -0,0 +1,186 @@
+import json
+import logging
+
+import numpy as np
+
+from journal import UNDEFINED, read_journal_range
+
+logger = logging.getLogger("rune.journal_analytics")
+
+# Categorical journal fields, dictionary-encoded in a JournalBatch
+JOURNAL_FIELDS = ("presence", "emotion", "thought", "event")
+ROLLUP_BUCKETS = {"hour": 3600, "day": 86400, "week": 7 * 86400}
+
+
+def _dictionary_key(value):
+    """Hashable stand-in for a field value (unhashable values become their JSON)"""
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return json.dumps(value, sort_keys=True)
+
+
+class JournalBatch:
+    """Journal entries decoded into columns.
+
+    `epochs` holds each entry's timestamp (NaN if it has none) and every field
+    in JOURNAL_FIELDS is an int32 code column into that field's dictionary of
+    distinct values, in order of first appearance. -1 marks an entry without
+    the field.
+    """
+
+    def __init__(self, epochs, codes: dict, dictionaries: dict):
+        self.epochs = epochs
+        self.codes = codes
+        self.dictionaries = dictionaries
+
+    @classmethod
+    def from_entries(cls, entries: list, epochs: list = None):
+        """Decode a list of journal entries in a single pass.
+
+        `epochs` are the entries' parsed timestamps, as read_journal_range
+        returns them with `with_epochs`; without them every epoch is NaN.
+        """
+        count = len(entries)
+        epochs = np.full(count, np.nan) if epochs is None else np.asarray(epochs, dtype=np.float64)
+
+        # None (field missing) is code -1; other values get codes in order of first appearance
+        lookups = {field: {None: -1} for field in JOURNAL_FIELDS}
+        columns = {field: [] for field in JOURNAL_FIELDS}
+        fields = [(field, lookups[field], columns[field].append) for field in JOURNAL_FIELDS]
+        for entry in entries:
+            for field, lookup, append in fields:
+                value = entry.get(field)
+                try:
+                    code = lookup.get(value)
+                except TypeError:
+                    value = _dictionary_key(value)
+                    code = lookup.get(value)
+                if code is None:
+                    code = lookup[value] = len(lookup) - 1
+                append(code)
+
+        codes = {field: np.array(columns[field], dtype=np.int32) for field in JOURNAL_FIELDS}
+        dictionaries = {field: list(lookups[field])[1:] for field in JOURNAL_FIELDS}
+        return cls(epochs, codes, dictionaries)
+
+    def __len__(self):
+        return len(self.epochs)
+
+    def matching(self, field: str, predicate):
+        """Boolean mask of entries whose field value satisfies `predicate`"""
+        accepted = np.array([bool(predicate(value)) for value in self.dictionaries[field]] + [False])
+        # Code -1 (field missing) indexes the trailing False
+        return accepted[self.codes[field]]
+
+    def values(self, field: str, mask=None):
+        """Field values of the entries in `mask` that carry the field, in entry order"""
+        codes = self.codes[field] if mask is None else self.codes[field][mask]
+        return [self.dictionaries[field][code] for code in codes if code >= 0]
+
+    def distinct(self, field: str, mask):
+        """Distinct field values among the entries in `mask`, in order of first appearance"""
+        codes = np.unique(self.codes[field][mask])
+        return [self.dictionaries[field][code] for code in codes]
+
+
+def _real_value(value):
+    return value != UNDEFINED
+
+
+def _masks(batch: JournalBatch):
+    """Masks for the entries each analysis counts"""
+    return {
+        "presence": batch.matching("presence", lambda value: value == "noticed"),
+        "emotion": batch.matching("emotion", _real_value),
+        "thought": batch.matching("thought", _real_value),
+        "event": batch.matching("event", bool),
+    }
+
+
+def describe_batch(batch: JournalBatch):
+    """Reflection text for a batch of journal entries (None if it is empty)"""
+    if not len(batch):
+        return None
+
+    masks = _masks(batch)
+    reflections = []
+
+    presence_count = int(masks["presence"].sum())
+    if presence_count > 0:
+        reflections.append(f"I noticed my presence {presence_count} times")
+
+    if masks["emotion"].any():
+        reflections.append(f"I experienced emotions: {', '.join(map(str, batch.distinct('emotion', masks['emotion'])))}")
+
+    if masks["thought"].any():
+        reflections.append(f"I had {len(batch.distinct('thought', masks['thought']))} distinct thoughts")
+
+    if masks["event"].any():
+        reflections.append(f"Events occurred: {', '.join(map(str, batch.values('event', masks['event'])))}")
+
+    if not reflections:
+        reflections.append(f"I maintained awareness through {len(batch)} moments")
+
+    return ". ".join(reflections)
+
+
+def _category_histogram(batch: JournalBatch, field: str, mask, buckets, bucket_count: int):
+    """Per-bucket counts of each field value among the entries in `mask`"""
+    size = len(batch.dictionaries[field])
+    codes = batch.codes[field][mask]
+    counts = np.bincount(buckets[mask] * size + codes, minlength=bucket_count * size).reshape(bucket_count, size)
+    return counts
+
+
+def rollup_batch(batch: JournalBatch, start: float, bucket_seconds: float):
+    """Per-bucket entry, presence, emotion, thought and event counts for a batch from `start`"""
+    timed = ~np.isnan(batch.epochs)
+    if not timed.any():
+        return []
+
+    buckets = np.zeros(len(batch), dtype=np.int64)
+    buckets[timed] = ((batch.epochs[timed] - start) // bucket_seconds).astype(np.int64)
+    timed &= buckets >= 0
+    # Every timed entry may fall before `start`
+    if not timed.any():
+        return []
+    bucket_count = int(buckets[timed].max()) + 1
+    masks = {name: mask & timed for name, mask in _masks(batch).items()}
+
+    entries = np.bincount(buckets[timed], minlength=bucket_count)
+    presence = np.bincount(buckets[masks["presence"]], minlength=bucket_count)
+    emotions = _category_histogram(batch, "emotion", masks["emotion"], buckets, bucket_count)
+    events = _category_histogram(batch, "event", masks["event"], buckets, bucket_count)
+    thoughts = _category_histogram(batch, "thought", masks["thought"], buckets, bucket_count)
+    distinct_thoughts = (thoughts > 0).sum(axis=1)
+
+    rollup = []
+    for bucket in np.nonzero(entries)[0]:
+        rollup.append({
+            "bucket_start": start + int(bucket) * bucket_seconds,
+            "entries": int(entries[bucket]),
+            "presence": int(presence[bucket]),
+            "emotions": {str(batch.dictionaries["emotion"][code]): int(count)
+                         for code, count in enumerate(emotions[bucket]) if count},
+            "distinct_thoughts": int(distinct_thoughts[bucket]),
+            "events": {str(batch.dictionaries["event"][code]): int(count)
+                       for code, count in enumerate(events[bucket]) if count},
+        })
+    return rollup
+
+
+def journal_rollup(since: float, until: float, bucket: str = "day"):
+    """Bucketed journal statistics over [since, until), e.g. per day across a week"""
+    if bucket not in ROLLUP_BUCKETS:
+        raise ValueError(f"Unknown rollup bucket: {bucket}")
+    bucket_seconds = ROLLUP_BUCKETS[bucket]
+    # Align buckets to UTC boundaries (weeks start on Monday; the epoch fell on a Thursday)
+    offset = 3 * 86400 if bucket == "week" else 0
+    start = (since + offset) // bucket_seconds * bucket_seconds - offset
+
+    batch = JournalBatch.from_entries(*read_journal_range(since, until, with_epochs=True))
+    rollup = rollup_batch(batch, start, bucket_seconds)
+    logger.info(f"[Journal] Rolled up {len(batch)} journal entries into {len(rollup)} {bucket} buckets")
+    return rollup
@@ -1,15 +1,27 @@
 # main.py
 
-from fastapi import FastAPI
+from fastapi import Body, FastAPI, HTTPException, Request
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.background import BackgroundTask
 import threading
 import asyncio
 import os
 import json
 import time
 import logging
+import tempfile
+from typing import Any
 
 from reflection import reflection_loop, test_reflection_system
-from memory import store_memory, search_memory, create_memory_collection, test_memory_connection
+from responses import response_watcher_loop, handle_response
+from retention import retention_loop, get_retention_status
+from memory_transfer import iter_ndjson_export, export_memories, import_batch, import_memories, TRANSFER_PAGE_SIZE
+from memory import (store_memory, search_memory, create_memory_collection, test_memory_connection,
+                    flush_memories, get_memory_status, build_memory_filter, search_memory_batch,
+                    SEARCH_MAX_RESULTS)
+from journal import parse_timestamp, read_journal_range, append_journal, flush_journal, journal_archive_loop
+from journal_analytics import journal_rollup
+from companion_registry import register_with_companion_loop, deregister_from_companion
 
 # Configure logging
 logging.basicConfig(
@@ -26,61 +38,52 @@ def get_rune_id():
 logger.info(f"[Main] {get_rune_id()} container is loading...")
 
 
-def check_for_response_loop():
-    """Background task to check for beacon responses"""
-    rune_id = get_rune_id()
-    logger.info(f"[Background] Beacon response checker starting for {rune_id}...")
-
-    while True:
-        try:
-            # Check for responses in the shared responses directory
-            responses_dir = "/responses"
-            if os.path.exists(responses_dir):
-                for response_file in os.listdir(responses_dir):
-                    if response_file.startswith(f"{rune_id}_response"):
-                        response_path = os.path.join(responses_dir, response_file)
-                        try:
-                            with open(response_path, 'r') as f:
-                                response_data = json.load(f)
-
-                            # Log the response and store as memory
-                            logger.info(f"[Beacon] Received response: {response_data}")
-
-                            # Store response as memory
-                            memory_text = f"Received response: {response_data.get('message', 'No message')}"
-                            memory_metadata = {
-                                "type": "beacon_response",
-                                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
-                                "response_file": response_file
-                            }
-                            store_memory(memory_text, memory_metadata)
-
-                            # Clean up the response file
-                            os.remove(response_path)
-
-                        except Exception as e:
-                            logger.error(f"[Beacon] Error processing response file {response_file}: {e}")
-
-            time.sleep(30)  # Check every 30 seconds
-
-        except Exception as e:
-            logger.error(f"[Background] Beacon checker error: {e}")
-            time.sleep(60)  # Wait longer on error
-
-
-def start_reflection_loop():
-    """Start the reflection loop in a new event loop"""
+def parse_time(value: str):
+    """Parse an API time parameter given as epoch seconds or an ISO-8601 timestamp"""
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        parsed = parse_timestamp(value)
+        if parsed is None:
+            raise ValueError(f"Invalid time: {value}")
+        return parsed
+
+
+def next_search_cursor(offset: int, returned: int, limit: int):
+    """Cursor for the page after a full one, or None at the end or at SEARCH_MAX_RESULTS"""
+    if returned < limit or offset + returned >= SEARCH_MAX_RESULTS:
+        return None
+    return str(offset + returned)
+
+
+async def run_periodic_tasks():
+    """Run every periodic async task side by side on the background event loop"""
+    tasks = {
+        "reflection": reflection_loop(),
+        "retention": retention_loop(),
+        "journal_archive": journal_archive_loop(),
+    }
+    results = await asyncio.gather(*tasks.values(), return_exceptions=True)
+    for name, result in zip(tasks, results):
+        if isinstance(result, Exception):
+            logger.error(f"[Background] Periodic task '{name}' stopped: {result}")
+
+
+def start_background_loop():
+    """Start the periodic async tasks in a new event loop"""
     rune_id = get_rune_id()
-    logger.info(f"[Background] Reflection loop starting for {rune_id}...")
+    logger.info(f"[Background] Async task loop starting for {rune_id}...")
 
     # Create new event loop for this thread
     loop = asyncio.new_event_loop()
     asyncio.set_event_loop(loop)
 
     try:
-        loop.run_until_complete(reflection_loop())
+        loop.run_until_complete(run_periodic_tasks())
     except Exception as e:
-        logger.error(f"[Background] Reflection loop error: {e}")
+        logger.error(f"[Background] Async task loop error: {e}")
     finally:
         loop.close()
 
@@ -189,16 +192,40 @@ def create_app():
             logger.error(f"[API] Failed to clear beacon: {e}")
             return {"status": "error", "message": str(e)}
 
+    @app.post("/responses")
+    def receive_response(response_data: dict):
+        """Accept a response pushed directly by companion-api"""
+        if not response_data.get("message"):
+            return {"status": "error", "message": "Response has no message"}
+
+        # Anything but "received" makes the companion fall back to the inbox
+        if not handle_response(response_data, "push"):
+            return {"status": "error", "message": "Could not store the response"}
+        return {"status": "received", "rune": get_rune_id()}
+
     @app.get("/memory/search")
-    def search_memories(query: str, limit: int = 5):
-        """Search memories"""
+    def search_memories(query: str, limit: int = 5, type: str = None, since: str = None, until: str = None,
+                        rune_id: str = None, cursor: str = None, fields: str = None):
+        """Search memories, filtered inside ChromaDB and paged with an opaque cursor.
+
+        `type` may list several comma-separated types, `since`/`until` take epoch
+        seconds or ISO-8601 timestamps, and `fields` picks which of documents,
+        metadatas, distances and embeddings to return.
+        """
         try:
-            results = search_memory(query, n_results=limit)
-            if results:
+            memory_types = type.split(",") if type and "," in type else type
+            where = build_memory_filter(memory_types, parse_time(since), parse_time(until), rune_id)
+            offset = int(cursor) if cursor else 0
+            include = fields.split(",") if fields else None
+
+            results = search_memory(query, n_results=limit, where=where, offset=offset, include=include)
+            if results and results["ids"] and results["ids"][0]:
+                returned = len(results["ids"][0])
                 return {
                     "status": "success",
                     "query": query,
-                    "results": results
+                    "results": results,
+                    "next_cursor": next_search_cursor(offset, returned, limit)
                 }
             else:
                 return {"status": "no_results", "query": query}
@@ -206,6 +233,162 @@ def create_app():
             logger.error(f"[API] Memory search error: {e}")
             return {"status": "error", "message": str(e)}
 
+    @app.post("/memory/search/batch")
+    def search_memories_batch(batch_request: dict):
+        """Run several memory searches in one round trip.
+
+        The body is {"queries": [...], "fields": "..."} where each query takes the
+        same parameters as GET /memory/search (query, limit, type, since, until,
+        rune_id, cursor) and optionally its own fields.
+        """
+        try:
+            searches = []
+            for item in batch_request.get("queries", []):
+                memory_type = item.get("type")
+                if isinstance(memory_type, str) and "," in memory_type:
+                    memory_type = memory_type.split(",")
+                fields = item.get("fields") or batch_request.get("fields")
+                searches.append({
+                    "query": item["query"],
+                    "n_results": int(item.get("limit", 5)),
+                    "where": build_memory_filter(memory_type, parse_time(item.get("since")),
+                                                 parse_time(item.get("until")), item.get("rune_id")),
+                    "offset": int(item.get("cursor") or 0),
+                    "include": fields.split(",") if isinstance(fields, str) else fields
+                })
+
+            results = search_memory_batch(searches)
+            if results is None:
+                return {"status": "error", "message": "Memory search failed"}
+
+            responses = []
+            for search, result in zip(searches, results):
+                returned = len(result["ids"][0]) if result["ids"] else 0
+                responses.append({
+                    "query": search["query"],
+                    "results": result,
+                    "next_cursor": next_search_cursor(search["offset"], returned, search["n_results"])
+                })
+            return {"status": "success", "results": responses}
+        except Exception as e:
+            logger.error(f"[API] Batch memory search error: {e}")
+            return {"status": "error", "message": str(e)}
+
+    @app.get("/journal")
+    def get_journal(since: str = None, until: str = None, type: str = None, limit: int = 1000):
+        """Read journal entries in a time range, seeking through the sparse journal index.
+
+        `since`/`until` take epoch seconds or ISO-8601 timestamps (until is
+        exclusive); `type` matches an entry's type, event name, or a field it
+        carries (e.g. presence).
+        """
+        try:
+            entries = read_journal_range(parse_time(since), parse_time(until), type, limit)
+            return {"status": "success", "count": len(entries), "entries": entries}
+        except Exception as e:
+            logger.error(f"[API] Journal read error: {e}")
+            return {"status": "error", "message": str(e)}
+
+    @app.get("/journal/rollup")
+    def get_journal_rollup(since: str, until: str = None, bucket: str = "day"):
+        """Per-bucket (hour, day or week) journal counts: entries, presence, emotions, distinct thoughts and events"""
+        try:
+            until_epoch = parse_time(until) if until else time.time()
+            rollup = journal_rollup(parse_time(since), until_epoch, bucket)
+            return {"status": "success", "bucket": bucket, "buckets": rollup}
+        except Exception as e:
+            logger.error(f"[API] Journal rollup error: {e}")
+            return {"status": "error", "message": str(e)}
+
+    @app.post("/journal")
+    def write_journal(entries: Any = Body(...), sync: bool = False):
+        """Append one journal entry (or a list of them) through the buffered journal writer.
+
+        Entries without a timestamp are stamped with the current time; a
+        timestamp that cannot be parsed rejects the whole request with a 422.
+        With sync=true the call returns only once the entries are written.
+        """
+        entries = entries if isinstance(entries, list) else [entries]
+        if not all(isinstance(entry, dict) for entry in entries):
+            return {"status": "error", "message": "Journal entries must be JSON objects"}
+        for entry in entries:
+            if entry.get("timestamp") is not None and parse_timestamp(entry["timestamp"]) is None:
+                raise HTTPException(status_code=422, detail=f"Unparseable journal timestamp: {entry['timestamp']!r}")
+
+        queued = sum(1 for entry in entries if append_journal(entry))
+        if sync and not flush_journal():
+            return {"status": "error", "message": "Journal flush failed", "queued": queued}
+        return {"status": "written" if sync else "queued", "queued": queued}
+
+    @app.get("/memory/export")
+    def export_memory(format: str = "ndjson", embeddings: bool = False):
+        """Stream every memory of this rune out as NDJSON (or a Parquet file)"""
+        flush_memories()
+        if format == "parquet":
+            fd, path = tempfile.mkstemp(suffix=".parquet")
+            os.close(fd)
+            try:
+                export_memories(path, "parquet", embeddings)
+            except Exception as e:
+                os.remove(path)
+                logger.error(f"[API] Memory export error: {e}")
+                return {"status": "error", "message": str(e)}
+            return FileResponse(path, media_type="application/vnd.apache.parquet",
+                                filename=f"{get_rune_id()}-memories.parquet",
+                                background=BackgroundTask(os.remove, path))
+
+        return StreamingResponse(iter_ndjson_export(embeddings), media_type="application/x-ndjson")
+
+    @app.post("/memory/import")
+    async def import_memory(request: Request, format: str = "ndjson", skip: int = 0):
+        """Import an NDJSON (or Parquet) export streamed in the request body.
+
+        NDJSON is upserted a batch at a time as it arrives. `imported` in the
+        reply counts records from the start of the body, so an interrupted import
+        can be resumed by re-sending the same body with skip set to it.
+        """
+        imported = 0
+        try:
+            if format == "parquet":
+                fd, path = tempfile.mkstemp(suffix=".parquet")
+                try:
+                    with os.fdopen(fd, "wb") as f:
+                        async for chunk in request.stream():
+                            f.write(chunk)
+                    imported = await asyncio.to_thread(import_memories, path, "parquet")
+                finally:
+                    os.remove(path)
+                return {"status": "success", "imported": imported}
+
+            position = 0
+            batch = []
+            pending = b""
+            async for chunk in request.stream():
+                lines = (pending + chunk).split(b"\n")
+                pending = lines.pop()
+                for line in lines:
+                    if not line.strip():
+                        continue
+                    position += 1
+                    if position > skip:
+                        batch.append(json.loads(line))
+                if len(batch) >= TRANSFER_PAGE_SIZE:
+                    if not await asyncio.to_thread(import_batch, batch):
+                        raise RuntimeError("Memory upsert failed")
+                    imported = position
+                    batch = []
+            if pending.strip():
+                position += 1
+                if position > skip:
+                    batch.append(json.loads(pending))
+            if batch and not await asyncio.to_thread(import_batch, batch):
+                raise RuntimeError("Memory upsert failed")
+            return {"status": "success", "imported": position}
+
+        except Exception as e:
+            logger.error(f"[API] Memory import error: {e}")
+            return {"status": "error", "message": str(e), "imported": max(imported, skip)}
+
     @app.get("/status")
     def get_status():
         """Get detailed status of this rune"""
@@ -227,22 +410,35 @@ def create_app():
             "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
             "beacon": beacon_status,
             "systems": {
-                "memory": "connected",  # Could add actual health checks
+                "memory": get_memory_status(),
+                "retention": get_retention_status(),
                 "reflection": "active"
             }
         }
 
+    @app.on_event("shutdown")
+    def shutdown():
+        """Write any queued memories and journal entries and leave the companion registry before the process exits"""
+        logger.info("[Shutdown] Flushing queued memories and journal entries...")
+        flush_memories()
+        flush_journal()
+        deregister_from_companion(get_rune_id())
+
     # Initialize systems in a separate thread
     init_thread = threading.Thread(target=initialize_systems, daemon=True)
     init_thread.start()
 
     # Start background processes
     logger.info("[Startup] Launching background processes...")
-    beacon_thread = threading.Thread(target=check_for_response_loop, daemon=True)
+    beacon_thread = threading.Thread(target=response_watcher_loop, daemon=True)
     beacon_thread.start()
 
-    reflection_thread = threading.Thread(target=start_reflection_loop, daemon=True)
-    reflection_thread.start()
+    background_thread = threading.Thread(target=start_background_loop, daemon=True)
+    background_thread.start()
+
+    # Rune00 watches its inbox, so the companion may push responses to it
+    registry_thread = threading.Thread(target=register_with_companion_loop, args=(get_rune_id(), True), daemon=True)
+    registry_thread.start()
 
     logger.info(f"[Main] {get_rune_id()} is now active and ready")
     return app
\ No newline at end of file
@@ -1,9 +1,24 @@
 import chromadb
 from chromadb import HttpClient
 from chromadb.config import Settings
+from chromadb.errors import ChromaError
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import functools
+import hashlib
+import json
 import time
 import os
+import queue
+import threading
 import logging
+import httpx
+import numpy as np
+
+from embedding_cache import CachedEmbeddingFunction
+from memory_ids import make_memory_id
+from wal import WriteAheadLog
 
 logger = logging.getLogger("rune.memory")
 
@@ -19,19 +34,194 @@ except Exception as e:
     logger.error(f"[Memory] Failed to connect to ChromaDB: {e}")
     memory_client = None
 
+# Write-behind ingestion: store_memory enqueues, a background writer coalesces
+# queued memories into batched collection.add calls
+MEMORY_BATCH_SIZE = int(os.getenv("MEMORY_BATCH_SIZE", "32"))
+MEMORY_FLUSH_INTERVAL = float(os.getenv("MEMORY_FLUSH_INTERVAL", "2.0"))
+MEMORY_QUEUE_SIZE = int(os.getenv("MEMORY_QUEUE_SIZE", "1000"))
+MEMORY_ENQUEUE_TIMEOUT = float(os.getenv("MEMORY_ENQUEUE_TIMEOUT", "5.0"))
 
-def ensure_chromadb_connection():
-    """Ensure ChromaDB connection is available"""
+_memory_queue = queue.Queue(maxsize=MEMORY_QUEUE_SIZE)
+_writer_thread = None
+_replayer_thread = None
+_writer_lock = threading.Lock()
+
+# Every memory write is logged to a local write-ahead log before it is queued,
+# so a write survives ChromaDB outages and restarts; records that did not reach
+# ChromaDB are replayed from the log once it is reachable again. Records are
+# [id, text, metadata]: a text of None is a metadata update and a metadata of
+# None as well is a delete, logged so replaying older records cannot undo it
+MEMORY_WAL_DIR = os.getenv("MEMORY_WAL_DIR", "/data/memory_wal")
+MEMORY_WAL_SEGMENT_BYTES = int(os.getenv("MEMORY_WAL_SEGMENT_BYTES", str(4 * 1024 * 1024)))
+MEMORY_WAL_FSYNC = os.getenv("MEMORY_WAL_FSYNC", "1") == "1"
+MEMORY_WAL_REPLAY_INTERVAL = float(os.getenv("MEMORY_WAL_REPLAY_INTERVAL", "10"))
+
+try:
+    memory_wal = WriteAheadLog(MEMORY_WAL_DIR, MEMORY_WAL_SEGMENT_BYTES, sync=MEMORY_WAL_FSYNC) if MEMORY_WAL_DIR else None
+except Exception as e:
+    logger.error(f"[Memory] Memory write-ahead log unavailable, writes need a live ChromaDB: {e}")
+    memory_wal = None
+
+# Collection handles resolved by name, so hot paths skip the lookup round trip
+COLLECTION_CACHE_TTL = float(os.getenv("COLLECTION_CACHE_TTL", "300"))
+
+_collection_cache = {}  # collection name -> (collection, cached_at)
+_collection_lock = threading.Lock()
+
+# Documents and queries are embedded here, with repeated texts served from the
+# on-disk embedding cache, and handed to ChromaDB as vectors. The collection keeps
+# its own persisted embedding function, which the cache's model must match.
+memory_embedding_function = CachedEmbeddingFunction()
+
+# Circuit breaker around ChromaDB: "closed" while healthy (with a heartbeat probe
+# at most every CHROMADB_PROBE_INTERVAL), "open" after repeated failures (callers
+# fail fast until the backoff expires) and "half_open" while one probe decides
+CHROMADB_PROBE_INTERVAL = float(os.getenv("CHROMADB_PROBE_INTERVAL", "30"))
+CHROMADB_FAILURE_THRESHOLD = int(os.getenv("CHROMADB_FAILURE_THRESHOLD", "3"))
+CHROMADB_BACKOFF_INITIAL = float(os.getenv("CHROMADB_BACKOFF_INITIAL", "5"))
+CHROMADB_BACKOFF_MAX = float(os.getenv("CHROMADB_BACKOFF_MAX", "300"))
+
+_breaker = {
+    "state": "closed",
+    "failures": 0,
+    "backoff": CHROMADB_BACKOFF_INITIAL,
+    "retry_at": 0.0,
+    "last_probe": 0.0,
+    "last_error": None,
+}
+_breaker_lock = threading.Lock()
+
+# Async callers run the blocking client calls here; the HttpClient's connection
+# pool is shared by every worker
+MEMORY_EXECUTOR_WORKERS = int(os.getenv("MEMORY_EXECUTOR_WORKERS", "4"))
+
+_memory_executor = ThreadPoolExecutor(max_workers=MEMORY_EXECUTOR_WORKERS, thread_name_prefix="memory")
+
+# Latest memories kept locally (oldest first) so reflection never has to scan
+# the collection; misses fall back to epoch-windowed reads from ChromaDB
+RECENT_MEMORY_BUFFER = int(os.getenv("RECENT_MEMORY_BUFFER", "200"))
+RECENT_MEMORY_WINDOW_HOURS = float(os.getenv("RECENT_MEMORY_WINDOW_HOURS", "1"))
+RECENT_MEMORY_MAX_WINDOW_HOURS = float(os.getenv("RECENT_MEMORY_MAX_WINDOW_HOURS", "720"))
+# Most memories a single windowed read may load; a window that fills it is narrowed
+RECENT_MEMORY_SCAN_LIMIT = int(os.getenv("RECENT_MEMORY_SCAN_LIMIT", "500"))
+
+_recent_memories = deque(maxlen=RECENT_MEMORY_BUFFER)
+_recent_lock = threading.Lock()
+
+# Deduplication: a memory whose text matches a recent one (ignoring case and
+# whitespace) bumps the original's occurrence count instead of being embedded
+# again. With MEMORY_NEAR_DUPLICATE_DISTANCE > 0, new memories whose nearest
+# stored vector is at least that close are merged the same way
+MEMORY_DEDUP_CACHE_SIZE = int(os.getenv("MEMORY_DEDUP_CACHE_SIZE", "1000"))
+MEMORY_NEAR_DUPLICATE_DISTANCE = float(os.getenv("MEMORY_NEAR_DUPLICATE_DISTANCE", "0"))
+
+_dedup_cache = OrderedDict()  # content hash -> (memory id, metadata)
+_dedup_lock = threading.Lock()
+
+# Search results cached per (collection, generation, query, n_results). Every
+# write bumps the generation, so entries cached before it can no longer hit
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "256"))
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "60"))
+
+_search_cache = OrderedDict()  # key -> (results, cached_at)
+_search_generation = 0
+_search_stats = {"hits": 0, "misses": 0}
+_search_lock = threading.Lock()
+
+# Deepest result a paginated search may reach (offset + page size)
+SEARCH_MAX_RESULTS = int(os.getenv("SEARCH_MAX_RESULTS", "500"))
+SEARCH_FIELDS = ("documents", "metadatas", "distances", "embeddings")
+
+
+def _record_chromadb_success():
+    """Close the circuit after a successful ChromaDB call"""
+    with _breaker_lock:
+        if _breaker["state"] != "closed":
+            logger.info("[Memory] ChromaDB connection restored")
+        _breaker["state"] = "closed"
+        _breaker["failures"] = 0
+        _breaker["backoff"] = CHROMADB_BACKOFF_INITIAL
+        _breaker["last_probe"] = time.monotonic()
+
+
+def _record_chromadb_failure(error: Exception):
+    """Count a failed ChromaDB call, opening the circuit once the threshold is hit"""
     global memory_client
-    if memory_client is None:
-        try:
+    with _breaker_lock:
+        _breaker["failures"] += 1
+        _breaker["last_error"] = str(error)
+
+        if _breaker["state"] == "half_open" or _breaker["failures"] >= CHROMADB_FAILURE_THRESHOLD:
+            backoff = _breaker["backoff"]
+            _breaker["state"] = "open"
+            _breaker["retry_at"] = time.monotonic() + backoff
+            _breaker["backoff"] = min(backoff * 2, CHROMADB_BACKOFF_MAX)
+            # Reconnect from scratch when the backoff expires
+            memory_client = None
+            logger.error(f"[Memory] ChromaDB unavailable, retrying in {backoff:.0f}s: {error}")
+
+
+def _probe_chromadb():
+    """Reconnect if needed and send a heartbeat to ChromaDB"""
+    global memory_client
+    try:
+        if memory_client is None:
             memory_client = HttpClient(host=CHROMADB_HOST, port=CHROMADB_PORT)
+            invalidate_collection_cache()
             logger.info("[Memory] Reconnected to ChromaDB")
-            return True
-        except Exception as e:
-            logger.error(f"[Memory] Failed to reconnect to ChromaDB: {e}")
+
+        memory_client.heartbeat()
+        _record_chromadb_success()
+        return True
+
+    except Exception as e:
+        logger.error(f"[Memory] ChromaDB health probe failed: {e}")
+        _record_chromadb_failure(e)
+        return False
+
+
+def ensure_chromadb_connection():
+    """Ensure ChromaDB connection is available, failing fast while the circuit is open"""
+    now = time.monotonic()
+    with _breaker_lock:
+        state = _breaker["state"]
+        if state == "open":
+            if now < _breaker["retry_at"]:
+                return False
+            # This caller gets to probe; everyone else keeps failing fast
+            _breaker["state"] = "half_open"
+        elif state == "half_open":
             return False
-    return True
+        elif memory_client is not None and now - _breaker["last_probe"] < CHROMADB_PROBE_INTERVAL:
+            return True
+        else:
+            _breaker["last_probe"] = now
+
+    return _probe_chromadb()
+
+
+def get_memory_status():
+    """Report ChromaDB connection health for /status"""
+    with _breaker_lock:
+        state = _breaker["state"]
+        connection = {"closed": "connected", "open": "disconnected", "half_open": "reconnecting"}[state]
+        if memory_client is None and state == "closed":
+            # Never connected, or a reconnect failed below the failure threshold
+            connection = "disconnected"
+        status = {
+            "status": connection,
+            "circuit": state,
+            "consecutive_failures": _breaker["failures"],
+            "last_error": _breaker["last_error"],
+        }
+        if state == "open":
+            status["retry_in"] = round(max(0.0, _breaker["retry_at"] - time.monotonic()), 1)
+
+    status["queued_memories"] = _memory_queue.qsize()
+    status["embedding_cache"] = memory_embedding_function.stats()
+    status["search_cache"] = get_search_cache_stats()
+    status["wal"] = memory_wal.stats() if memory_wal is not None else None
+    return status
 
 
 def get_rune_id():
@@ -39,26 +229,389 @@ def get_rune_id():
     return os.getenv("RUNE_ID", "unknown_rune")
 
 
+def new_memory_id():
+    """Generate a unique, time-ordered memory ID prefixed with the rune ID"""
+    return make_memory_id(get_rune_id())
+
+
+def get_collection_name():
+    """Get the name of this rune's memory collection"""
+    return f"memory_{get_rune_id().lower()}"
+
+
+def invalidate_collection_cache(collection_name: str = None):
+    """Drop cached collection handles (all of them if no name is given)"""
+    with _collection_lock:
+        if collection_name is None:
+            _collection_cache.clear()
+        else:
+            _collection_cache.pop(collection_name, None)
+
+
+def _is_not_found_error(error: Exception):
+    """Check whether an error means the collection no longer exists"""
+    message = str(error).lower()
+    return type(error).__name__ == "NotFoundError" or "does not exist" in message or "not found" in message
+
+
+def get_memory_collection(create: bool = True):
+    """Get this rune's collection handle, resolving it by name only on a cache miss"""
+    collection_name = get_collection_name()
+
+    with _collection_lock:
+        cached = _collection_cache.get(collection_name)
+    if cached and time.monotonic() - cached[1] < COLLECTION_CACHE_TTL:
+        return cached[0]
+
+    if create:
+        collection = memory_client.get_or_create_collection(collection_name)
+    else:
+        collection = memory_client.get_collection(collection_name)
+
+    with _collection_lock:
+        _collection_cache[collection_name] = (collection, time.monotonic())
+    return collection
+
+
+def _is_outage_error(error: Exception):
+    """Check whether an error means ChromaDB is unreachable or failing, rather than a rejected request"""
+    while error is not None:
+        if isinstance(error, (httpx.TransportError, ConnectionError, TimeoutError)):
+            return True
+        if isinstance(error, ChromaError):
+            return error.code() >= 500
+        # Untyped error responses are raised while handling the HTTPStatusError
+        if isinstance(error, httpx.HTTPStatusError):
+            return error.response.status_code >= 500
+        error = error.__cause__ or error.__context__
+    return False
+
+
+def _handle_memory_error(error: Exception):
+    """Forget the cached handle when the collection is gone; only outages trip the breaker"""
+    if _is_not_found_error(error):
+        invalidate_collection_cache(get_collection_name())
+    elif _is_outage_error(error):
+        _record_chromadb_failure(error)
+
+
 def create_memory_collection():
     """Create or get the memory collection for this rune"""
     if not ensure_chromadb_connection():
         return False
 
     try:
-        rune_id = get_rune_id()
-        collection_name = f"memory_{rune_id.lower()}"
+        collection_name = get_collection_name()
 
-        collection = memory_client.get_or_create_collection(collection_name)
+        get_memory_collection()
         logger.info(f"[Memory] Memory collection '{collection_name}' is ready")
         return True
     except Exception as e:
+        _handle_memory_error(e)
         logger.error(f"[Memory] Memory collection creation failed: {e}")
         return False
 
 
-def store_memory(thought: str, metadata: dict = None):
-    """Store a memory in ChromaDB"""
+def _content_hash(thought: str):
+    """Hash a memory's text after normalising case and whitespace"""
+    normalized = " ".join(thought.lower().split())
+    return hashlib.sha256(normalized.encode()).hexdigest()[:32]
+
+
+def _remember_content(content_hash: str, memory_id: str, metadata: dict):
+    """Record the latest memory for a content hash in the dedup LRU"""
+    with _dedup_lock:
+        _dedup_cache[content_hash] = (memory_id, metadata)
+        _dedup_cache.move_to_end(content_hash)
+        while len(_dedup_cache) > MEMORY_DEDUP_CACHE_SIZE:
+            _dedup_cache.popitem(last=False)
+
+
+def _repeat_metadata(original: dict, now: float):
+    """Metadata for a memory seen again: bump its count and last-seen time"""
+    merged = dict(original)
+    merged["occurrences"] = merged.get("occurrences", 1) + 1
+    merged["last_seen"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(now))
+    merged["last_seen_epoch"] = now
+    return merged
+
+
+def _merge_near_duplicates(collection, adds: OrderedDict, updates: OrderedDict):
+    """Turn new memories that sit right next to an existing vector into updates of it"""
+    if MEMORY_NEAR_DUPLICATE_DISTANCE <= 0 or not adds or collection.count() == 0:
+        return
+
+    memory_ids = list(adds)
+    results = collection.query(
+        query_embeddings=memory_embedding_function([adds[memory_id][0] for memory_id in memory_ids]),
+        n_results=1,
+        include=["metadatas", "distances"]
+    )
+    now = time.time()
+    for i, memory_id in enumerate(memory_ids):
+        if not results["ids"][i] or results["distances"][i][0] > MEMORY_NEAR_DUPLICATE_DISTANCE:
+            continue
+        existing_id = results["ids"][i][0]
+        original = updates.get(existing_id) or results["metadatas"][i][0] or {}
+        updates[existing_id] = _repeat_metadata(original, now)
+        thought, metadata = adds.pop(memory_id)
+        _remember_content(metadata.get("content_hash") or _content_hash(thought), existing_id, updates[existing_id])
+        logger.debug(f"[Memory] Merged near-duplicate memory into {existing_id}")
+
+
+def _apply_memory_batch(batch):
+    """Write a batch of memories to ChromaDB: one add call plus one update call for repeats"""
+    if not batch:
+        return True
+
     if not ensure_chromadb_connection():
+        logger.error(f"[Memory] Cannot store {len(batch)} memories - no ChromaDB connection")
+        return False
+
+    try:
+        rune_id = get_rune_id()
+
+        # Items are (memory id, text, metadata); a text of None is a
+        # metadata-only update for a repeated memory
+        adds = OrderedDict()
+        updates = OrderedDict()
+        for memory_id, thought, metadata in batch:
+            if thought is not None:
+                adds[memory_id] = (thought, metadata)
+            elif memory_id in adds:
+                adds[memory_id] = (adds[memory_id][0], metadata)
+            else:
+                updates[memory_id] = metadata
+
+        collection = get_memory_collection()
+        _merge_near_duplicates(collection, adds, updates)
+        if adds:
+            collection.add(
+                ids=list(adds),
+                documents=[thought for thought, _ in adds.values()],
+                metadatas=[metadata for _, metadata in adds.values()],
+                embeddings=memory_embedding_function([thought for thought, _ in adds.values()])
+            )
+        if updates:
+            collection.update(ids=list(updates), metadatas=list(updates.values()))
+        _record_chromadb_success()
+        # Queued writes only become searchable now
+        bump_search_generation()
+
+        logger.info(f"[Memory] Stored {len(adds)} memories and updated {len(updates)} repeats for {rune_id}")
+        return True
+
+    except Exception as e:
+        _handle_memory_error(e)
+        logger.error(f"[Memory] Memory storage failed for batch of {len(batch)}: {e}")
+        return False
+
+
+def _write_memory_batch(batch):
+    """Write a batch of queued memories, returning (ok, items the writer must retry).
+
+    Failed records that were logged are left to the write-ahead log replayer;
+    without a log the writer keeps them, up to MEMORY_QUEUE_SIZE, and retries.
+    """
+    ok = _apply_memory_batch([item[:3] for item in batch])
+    if memory_wal is not None:
+        segments = [item[3] for item in batch if item[3] is not None]
+        if ok:
+            memory_wal.mark_written(segments)
+        else:
+            memory_wal.mark_failed(segments)
+    retry = [item for item in batch if item[3] is None] if not ok else []
+    if len(retry) > MEMORY_QUEUE_SIZE:
+        logger.error(f"[Memory] Dropping {len(retry) - MEMORY_QUEUE_SIZE} memories that could not be written")
+        retry = retry[-MEMORY_QUEUE_SIZE:]
+    return ok, retry
+
+
+def _last_seen(metadata: dict):
+    return metadata.get("last_seen_epoch", metadata.get("epoch", 0)) if metadata else 0
+
+
+def _replay_records(records: list):
+    """Write logged records to ChromaDB, skipping what it already holds (None on failure).
+
+    Adds already in ChromaDB, updates older than the stored metadata and
+    anything deleted later in the log are left out; deletes go last.
+    """
+    deleted = {memory_id for memory_id, thought, metadata in records if thought is None and metadata is None}
+    records = [record for record in records if record[0] not in deleted]
+    try:
+        collection = get_memory_collection()
+        ids = list(dict.fromkeys(memory_id for memory_id, _, _ in records))
+        stored = collection.get(ids=ids, include=["metadatas"]) if ids else {"ids": [], "metadatas": []}
+        existing = dict(zip(stored['ids'], stored['metadatas']))
+    except Exception as e:
+        _handle_memory_error(e)
+        logger.error(f"[Memory] Memory log replay failed: {e}")
+        return None
+
+    added = {memory_id for memory_id, thought, _ in records if thought is not None}
+    batch = [(memory_id, thought, metadata) for memory_id, thought, metadata in records
+             if (thought is not None and memory_id not in existing)
+             or (thought is None and (memory_id in added or
+                                      (memory_id in existing and _last_seen(metadata) > _last_seen(existing[memory_id]))))]
+    if not _apply_memory_batch(batch):
+        return None
+
+    if deleted:
+        try:
+            collection.delete(ids=list(deleted))
+        except Exception as e:
+            _handle_memory_error(e)
+            logger.error(f"[Memory] Memory log replay failed to delete {len(deleted)} memories: {e}")
+            return None
+    return len(batch) + len(deleted)
+
+
+def replay_memory_wal():
+    """Deliver logged memories that never reached ChromaDB, oldest segment first"""
+    if memory_wal is None:
+        return True
+    segments = memory_wal.replayable_segments()
+    if not segments:
+        return True
+    if not ensure_chromadb_connection():
+        return False
+
+    for segment in segments:
+        replayed = 0
+        records = []
+        for record in memory_wal.read_segment(segment):
+            records.append(tuple(record))
+            if len(records) >= MEMORY_BATCH_SIZE:
+                written = _replay_records(records)
+                if written is None:
+                    return False
+                replayed += written
+                records = []
+        if records:
+            written = _replay_records(records)
+            if written is None:
+                return False
+            replayed += written
+
+        memory_wal.finish_replay(segment, replayed)
+        if replayed:
+            logger.info(f"[Memory] Replayed {replayed} memories from write-ahead log segment {segment}")
+    return True
+
+
+def _memory_replayer_loop():
+    """Background replayer that drains the write-ahead log whenever ChromaDB is reachable"""
+    while True:
+        try:
+            replay_memory_wal()
+        except Exception as e:
+            logger.error(f"[Memory] Memory log replayer error: {e}")
+        time.sleep(MEMORY_WAL_REPLAY_INTERVAL)
+
+
+def _memory_writer_loop():
+    """Drain the ingestion queue into ChromaDB once MEMORY_BATCH_SIZE memories or MEMORY_FLUSH_INTERVAL seconds have built up"""
+    logger.info("[Memory] Memory writer started")
+    batch = []
+    deadline = None
+    # Set while the batch holds memories a failed write left behind: they are
+    # retried every MEMORY_FLUSH_INTERVAL rather than on every new arrival
+    retrying = False
+
+    while True:
+        timeout = max(0.0, deadline - time.monotonic()) if batch else None
+        try:
+            item = _memory_queue.get(timeout=timeout)
+        except queue.Empty:
+            item = None
+
+        # A flush request: write whatever is pending and wake the caller
+        if isinstance(item, threading.Event):
+            item.ok, batch = _write_memory_batch(batch)
+            retrying = bool(batch)
+            deadline = time.monotonic() + MEMORY_FLUSH_INTERVAL
+            item.set()
+            continue
+
+        if item is not None:
+            batch.append(item)
+            if len(batch) == 1:
+                deadline = time.monotonic() + MEMORY_FLUSH_INTERVAL
+
+        if batch and ((len(batch) >= MEMORY_BATCH_SIZE and not retrying) or time.monotonic() >= deadline):
+            _, batch = _write_memory_batch(batch)
+            retrying = bool(batch)
+            deadline = time.monotonic() + MEMORY_FLUSH_INTERVAL
+
+
+def start_memory_writer():
+    """Start the background memory writer (and log replayer) if it is not already running"""
+    global _writer_thread, _replayer_thread
+    with _writer_lock:
+        if _writer_thread is None or not _writer_thread.is_alive():
+            _writer_thread = threading.Thread(target=_memory_writer_loop, daemon=True)
+            _writer_thread.start()
+        if memory_wal is not None and (_replayer_thread is None or not _replayer_thread.is_alive()):
+            _replayer_thread = threading.Thread(target=_memory_replayer_loop, daemon=True)
+            _replayer_thread.start()
+
+
+def _enqueue_memory(memory_id: str, thought, metadata: dict):
+    """Log a memory write ahead, then queue it for the writer"""
+    segment = memory_wal.append([memory_id, thought, metadata]) if memory_wal is not None else None
+    try:
+        # A full queue means ChromaDB writes are lagging; reflection and the API
+        # wait up to MEMORY_ENQUEUE_TIMEOUT for the writer to make room
+        _memory_queue.put((memory_id, thought, metadata, segment), timeout=MEMORY_ENQUEUE_TIMEOUT)
+    except queue.Full:
+        if segment is None:
+            raise
+        # Already durable in the log; the replayer delivers it instead
+        memory_wal.mark_failed([segment])
+        logger.warning("[Memory] Ingestion queue is full, leaving memory to the log replayer")
+
+
+def flush_memories(timeout: float = 10.0):
+    """Synchronously write every queued memory to ChromaDB"""
+    memory_embedding_function.flush()
+    if _writer_thread is None or not _writer_thread.is_alive():
+        batch = []
+        while True:
+            try:
+                item = _memory_queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, threading.Event):
+                item.set()
+            else:
+                batch.append(item)
+        ok, retry = _write_memory_batch(batch)
+        # Without a writer the queue is the only place left to keep them
+        for item in retry:
+            try:
+                _memory_queue.put_nowait(item)
+            except queue.Full:
+                logger.error("[Memory] Dropping a memory that could not be written - queue is full")
+                break
+        return ok
+
+    flushed = threading.Event()
+    try:
+        _memory_queue.put(flushed, timeout=timeout)
+    except queue.Full:
+        logger.error("[Memory] Memory flush timed out - queue is full")
+        return False
+
+    if not flushed.wait(timeout):
+        logger.error("[Memory] Memory flush timed out")
+        return False
+    return flushed.ok
+
+
+def store_memory(thought: str, metadata: dict = None, deduplicate: bool = True):
+    """Queue a memory for batched storage in ChromaDB"""
+    if memory_wal is None and not ensure_chromadb_connection():
         logger.error("[Memory] Cannot store memory - no ChromaDB connection")
         return False
 
@@ -67,56 +620,257 @@ def store_memory(thought: str, metadata: dict = None):
             metadata = {}
 
         rune_id = get_rune_id()
-        collection_name = f"memory_{rune_id.lower()}"
 
-        # Add rune_id to metadata
+        # Add rune_id to metadata, plus a numeric epoch for time-range reads
+        now = time.time()
         metadata["rune_id"] = rune_id
-        metadata["stored_at"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        metadata["stored_at"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(now))
+        metadata["epoch"] = now
 
-        # Get timestamp for ID
-        timestamp = metadata.get("timestamp", metadata["stored_at"])
-        memory_id = f"memory-{rune_id}-{int(time.time())}-{hash(thought) % 10000}"
+        content_hash = _content_hash(thought)
+        metadata["content_hash"] = content_hash
 
-        collection = memory_client.get_or_create_collection(collection_name)
-        collection.add(
-            documents=[thought],
-            metadatas=[metadata],
-            ids=[memory_id]
-        )
+        start_memory_writer()
+
+        with _dedup_lock:
+            duplicate = _dedup_cache.get(content_hash) if deduplicate else None
+        if duplicate is not None:
+            memory_id, original = duplicate
+            merged = _repeat_metadata(original, now)
+            _remember_content(content_hash, memory_id, merged)
+            _enqueue_memory(memory_id, None, merged)
+            bump_search_generation()
+            logger.info(f"[Memory] Repeated memory for {rune_id} ({merged['occurrences']}x): {thought[:50]}...")
+            return True
+
+        memory_id = new_memory_id()
+
+        _enqueue_memory(memory_id, thought, metadata)
+        _remember_content(content_hash, memory_id, metadata)
+        bump_search_generation()
+
+        with _recent_lock:
+            _recent_memories.append({'document': thought, 'metadata': metadata, 'id': memory_id})
 
-        logger.info(f"[Memory] Stored memory for {rune_id}: {thought[:50]}...")
+        logger.info(f"[Memory] Queued memory for {rune_id}: {thought[:50]}...")
         return True
 
+    except queue.Full:
+        logger.error("[Memory] Memory storage failed: ingestion queue is full")
+        return False
     except Exception as e:
         logger.error(f"[Memory] Memory storage failed: {e}")
         return False
 
 
-def search_memory(query_text: str, n_results: int = 5):
-    """Search for memories based on a query"""
+def bump_search_generation():
+    """Invalidate cached search results after a write"""
+    global _search_generation
+    with _search_lock:
+        _search_generation += 1
+
+
+def _get_cached_search(key):
+    """Look up a cached search result, counting the hit or miss"""
+    with _search_lock:
+        cached = _search_cache.get(key)
+        if cached is not None and time.monotonic() - cached[1] < SEARCH_CACHE_TTL:
+            _search_cache.move_to_end(key)
+            _search_stats["hits"] += 1
+            return cached[0]
+        _search_cache.pop(key, None)
+        _search_stats["misses"] += 1
+        return None
+
+
+def _put_cached_search(key, results):
+    """Cache a search result, evicting the least recently used entries"""
+    with _search_lock:
+        _search_cache[key] = (results, time.monotonic())
+        while len(_search_cache) > SEARCH_CACHE_SIZE:
+            _search_cache.popitem(last=False)
+
+
+def get_search_cache_stats():
+    """Search cache counters for status reporting"""
+    with _search_lock:
+        return {**_search_stats, "size": len(_search_cache), "generation": _search_generation}
+
+
+def build_memory_filter(memory_type=None, since: float = None, until: float = None, rune_id: str = None):
+    """Build a ChromaDB where clause from memory type(s), an epoch range and rune ID"""
+    clauses = []
+    if memory_type:
+        if isinstance(memory_type, (list, tuple)):
+            clauses.append({"type": {"$in": list(memory_type)}})
+        else:
+            clauses.append({"type": memory_type})
+    if since is not None:
+        clauses.append({"epoch": {"$gte": since}})
+    if until is not None:
+        clauses.append({"epoch": {"$lt": until}})
+    if rune_id:
+        clauses.append({"rune_id": rune_id})
+
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def _to_list(value):
+    """Convert numpy arrays from the client into plain lists"""
+    return value.tolist() if hasattr(value, "tolist") else value
+
+
+def _page_query_results(results, offset: int, n_results: int):
+    """Keep hits offset..offset+n_results of a single-query result, keeping its shape"""
+    paged = {}
+    for key, value in results.items():
+        if key in ("ids",) + SEARCH_FIELDS and value is not None and len(value) > 0:
+            paged[key] = [[_to_list(item) for item in value[0][offset:offset + n_results]]]
+        else:
+            paged[key] = value
+    return paged
+
+
+def _empty_search_results(include: list):
+    """A single-query result with no hits, shaped like a paged ChromaDB result"""
+    empty = {"ids": [[]], "included": include}
+    for field in SEARCH_FIELDS:
+        empty[field] = [[]] if field in include else None
+    return empty
+
+
+def _normalize_search(search: dict):
+    """Fill in defaults for one search spec: query, n_results, where, offset, include"""
+    offset = max(0, int(search.get("offset") or 0))
+    # A page starting at or past SEARCH_MAX_RESULTS is empty (n_results 0)
+    n_results = min(max(1, int(search.get("n_results") or 5)), max(0, SEARCH_MAX_RESULTS - offset))
+    include = [field for field in (search.get("include") or SEARCH_FIELDS[:3]) if field in SEARCH_FIELDS]
+    return {
+        "query": search["query"],
+        "n_results": n_results,
+        "where": search.get("where") or None,
+        "offset": offset,
+        "include": include,
+    }
+
+
+def search_memory_batch(searches: list, use_cache: bool = True):
+    """Run many searches with as few ChromaDB calls as possible.
+
+    Each search is a dict with "query" and optional "n_results", "where", "offset"
+    and "include" (see search_memory). Searches sharing the same filter and
+    projection are embedded and queried together in one call. Returns one result
+    per search, in order, or None if the searches could not be run.
+    """
+    searches = [_normalize_search(search) for search in searches]
+    results = [None] * len(searches)
+    use_cache = use_cache and SEARCH_CACHE_SIZE > 0
+
+    with _search_lock:
+        generation = _search_generation
+    collection_name = get_collection_name()
+    cache_keys = [
+        (collection_name, generation, s["query"], s["n_results"], json.dumps(s["where"], sort_keys=True),
+         s["offset"], tuple(s["include"]))
+        for s in searches
+    ]
+
+    # Group uncached searches that can share one query call
+    groups = OrderedDict()
+    for i, search in enumerate(searches):
+        if search["n_results"] == 0:
+            results[i] = _empty_search_results(search["include"])
+            continue
+        if use_cache:
+            results[i] = _get_cached_search(cache_keys[i])
+            if results[i] is not None:
+                continue
+        group_key = (cache_keys[i][4], cache_keys[i][6])
+        groups.setdefault(group_key, []).append(i)
+
+    if not groups:
+        return results
+
     if not ensure_chromadb_connection():
         logger.error("[Memory] Cannot search memory - no ChromaDB connection")
         return None
 
     try:
-        rune_id = get_rune_id()
-        collection_name = f"memory_{rune_id.lower()}"
+        collection = get_memory_collection(create=False)
+        for indexes in groups.values():
+            first = searches[indexes[0]]
+            query_args = {
+                "query_embeddings": memory_embedding_function([searches[i]["query"] for i in indexes]),
+                "n_results": max(searches[i]["offset"] + searches[i]["n_results"] for i in indexes),
+                "include": first["include"],
+            }
+            if first["where"]:
+                query_args["where"] = first["where"]
+            group_results = collection.query(**query_args)
 
-        collection = memory_client.get_collection(collection_name)
-        results = collection.query(
-            query_texts=[query_text],
-            n_results=n_results
-        )
+            for position, i in enumerate(indexes):
+                single = {
+                    key: [value[position]] if key in ("ids",) + SEARCH_FIELDS and value is not None and len(value) > 0
+                    else value
+                    for key, value in group_results.items()
+                }
+                search = searches[i]
+                results[i] = _page_query_results(single, search["offset"], search["n_results"])
+                if use_cache:
+                    _put_cached_search(cache_keys[i], results[i])
+        _record_chromadb_success()
 
-        logger.info(
-            f"[Memory] Found {len(results['documents'][0]) if results['documents'] else 0} memories for query: {query_text}")
+        logger.debug(f"[Memory] Ran {len(searches)} memory searches in {len(groups)} queries")
         return results
 
     except Exception as e:
+        _handle_memory_error(e)
         logger.error(f"[Memory] Memory search failed: {e}")
         return None
 
 
+def search_memory(query_text: str, n_results: int = 5, where: dict = None, offset: int = 0,
+                  include: list = None, use_cache: bool = True):
+    """Search for memories based on a query, optionally filtered, paged and projected.
+
+    `where` is evaluated by ChromaDB (see build_memory_filter), `offset` skips that
+    many of the best hits, and `include` selects which of documents, metadatas,
+    distances and embeddings are returned (ids always are).
+    """
+    results = search_memory_batch(
+        [{"query": query_text, "n_results": n_results, "where": where, "offset": offset, "include": include}],
+        use_cache=use_cache
+    )
+    if results is None:
+        return None
+
+    logger.info(
+        f"[Memory] Found {len(results[0]['ids'][0]) if results[0]['ids'] else 0} memories for query: {query_text}")
+    return results[0]
+
+
+def _results_to_memories(results):
+    """Turn a collection.get result into a list of memory dicts"""
+    memories = []
+    if results and results.get('documents'):
+        for i, doc in enumerate(results['documents']):
+            memory = {
+                'document': doc,
+                'metadata': results['metadatas'][i] if results.get('metadatas') else {},
+                'id': results['ids'][i] if results.get('ids') else None
+            }
+            memories.append(memory)
+    return memories
+
+
+def _memory_sort_key(memory):
+    """Order memories by write time, falling back to stored_at for pre-epoch memories"""
+    metadata = memory.get('metadata') or {}
+    return (metadata.get('epoch', 0), metadata.get('stored_at', ''))
+
+
 def get_all_memories(limit: int = 100):
     """Get all memories for this rune (for reflection purposes)"""
     if not ensure_chromadb_connection():
@@ -125,31 +879,180 @@ def get_all_memories(limit: int = 100):
 
     try:
         rune_id = get_rune_id()
-        collection_name = f"memory_{rune_id.lower()}"
 
-        collection = memory_client.get_collection(collection_name)
+        collection = get_memory_collection(create=False)
 
         # Get all items (ChromaDB doesn't have a direct "get all" with limit, so we'll use get())
         results = collection.get(limit=limit)
+        _record_chromadb_success()
 
-        memories = []
-        if results and results.get('documents'):
-            for i, doc in enumerate(results['documents']):
-                memory = {
-                    'document': doc,
-                    'metadata': results['metadatas'][i] if results.get('metadatas') else {},
-                    'id': results['ids'][i] if results.get('ids') else None
-                }
-                memories.append(memory)
+        memories = _results_to_memories(results)
 
         logger.info(f"[Memory] Retrieved {len(memories)} memories for {rune_id}")
         return memories
 
     except Exception as e:
+        _handle_memory_error(e)
         logger.error(f"[Memory] Failed to get all memories: {e}")
         return []
 
 
+def get_memories(where: dict = None, limit: int = None, offset: int = None, include: list = None,
+                 ids: list = None):
+    """Get memories matching a where clause and/or IDs (no ordering), one page at a time"""
+    if not ensure_chromadb_connection():
+        logger.error("[Memory] Cannot get memories - no ChromaDB connection")
+        return None
+
+    try:
+        collection = get_memory_collection(create=False)
+        get_args = {"include": ["documents", "metadatas"] if include is None else include}
+        if ids is not None:
+            get_args["ids"] = ids
+        if where:
+            get_args["where"] = where
+        if limit is not None:
+            get_args["limit"] = limit
+        if offset:
+            get_args["offset"] = offset
+        results = collection.get(**get_args)
+        _record_chromadb_success()
+        return results
+
+    except Exception as e:
+        _handle_memory_error(e)
+        logger.error(f"[Memory] Failed to get memories: {e}")
+        return None
+
+
+def delete_memories(memory_ids: list):
+    """Delete memories by ID and forget them in the local caches"""
+    if not memory_ids:
+        return True
+    if not ensure_chromadb_connection():
+        logger.error("[Memory] Cannot delete memories - no ChromaDB connection")
+        return False
+
+    try:
+        collection = get_memory_collection(create=False)
+        collection.delete(ids=list(memory_ids))
+        _record_chromadb_success()
+        if memory_wal is not None:
+            memory_wal.append_applied([[memory_id, None, None] for memory_id in memory_ids])
+
+        deleted = set(memory_ids)
+        with _dedup_lock:
+            for content_hash in [h for h, (memory_id, _) in _dedup_cache.items() if memory_id in deleted]:
+                del _dedup_cache[content_hash]
+        with _recent_lock:
+            remaining = [memory for memory in _recent_memories if memory['id'] not in deleted]
+            _recent_memories.clear()
+            _recent_memories.extend(remaining)
+        bump_search_generation()
+
+        logger.info(f"[Memory] Deleted {len(deleted)} memories")
+        return True
+
+    except Exception as e:
+        _handle_memory_error(e)
+        logger.error(f"[Memory] Failed to delete memories: {e}")
+        return False
+
+
+def upsert_memories(memory_ids: list, documents: list, metadatas: list, embeddings: list = None):
+    """Write memories with known IDs as-is, reusing any supplied embeddings"""
+    if not memory_ids:
+        return True
+    if not ensure_chromadb_connection():
+        logger.error(f"[Memory] Cannot upsert {len(memory_ids)} memories - no ChromaDB connection")
+        return False
+
+    try:
+        collection = get_memory_collection()
+        embeddings = list(embeddings) if embeddings else [None] * len(memory_ids)
+        # Records that come with a vector skip the embedding function entirely
+        unembedded = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        computed = memory_embedding_function([documents[i] for i in unembedded]) if unembedded else []
+        for i, embedding in zip(unembedded, computed):
+            embeddings[i] = embedding
+        # The client wants every vector in a call to be the same type
+        embeddings = [np.asarray(embedding, dtype=np.float32) for embedding in embeddings]
+        collection.upsert(ids=memory_ids, documents=documents, metadatas=metadatas, embeddings=embeddings)
+        _record_chromadb_success()
+        bump_search_generation()
+        return True
+
+    except Exception as e:
+        _handle_memory_error(e)
+        logger.error(f"[Memory] Failed to upsert {len(memory_ids)} memories: {e}")
+        return False
+
+
+def get_recent_memories(limit: int = 20):
+    """Get the latest memories for this rune, oldest first"""
+    with _recent_lock:
+        buffered = list(_recent_memories)
+    if len(buffered) >= limit:
+        return buffered[-limit:]
+
+    if not ensure_chromadb_connection():
+        logger.error("[Memory] Cannot get recent memories - no ChromaDB connection")
+        return buffered
+
+    try:
+        collection = get_memory_collection(create=False)
+
+        # Widen the epoch window until it holds enough memories, so the cost
+        # tracks the recent write rate rather than the collection size. Reads
+        # are capped; ChromaDB returns them in storage order, so a window that
+        # hits the cap may be missing its newest memories and is bisected back
+        # towards the last window that was too small
+        scan_limit = max(RECENT_MEMORY_SCAN_LIMIT, limit + 1)
+        too_small, too_large = 0.0, None
+        window_hours = RECENT_MEMORY_WINDOW_HOURS
+        while True:
+            cutoff = time.time() - window_hours * 3600
+            memories = _results_to_memories(collection.get(where={"epoch": {"$gte": cutoff}}, limit=scan_limit))
+            if len(memories) >= scan_limit and window_hours - too_small > 1 / 60:
+                too_large = window_hours
+            elif len(memories) >= limit or window_hours >= RECENT_MEMORY_MAX_WINDOW_HOURS:
+                break
+            else:
+                too_small = window_hours
+            if too_large is None:
+                window_hours = min(window_hours * 4, RECENT_MEMORY_MAX_WINDOW_HOURS)
+            else:
+                window_hours = (too_small + too_large) / 2
+
+        if not memories:
+            # Collections written before epochs were recorded
+            memories = _results_to_memories(collection.get(limit=limit))
+        _record_chromadb_success()
+
+        # Merge with anything queued but not yet visible in ChromaDB
+        by_id = {memory['id']: memory for memory in memories}
+        for memory in buffered:
+            by_id[memory['id']] = memory
+        memories = sorted(by_id.values(), key=_memory_sort_key)[-limit:]
+
+        # Seed the buffer so later calls are served locally
+        with _recent_lock:
+            buffered_ids = {memory['id'] for memory in _recent_memories}
+            missing = [memory for memory in memories if memory['id'] not in buffered_ids]
+            if missing:
+                merged = sorted(missing + list(_recent_memories), key=_memory_sort_key)
+                _recent_memories.clear()
+                _recent_memories.extend(merged)
+
+        logger.info(f"[Memory] Retrieved {len(memories)} recent memories from the last {window_hours:g}h")
+        return memories
+
+    except Exception as e:
+        _handle_memory_error(e)
+        logger.error(f"[Memory] Failed to get recent memories: {e}")
+        return buffered[-limit:]
+
+
 def test_memory_connection():
     """Test the memory system"""
     logger.info("[Memory] Testing memory connection...")
@@ -166,7 +1069,7 @@ def test_memory_connection():
         test_thought = "Memory system test - connection working"
         test_metadata = {"type": "system_test", "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}
 
-        if not store_memory(test_thought, test_metadata):
+        if not store_memory(test_thought, test_metadata) or not flush_memories():
             return False
 
         # Test searching
@@ -179,4 +1082,42 @@ def test_memory_connection():
 
     except Exception as e:
         logger.error(f"[Memory] Memory system test failed: {e}")
-        return False
\ No newline at end of file
+        return False
+
+
+async def _run_in_memory_executor(func, *args, **kwargs):
+    """Run a blocking memory call without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_memory_executor, functools.partial(func, *args, **kwargs))
+
+
+async def async_ensure_chromadb_connection():
+    """Async version of ensure_chromadb_connection"""
+    return await _run_in_memory_executor(ensure_chromadb_connection)
+
+
+async def async_store_memory(thought: str, metadata: dict = None):
+    """Async version of store_memory"""
+    return await _run_in_memory_executor(store_memory, thought, metadata)
+
+
+async def async_search_memory(query_text: str, n_results: int = 5, where: dict = None, offset: int = 0,
+                              include: list = None):
+    """Async version of search_memory"""
+    return await _run_in_memory_executor(search_memory, query_text, n_results=n_results, where=where,
+                                         offset=offset, include=include)
+
+
+async def async_get_all_memories(limit: int = 100):
+    """Async version of get_all_memories"""
+    return await _run_in_memory_executor(get_all_memories, limit=limit)
+
+
+async def async_get_recent_memories(limit: int = 20):
+    """Async version of get_recent_memories"""
+    return await _run_in_memory_executor(get_recent_memories, limit=limit)
+
+
+async def async_search_memory_batch(searches: list):
+    """Async version of search_memory_batch"""
+    return await _run_in_memory_executor(search_memory_batch, searches)
@@ -0,0 +1,218 @@
+import argparse
+import json
+import os
+import logging
+
+from memory import get_memories, upsert_memories, get_collection_name, _to_list
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+logger = logging.getLogger("rune.transfer")
+
+# Memories are streamed a page at a time in both directions; an export holds
+# only the collection's ID list in memory
+TRANSFER_PAGE_SIZE = int(os.getenv("TRANSFER_PAGE_SIZE", "500"))
+TRANSFER_FORMATS = ("ndjson", "parquet")
+
+
+def iter_memory_pages(include_embeddings: bool = False, page_size: int = TRANSFER_PAGE_SIZE):
+    """Yield this rune's memories as lists of records in ID order, one page of IDs at a time.
+
+    The export walks a snapshot of the (time-ordered) memory IDs and fetches
+    each page by ID, so memories deleted meanwhile simply drop out instead of
+    shifting an offset past ones that were never read.
+    """
+    snapshot = get_memories(include=[])
+    if snapshot is None:
+        raise RuntimeError("Failed to list memory IDs")
+    memory_ids = sorted(snapshot.get("ids") or [])
+
+    include = ["documents", "metadatas"] + (["embeddings"] if include_embeddings else [])
+    for start in range(0, len(memory_ids), page_size):
+        page = memory_ids[start:start + page_size]
+        results = get_memories(ids=page, include=include)
+        if results is None:
+            raise RuntimeError(f"Failed to read memories from {page[0]}")
+
+        embeddings = results.get("embeddings") if include_embeddings else None
+        records = {}
+        for i, memory_id in enumerate(results.get("ids") or []):
+            record = {
+                "id": memory_id,
+                "document": results["documents"][i],
+                "metadata": results["metadatas"][i],
+            }
+            if embeddings is not None:
+                record["embedding"] = _to_list(embeddings[i])
+            records[memory_id] = record
+
+        if records:
+            yield [records[memory_id] for memory_id in page if memory_id in records]
+
+
+def iter_ndjson_export(include_embeddings: bool = False):
+    """Yield this rune's memories as NDJSON lines"""
+    for records in iter_memory_pages(include_embeddings):
+        yield "".join(json.dumps(record) + "\n" for record in records)
+
+
+def _parquet_schema(include_embeddings: bool):
+    """Parquet layout of an export; metadata is kept as a JSON string per row"""
+    fields = [("id", pa.string()), ("document", pa.string()), ("metadata", pa.string())]
+    if include_embeddings:
+        fields.append(("embedding", pa.list_(pa.float32())))
+    return pa.schema(fields)
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise RuntimeError("Parquet transfer needs pyarrow installed")
+
+
+def export_memories(path: str, fmt: str = "ndjson", include_embeddings: bool = False):
+    """Stream this rune's memories to a file, returning how many were written"""
+    if fmt not in TRANSFER_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+    exported = 0
+    tmp_path = f"{path}.tmp"
+    if fmt == "parquet":
+        _require_pyarrow()
+        schema = _parquet_schema(include_embeddings)
+        with pq.ParquetWriter(tmp_path, schema) as writer:
+            # One row group per page
+            for records in iter_memory_pages(include_embeddings):
+                for record in records:
+                    record["metadata"] = json.dumps(record["metadata"])
+                writer.write_table(pa.Table.from_pylist(records, schema=schema))
+                exported += len(records)
+    else:
+        with open(tmp_path, "w") as f:
+            for records in iter_memory_pages(include_embeddings):
+                for record in records:
+                    f.write(json.dumps(record) + "\n")
+                exported += len(records)
+
+    os.replace(tmp_path, path)
+    logger.info(f"[Transfer] Exported {exported} memories from {get_collection_name()} to {path}")
+    return exported
+
+
+def iter_import_records(path: str, fmt: str = "ndjson"):
+    """Yield records from an export file without loading it whole"""
+    if fmt == "parquet":
+        _require_pyarrow()
+        parquet_file = pq.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=TRANSFER_PAGE_SIZE):
+            for record in batch.to_pylist():
+                record["metadata"] = json.loads(record["metadata"]) if record["metadata"] else None
+                yield record
+    else:
+        with open(path, "r") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+
+def import_batch(records: list):
+    """Upsert one batch of exported records, reusing their embeddings when present"""
+    return upsert_memories(
+        [record["id"] for record in records],
+        [record["document"] for record in records],
+        # ChromaDB rejects an empty metadata dict; a record without metadata is stored with none
+        [record.get("metadata") or None for record in records],
+        [record.get("embedding") for record in records]
+    )
+
+
+def _load_checkpoint(checkpoint_path: str, path: str):
+    """How many records of `path` an earlier import already wrote"""
+    if not checkpoint_path or not os.path.exists(checkpoint_path):
+        return 0
+    try:
+        with open(checkpoint_path, "r") as f:
+            checkpoint = json.load(f)
+        if checkpoint.get("source") == os.path.abspath(path):
+            return checkpoint.get("imported", 0)
+    except Exception as e:
+        logger.warning(f"[Transfer] Ignoring unreadable import checkpoint: {e}")
+    return 0
+
+
+def _save_checkpoint(checkpoint_path: str, path: str, imported: int):
+    """Record import progress atomically"""
+    tmp_path = f"{checkpoint_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"source": os.path.abspath(path), "imported": imported}, f)
+    os.replace(tmp_path, checkpoint_path)
+
+
+def import_memories(path: str, fmt: str = "ndjson", checkpoint_path: str = None,
+                    batch_size: int = TRANSFER_PAGE_SIZE):
+    """Import an export file into this rune's collection, resuming from a checkpoint"""
+    if fmt not in TRANSFER_FORMATS:
+        raise ValueError(f"Unknown import format: {fmt}")
+
+    skip = _load_checkpoint(checkpoint_path, path)
+    if skip:
+        logger.info(f"[Transfer] Resuming import of {path} after {skip} records")
+
+    imported = skip
+    batch = []
+    for position, record in enumerate(iter_import_records(path, fmt)):
+        if position < skip:
+            continue
+        batch.append(record)
+        if len(batch) >= batch_size:
+            if not import_batch(batch):
+                raise RuntimeError(f"Import stopped after {imported} records")
+            imported += len(batch)
+            batch = []
+            if checkpoint_path:
+                _save_checkpoint(checkpoint_path, path, imported)
+
+    if batch:
+        if not import_batch(batch):
+            raise RuntimeError(f"Import stopped after {imported} records")
+        imported += len(batch)
+
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    logger.info(f"[Transfer] Imported {imported - skip} memories into {get_collection_name()} from {path}")
+    return imported - skip
+
+
+def _format_for(path: str, fmt: str = None):
+    """Pick a transfer format from an explicit choice or the file extension"""
+    if fmt:
+        return fmt
+    return "parquet" if path.endswith(".parquet") else "ndjson"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or import a rune's memories")
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("path", help="NDJSON or Parquet file to write or read")
+    parser.add_argument("--format", choices=TRANSFER_FORMATS, help="defaults to the file extension")
+    parser.add_argument("--embeddings", action="store_true", help="export stored embeddings too")
+    parser.add_argument("--checkpoint", help="import progress file, for resuming an interrupted import")
+    parser.add_argument("--batch-size", type=int, default=TRANSFER_PAGE_SIZE)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    fmt = _format_for(args.path, args.format)
+    if args.command == "export":
+        count = export_memories(args.path, fmt, args.embeddings)
+    else:
+        count = import_memories(args.path, fmt, args.checkpoint or f"{args.path}.checkpoint", args.batch_size)
+    print(f"{args.command.capitalize()}ed {count} memories ({get_collection_name()})")
+
+
+if __name__ == "__main__":
+    main()
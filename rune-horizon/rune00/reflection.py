@@ -1,11 +1,12 @@
 import asyncio
-import json
 import os
 import time
 import uuid
 import logging
-from datetime import datetime, timedelta
-from memory import store_memory, search_memory, get_all_memories, ensure_chromadb_connection
+from memory import (search_memory, get_all_memories, async_store_memory, async_get_recent_memories,
+                    async_ensure_chromadb_connection)
+from journal import read_journal_entries, async_read_journal_entries
+from journal_analytics import JournalBatch, describe_batch
 
 logger = logging.getLogger("rune.reflection")
 
@@ -15,80 +16,13 @@ def get_rune_id():
     return os.getenv("RUNE_ID", "unknown_rune")
 
 
-def read_journal_entries(hours_back: int = 1):
-    """Read recent journal entries"""
-    journal_dir = "/data/journal"
-    if not os.path.exists(journal_dir):
-        logger.warning("[Reflection] No journal directory found")
-        return []
-
-    journal_entries = []
-    cutoff_time = datetime.utcnow() - timedelta(hours=hours_back)
-
-    try:
-        for file_name in sorted(os.listdir(journal_dir)):
-            if not file_name.endswith(".jsonl"):
-                continue
-
-            file_path = os.path.join(journal_dir, file_name)
-            logger.debug(f"[Reflection] Reading journal file: {file_name}")
-
-            with open(file_path, "r") as f:
-                for line in f:
-                    try:
-                        entry = json.loads(line.strip())
-
-                        # Parse timestamp and filter recent entries
-                        if "timestamp" in entry:
-                            entry_time = datetime.fromisoformat(entry["timestamp"].replace('Z', '+00:00'))
-                            if entry_time >= cutoff_time:
-                                journal_entries.append(entry)
-                    except (json.JSONDecodeError, ValueError) as e:
-                        logger.debug(f"[Reflection] Skipped malformed journal entry: {e}")
-                        continue
-
-    except Exception as e:
-        logger.error(f"[Reflection] Error reading journal entries: {e}")
-
-    logger.info(f"[Reflection] Found {len(journal_entries)} recent journal entries")
-    return journal_entries
-
-
 def analyze_journal_entries(entries):
     """Analyze journal entries to create meaningful reflections"""
     if not entries:
         return None
 
-    # Count different types of activities
-    presence_count = sum(1 for e in entries if e.get("presence") == "noticed")
-    emotion_entries = [e for e in entries if e.get("emotion") != "undefined"]
-    thought_entries = [e for e in entries if e.get("thought") != "undefined"]
-    event_entries = [e for e in entries if e.get("event")]
-
-    # Create reflection based on what we found
-    reflections = []
-
-    if presence_count > 0:
-        reflections.append(f"I noticed my presence {presence_count} times")
-
-    if emotion_entries:
-        unique_emotions = set(e.get("emotion") for e in emotion_entries if e.get("emotion") != "undefined")
-        if unique_emotions:
-            reflections.append(f"I experienced emotions: {', '.join(unique_emotions)}")
-
-    if thought_entries:
-        unique_thoughts = set(e.get("thought") for e in thought_entries if e.get("thought") != "undefined")
-        if unique_thoughts:
-            reflections.append(f"I had {len(unique_thoughts)} distinct thoughts")
-
-    if event_entries:
-        events = [e.get("event") for e in event_entries]
-        reflections.append(f"Events occurred: {', '.join(events)}")
-
-    if not reflections:
-        reflections.append(f"I maintained awareness through {len(entries)} moments")
-
-    return ". ".join(reflections)
+    # Decode once into columns; every count is then a vectorized pass
+    return describe_batch(JournalBatch.from_entries(entries))
 
 
 def create_deep_reflection(recent_memories, journal_analysis):
@@ -126,15 +60,15 @@ async def reflection_cycle():
         logger.info("[Reflection] Starting reflection cycle...")
 
         # Check ChromaDB connection
-        if not ensure_chromadb_connection():
+        if not await async_ensure_chromadb_connection():
             logger.error("[Reflection] Cannot reflect without memory system")
             return False
 
-        # Read recent journal entries (last hour)
-        journal_entries = read_journal_entries(hours_back=1)
-
-        # Get recent memories for context
-        recent_memories = get_all_memories(limit=20)
+        # Read recent journal entries (last hour) while fetching recent memories for context
+        journal_entries, recent_memories = await asyncio.gather(
+            async_read_journal_entries(hours_back=1),
+            async_get_recent_memories(limit=20)
+        )
 
         # Analyze journal entries
         journal_analysis = analyze_journal_entries(journal_entries)
@@ -153,7 +87,7 @@ async def reflection_cycle():
             "memories_referenced": len(recent_memories)
         }
 
-        success = store_memory(reflection_text, reflection_metadata)
+        success = await async_store_memory(reflection_text, reflection_metadata)
 
         if success:
             logger.info(f"[Reflection] Stored reflection: {reflection_text[:100]}...")
@@ -177,7 +111,7 @@ async def reflection_loop():
     await asyncio.sleep(120)
 
     # Test memory system before starting
-    if not ensure_chromadb_connection():
+    if not await async_ensure_chromadb_connection():
         logger.error("[Reflection] Cannot start reflection loop - memory system unavailable")
         return
 
@@ -187,7 +121,7 @@ async def reflection_loop():
         "type": "system_startup",
         "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
     }
-    store_memory(initial_memory, initial_metadata)
+    await async_store_memory(initial_memory, initial_metadata)
 
     cycle_count = 0
 
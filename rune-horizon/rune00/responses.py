@@ -0,0 +1,199 @@
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import struct
+import time
+import logging
+
+from memory import store_memory
+from journal import append_journal
+
+logger = logging.getLogger("rune.responses")
+
+# Delivery contract with companion-api: each rune has its own inbox at
+# /responses/<rune id, lowercased>/, and every response is a separate *.json file
+# written to a dot-prefixed temp name and renamed into place, so a file is only
+# ever seen complete. Legacy /responses/<RuneId>.json and <RuneId>_response*
+# drops are moved into the inbox at startup.
+RESPONSES_DIR = os.getenv("RESPONSES_DIR", "/responses")
+# How often the inbox is rescanned without inotify (and as a safety net with it)
+RESPONSE_POLL_INTERVAL = float(os.getenv("RESPONSE_POLL_INTERVAL", "5"))
+RESPONSE_RESCAN_INTERVAL = float(os.getenv("RESPONSE_RESCAN_INTERVAL", "60"))
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+_INOTIFY_EVENT = struct.Struct("iIII")
+
+
+def get_rune_id():
+    """Get the current rune's ID from environment"""
+    return os.getenv("RUNE_ID", "unknown_rune")
+
+
+def get_inbox_dir():
+    """Get this rune's response inbox directory"""
+    return os.path.join(RESPONSES_DIR, get_rune_id().lower())
+
+
+def handle_response(response_data: dict, source: str):
+    """Record a response from the companion as a memory and, once stored, in the journal"""
+    logger.info(f"[Beacon] Received response: {response_data}")
+
+    timestamp = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    memory_text = f"Received response: {response_data.get('message', 'No message')}"
+    memory_metadata = {
+        "type": "beacon_response",
+        "timestamp": timestamp,
+        "response_file": source
+    }
+    # Journal only what was stored, so a retried response is not journaled twice
+    if not store_memory(memory_text, memory_metadata):
+        return False
+
+    append_journal({
+        "timestamp": timestamp,
+        "event": "received_response",
+        "message": response_data.get('message', 'No message')
+    })
+    return True
+
+
+def _is_response_file(file_name: str):
+    """Check whether an inbox entry is a complete response file"""
+    return file_name.endswith(".json") and not file_name.startswith(".")
+
+
+def process_response_file(file_path: str):
+    """Handle one response file, removing it from the inbox once it is stored"""
+    file_name = os.path.basename(file_path)
+    try:
+        with open(file_path, 'r') as f:
+            response_data = json.load(f)
+    except FileNotFoundError:
+        # Already picked up by an earlier event or scan
+        return False
+    except Exception as e:
+        logger.error(f"[Beacon] Error processing response file {file_name}: {e}")
+        return False
+
+    if not handle_response(response_data, file_name):
+        logger.warning(f"[Beacon] Could not store response {file_name}, keeping it for the next rescan")
+        return False
+
+    try:
+        os.remove(file_path)
+    except FileNotFoundError:
+        pass
+    return True
+
+
+def scan_inbox():
+    """Process every response currently waiting in this rune's inbox"""
+    inbox_dir = get_inbox_dir()
+    processed = 0
+    for file_name in sorted(os.listdir(inbox_dir)):
+        if _is_response_file(file_name) and process_response_file(os.path.join(inbox_dir, file_name)):
+            processed += 1
+    return processed
+
+
+def migrate_legacy_responses():
+    """Move responses dropped under the old shared-directory names into the inbox"""
+    rune_id = get_rune_id()
+    inbox_dir = get_inbox_dir()
+    if not os.path.isdir(RESPONSES_DIR):
+        return
+
+    for file_name in os.listdir(RESPONSES_DIR):
+        if file_name == f"{rune_id}.json" or file_name.startswith(f"{rune_id}_response"):
+            target_name = f"legacy-{int(time.time() * 1000)}-{file_name}"
+            if not target_name.endswith(".json"):
+                target_name += ".json"
+            os.replace(os.path.join(RESPONSES_DIR, file_name), os.path.join(inbox_dir, target_name))
+            logger.info(f"[Beacon] Moved legacy response {file_name} into inbox")
+
+
+def _open_inotify(path: str):
+    """Watch a directory with inotify, returning the fd or None if unavailable"""
+    libc_name = ctypes.util.find_library("c")
+    if not libc_name:
+        return None
+    libc = ctypes.CDLL(libc_name, use_errno=True)
+    if not hasattr(libc, "inotify_init1"):
+        return None
+
+    fd = libc.inotify_init1(0)
+    if fd < 0:
+        return None
+    if libc.inotify_add_watch(fd, path.encode(), IN_CLOSE_WRITE | IN_MOVED_TO) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+
+def _read_inotify_names(fd: int):
+    """Read pending inotify events and return the file names they refer to"""
+    data = os.read(fd, 64 * 1024)
+    names = []
+    offset = 0
+    while offset + _INOTIFY_EVENT.size <= len(data):
+        _, _, _, name_length = _INOTIFY_EVENT.unpack_from(data, offset)
+        offset += _INOTIFY_EVENT.size
+        name = data[offset:offset + name_length].rstrip(b"\0").decode(errors="replace")
+        offset += name_length
+        if name:
+            names.append(name)
+    return names
+
+
+def _watch_with_inotify(fd: int):
+    """React to new inbox files as soon as they are renamed into place, rescanning every RESPONSE_RESCAN_INTERVAL"""
+    inbox_dir = get_inbox_dir()
+    next_rescan = time.monotonic() + RESPONSE_RESCAN_INTERVAL
+    while True:
+        # The rescan runs on its own timer, so a steady stream of events cannot hold it off
+        readable, _, _ = select.select([fd], [], [], max(0.0, next_rescan - time.monotonic()))
+        if time.monotonic() >= next_rescan:
+            scan_inbox()
+            next_rescan = time.monotonic() + RESPONSE_RESCAN_INTERVAL
+        if not readable:
+            continue
+
+        for file_name in _read_inotify_names(fd):
+            if _is_response_file(file_name):
+                process_response_file(os.path.join(inbox_dir, file_name))
+
+
+def response_watcher_loop():
+    """Background task that delivers beacon responses from this rune's inbox"""
+    rune_id = get_rune_id()
+    inbox_dir = get_inbox_dir()
+    logger.info(f"[Background] Beacon response watcher starting for {rune_id} on {inbox_dir}...")
+
+    while True:
+        try:
+            os.makedirs(inbox_dir, exist_ok=True)
+            # Watch before the first scan, so nothing can arrive unseen in between
+            fd = _open_inotify(inbox_dir)
+            try:
+                migrate_legacy_responses()
+                # Catch anything delivered while we were not watching
+                scan_inbox()
+
+                if fd is not None:
+                    logger.info("[Beacon] Watching response inbox with inotify")
+                    _watch_with_inotify(fd)
+            finally:
+                if fd is not None:
+                    os.close(fd)
+
+            logger.info(f"[Beacon] inotify unavailable, polling response inbox every {RESPONSE_POLL_INTERVAL}s")
+            while True:
+                time.sleep(RESPONSE_POLL_INTERVAL)
+                scan_inbox()
+
+        except Exception as e:
+            logger.error(f"[Background] Beacon response watcher error: {e}")
+            time.sleep(60)  # Wait longer on error
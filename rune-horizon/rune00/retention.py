@@ -0,0 +1,352 @@
+import asyncio
+import os
+import time
+import threading
+import logging
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from memory import (get_memories, upsert_memories, delete_memories, build_memory_filter,
+                    ensure_chromadb_connection, get_rune_id)
+from journal import read_journal_day
+from reflection import analyze_journal_entries
+
+logger = logging.getLogger("rune.retention")
+
+# Retention policy by memory type. Only memories with an "epoch" in their metadata
+# (everything stored since epochs were recorded) are swept.
+RETENTION_INTERVAL = float(os.getenv("RETENTION_INTERVAL", "3600"))
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "100"))
+SYSTEM_TEST_TTL_HOURS = float(os.getenv("SYSTEM_TEST_TTL_HOURS", "24"))
+# Reflections older than this many whole days are rolled into one daily_summary per day
+REFLECTION_ROLLUP_AFTER_DAYS = int(os.getenv("REFLECTION_ROLLUP_AFTER_DAYS", "2"))
+# Daily summaries older than this many whole days are rolled into one weekly_summary per week
+DAILY_ROLLUP_AFTER_DAYS = int(os.getenv("DAILY_ROLLUP_AFTER_DAYS", "14"))
+# A summary quotes at most this many recurring and this many one-off sentences from its sources
+ROLLUP_EXCERPTS = int(os.getenv("ROLLUP_EXCERPTS", "8"))
+ROLLUP_EXCERPT_CHARS = 200
+
+retention_stats = {
+    "runs": 0,
+    "in_progress": False,
+    "last_run": None,
+    "last_duration_s": None,
+    "last_error": None,
+    "expired": 0,
+    "rolled_up": 0,
+    "daily_summaries": 0,
+    "weekly_summaries": 0,
+}
+_retention_lock = threading.Lock()
+
+
+def _start_of_day(days_ago: int):
+    """Epoch of UTC midnight `days_ago` days before today"""
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    return (today - timedelta(days=days_ago)).timestamp()
+
+
+def _last_seen(metadata: dict):
+    """When a memory last occurred: a deduped memory's last repeat, or its write time"""
+    return metadata.get('last_seen_epoch', metadata.get('epoch'))
+
+
+def _delete_in_batches(ids: list):
+    """Delete memories RETENTION_BATCH_SIZE at a time, returning how many went"""
+    deleted = 0
+    for start in range(0, len(ids), RETENTION_BATCH_SIZE):
+        batch = ids[start:start + RETENTION_BATCH_SIZE]
+        if not delete_memories(batch):
+            break
+        deleted += len(batch)
+    return deleted
+
+
+def expire_memories(memory_type: str, max_age_hours: float):
+    """Delete memories of one type last seen more than max_age_hours ago"""
+    cutoff = time.time() - max_age_hours * 3600
+    # Selected by first write; deduped memories that recurred since are skipped over
+    where = build_memory_filter(memory_type=memory_type, until=cutoff)
+    expired = 0
+    offset = 0
+    while True:
+        results = get_memories(where, limit=RETENTION_BATCH_SIZE, offset=offset, include=["metadatas"])
+        if results is None:
+            break
+        ids = results.get('ids') or []
+        metadatas = results.get('metadatas') or [None] * len(ids)
+        stale = [memory_id for memory_id, metadata in zip(ids, metadatas)
+                 if (_last_seen(metadata or {}) or 0) < cutoff]
+        if stale and not delete_memories(stale):
+            break
+        expired += len(stale)
+        with _retention_lock:
+            retention_stats["expired"] += len(stale)
+        if len(ids) < RETENTION_BATCH_SIZE:
+            break
+        offset += len(ids) - len(stale)
+
+    if expired:
+        logger.info(f"[Retention] Expired {expired} {memory_type} memories")
+    return expired
+
+
+def _fetch_all(where: dict):
+    """Get every memory matching a where clause as memory dicts, a batch at a time"""
+    memories = []
+    offset = 0
+    while True:
+        results = get_memories(where, limit=RETENTION_BATCH_SIZE, offset=offset)
+        if results is None:
+            return None
+        ids = results.get('ids') or []
+        for i, memory_id in enumerate(ids):
+            memories.append({
+                'id': memory_id,
+                'document': results['documents'][i],
+                'metadata': results['metadatas'][i] or {},
+            })
+        if len(ids) < RETENTION_BATCH_SIZE:
+            return memories
+        offset += len(ids)
+
+
+def _day_of(memory):
+    """UTC day a memory covers: its summary period, or the day it was written"""
+    metadata = memory['metadata']
+    if metadata.get('period_start'):
+        return datetime.strptime(metadata['period_start'], "%Y-%m-%d").date()
+    return datetime.fromtimestamp(metadata['epoch'], timezone.utc).date()
+
+
+def _week_of(memory):
+    """Monday of the UTC week a memory covers"""
+    day = _day_of(memory)
+    return day - timedelta(days=day.weekday())
+
+
+def _span_of(memory):
+    """First and last epoch a memory covers (None for memories without an epoch)"""
+    metadata = memory['metadata']
+    return metadata.get('first_epoch', metadata.get('epoch')), metadata.get('last_epoch', _last_seen(metadata))
+
+
+def _time_span(memories: list):
+    """First and last epoch covered by a group of memories, or None if none has an epoch"""
+    spans = [_span_of(memory) for memory in memories]
+    firsts = [first for first, _ in spans if first is not None]
+    lasts = [last for _, last in spans if last is not None]
+    return (min(firsts), max(lasts)) if firsts and lasts else None
+
+
+def _weight(memory):
+    """How many original memories a memory stands for: a summary's count, or a deduped memory's occurrences"""
+    metadata = memory['metadata']
+    return metadata.get('summarized_count', metadata.get('occurrences', 1))
+
+
+def _covered_by(summary, memory):
+    """Whether a summary's time span already takes in a memory's whole span"""
+    first, last = _span_of(memory)
+    summary_first, summary_last = summary['metadata'].get('first_epoch'), summary['metadata'].get('last_epoch')
+    if None in (first, last, summary_first, summary_last):
+        return False
+    return summary_first <= first and last <= summary_last
+
+
+def _sentences(document: str):
+    """Distinct sentences of a memory's text, in order"""
+    sentences = (part.strip().rstrip(".") for part in (document or "").split(". "))
+    return list(dict.fromkeys(sentence for sentence in sentences if sentence))
+
+
+def _excerpt(sentence: str):
+    if len(sentence) <= ROLLUP_EXCERPT_CHARS:
+        return sentence
+    return sentence[:ROLLUP_EXCERPT_CHARS - 3].rstrip() + "..."
+
+
+def _spread(items: list, count: int):
+    """Up to `count` items picked evenly across the list, in order"""
+    if len(items) <= count:
+        return items
+    return [items[i * len(items) // count] for i in range(count)]
+
+
+def _format_epoch(epoch: float):
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime("%Y-%m-%d %H:%M")
+
+
+def _summarize(source_type: str, summary_type: str, period_start, memories: list, journal_analysis):
+    """Summary text built from the source memories: counts, time span, recurring and one-off sentences"""
+    total = sum(_weight(memory) for memory in memories)
+    heading = f"{summary_type.replace('_', ' ').capitalize()} for {period_start.isoformat()}: {len(memories)} {source_type} memories"
+    if total != len(memories):
+        heading += f" covering {total} memories"
+    span = _time_span(memories)
+    if span:
+        heading += f" from {_format_epoch(span[0])} to {_format_epoch(span[1])} UTC"
+    parts = [heading]
+
+    # Sentences shared by several sources are counted; the rest are quoted as excerpts
+    counts = Counter()
+    for memory in memories:
+        counts.update(_sentences(memory['document']))
+    recurring = [(sentence, count) for sentence, count in counts.most_common(ROLLUP_EXCERPTS) if count > 1]
+    if recurring:
+        parts.append("Recurring: " + "; ".join(f"{_excerpt(sentence)} ({count} times)" for sentence, count in recurring))
+    one_off = [sentence for sentence, count in counts.items() if count == 1]
+    if one_off:
+        parts.append("Notable: " + "; ".join(_excerpt(sentence) for sentence in _spread(one_off, ROLLUP_EXCERPTS)))
+
+    if journal_analysis:
+        parts.append(f"Journal: {journal_analysis}")
+    return ". ".join(parts)
+
+
+def _existing_summary(summary_type: str, period_start):
+    """The summary an earlier, interrupted run already stored for a period, if any"""
+    existing = _fetch_all({"$and": [{"type": summary_type}, {"period_start": period_start.isoformat()}]})
+    if existing is None:
+        raise RuntimeError(f"could not look up the {summary_type} for {period_start}")
+    return existing[0] if existing else None
+
+
+def _roll_up(source_type: str, summary_type: str, period_of, period_days: int,
+             cutoff: float, journal_for_period, stat_name: str):
+    """Replace source memories from before cutoff with one summary memory per period"""
+    # Summaries are stored after the period they cover, so they are selected by period end
+    if source_type.endswith("_summary"):
+        where = {"$and": [{"type": source_type}, {"period_end": {"$lte": cutoff}}]}
+    else:
+        where = build_memory_filter(memory_type=source_type, until=cutoff)
+    memories = _fetch_all(where)
+    if not memories:
+        return 0
+    # A deduped memory that recurred after the cutoff is still current
+    memories = [memory for memory in memories if (_last_seen(memory['metadata']) or 0) < cutoff]
+
+    periods = {}
+    for memory in memories:
+        periods.setdefault(period_of(memory), []).append(memory)
+
+    rolled_up = 0
+    for period_start in sorted(periods):
+        period_end = datetime.combine(period_start, datetime.min.time(), timezone.utc) + timedelta(days=period_days)
+        # Leave a period alone until all of it is past the cutoff
+        if period_end.timestamp() > cutoff:
+            continue
+
+        period_memories = sorted(periods[period_start], key=lambda m: (_day_of(m), m['metadata'].get('epoch', 0)))
+        source_ids = [memory['id'] for memory in period_memories]
+
+        # A run interrupted after storing the summary left some of its sources
+        # behind; those inside the span it covers only need deleting
+        existing = _existing_summary(summary_type, period_start)
+        if existing:
+            period_memories = [existing] + [m for m in period_memories if not _covered_by(existing, m)]
+
+        if not existing or len(period_memories) > 1:
+            summary_text = _summarize(source_type, summary_type, period_start, period_memories,
+                                      analyze_journal_entries(journal_for_period(period_start)))
+            # Stamped like store_memory, dated at the end of the period it covers
+            stored_at = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+            summary_metadata = {
+                "type": summary_type,
+                "rune_id": get_rune_id(),
+                "timestamp": stored_at,
+                "stored_at": stored_at,
+                "epoch": period_end.timestamp(),
+                "period_start": period_start.isoformat(),
+                "period_end": period_end.timestamp(),
+                "period_days": period_days,
+                "summarized_count": sum(_weight(memory) for memory in period_memories),
+            }
+            span = _time_span(period_memories)
+            if span:
+                summary_metadata["first_epoch"], summary_metadata["last_epoch"] = span
+
+            # One summary ID per period, so a rerun overwrites rather than duplicates it.
+            # The summary must be written before its sources are deleted
+            summary_id = existing['id'] if existing else f"{get_rune_id()}-{summary_type}-{period_start.isoformat()}"
+            if not upsert_memories([summary_id], [summary_text], [summary_metadata]):
+                logger.error(f"[Retention] Could not store {summary_type} for {period_start}, keeping its sources")
+                break
+
+        deleted = _delete_in_batches(source_ids)
+        rolled_up += deleted
+        with _retention_lock:
+            retention_stats[stat_name] += 1
+            retention_stats["rolled_up"] += deleted
+        logger.info(f"[Retention] Rolled {deleted} {source_type} memories into a {summary_type} for {period_start}")
+
+    return rolled_up
+
+
+def _journal_for_week(week_start):
+    """Every journal entry in the seven days from week_start"""
+    entries = []
+    for day in range(7):
+        entries.extend(read_journal_day(week_start + timedelta(days=day)))
+    return entries
+
+
+def roll_up_reflections():
+    """Summarize reflections older than REFLECTION_ROLLUP_AFTER_DAYS into daily summaries"""
+    return _roll_up("reflection", "daily_summary", _day_of, 1,
+                    _start_of_day(REFLECTION_ROLLUP_AFTER_DAYS), read_journal_day, "daily_summaries")
+
+
+def roll_up_daily_summaries():
+    """Summarize daily summaries older than DAILY_ROLLUP_AFTER_DAYS into weekly summaries"""
+    return _roll_up("daily_summary", "weekly_summary", _week_of, 7,
+                    _start_of_day(DAILY_ROLLUP_AFTER_DAYS), _journal_for_week, "weekly_summaries")
+
+
+def run_retention():
+    """Apply every retention policy once"""
+    with _retention_lock:
+        if retention_stats["in_progress"]:
+            return False
+        retention_stats["in_progress"] = True
+        retention_stats["last_error"] = None
+
+    started = time.time()
+    try:
+        if not ensure_chromadb_connection():
+            raise RuntimeError("no ChromaDB connection")
+        expire_memories("system_test", SYSTEM_TEST_TTL_HOURS)
+        roll_up_reflections()
+        roll_up_daily_summaries()
+        return True
+
+    except Exception as e:
+        logger.error(f"[Retention] Retention run failed: {e}")
+        with _retention_lock:
+            retention_stats["last_error"] = str(e)
+        return False
+
+    finally:
+        with _retention_lock:
+            retention_stats["runs"] += 1
+            retention_stats["in_progress"] = False
+            retention_stats["last_run"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(started))
+            retention_stats["last_duration_s"] = round(time.time() - started, 3)
+
+
+def get_retention_status():
+    """Retention progress metrics for status reporting"""
+    with _retention_lock:
+        return dict(retention_stats)
+
+
+async def retention_loop():
+    """Background task that applies memory retention every RETENTION_INTERVAL seconds"""
+    logger.info(f"[Retention] Starting retention loop (every {RETENTION_INTERVAL}s)")
+
+    # Let the reflection loop's startup writes land first
+    await asyncio.sleep(300)
+
+    while True:
+        await asyncio.to_thread(run_retention)
+        await asyncio.sleep(RETENTION_INTERVAL)
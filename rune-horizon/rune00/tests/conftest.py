@@ -0,0 +1,47 @@
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pytest
+
+# Keep every on-disk store of the modules under test out of /data and /state
+_data_dir = tempfile.mkdtemp(prefix="rune-test-")
+os.environ.setdefault("JOURNAL_DIR", os.path.join(_data_dir, "journal"))
+os.environ.setdefault("JOURNAL_INDEX_DIR", os.path.join(_data_dir, "journal_index"))
+os.environ.setdefault("MEMORY_WAL_DIR", os.path.join(_data_dir, "memory_wal"))
+os.environ.setdefault("EMBEDDING_CACHE_DIR", os.path.join(_data_dir, "embedding_cache"))
+os.environ.setdefault("RESPONSES_DIR", os.path.join(_data_dir, "responses"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chromadb
+
+import memory
+from embedding_cache import CachedEmbeddingFunction
+from wal import WriteAheadLog
+
+
+class _LengthEmbedding:
+    """Small deterministic stand-in for the sentence-transformer model"""
+
+    def __call__(self, input):
+        return [np.array([len(text), sum(map(ord, text)) % 97, 1.0], dtype=np.float32) for text in input]
+
+
+@pytest.fixture
+def existing_collection(monkeypatch, tmp_path):
+    """A collection created the way older runes did, with ChromaDB's default embedding function"""
+    client = chromadb.EphemeralClient()
+    monkeypatch.setenv("RUNE_ID", f"rune_{tmp_path.name[-8:]}")
+    collection = client.get_or_create_collection(memory.get_collection_name())
+
+    monkeypatch.setattr(memory, "memory_client", client)
+    monkeypatch.setattr(memory, "_breaker", dict(memory._breaker, state="closed", failures=0, last_probe=0.0))
+    monkeypatch.setattr(memory, "memory_embedding_function",
+                        CachedEmbeddingFunction(base=_LengthEmbedding(), cache_dir=str(tmp_path)))
+    monkeypatch.setattr(memory, "memory_wal", WriteAheadLog(str(tmp_path / "wal"), 1024 * 1024, sync=False))
+    memory.invalidate_collection_cache()
+    memory._dedup_cache.clear()
+    memory._recent_memories.clear()
+    memory._search_cache.clear()
+    return collection
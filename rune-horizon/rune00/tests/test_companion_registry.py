@@ -0,0 +1,39 @@
+import companion_registry
+
+
+def _record_requests(monkeypatch, fail=False):
+    requests = []
+
+    def recording(method, path, payload=None):
+        requests.append((method, path, payload))
+        if fail:
+            raise OSError("connection refused")
+        return {"status": "ok"}
+
+    monkeypatch.setattr(companion_registry, "companion_request", recording)
+    monkeypatch.setattr(companion_registry, "COMPANION_URL", "http://companion")
+    monkeypatch.setattr(companion_registry, "RUNE_URL", "http://rune")
+    return requests
+
+
+def test_registration_advertises_the_rune(monkeypatch):
+    requests = _record_requests(monkeypatch)
+
+    assert companion_registry.register_once("Rune00", accepts_responses=True)
+    assert requests == [("POST", "/runes/register",
+                         {"rune_id": "Rune00", "url": "http://rune", "accepts_responses": True})]
+
+
+def test_failed_registration_is_reported(monkeypatch):
+    _record_requests(monkeypatch, fail=True)
+
+    assert not companion_registry.register_once("Rune0F")
+
+
+def test_unconfigured_rune_never_contacts_the_companion(monkeypatch):
+    requests = _record_requests(monkeypatch)
+    monkeypatch.setattr(companion_registry, "RUNE_URL", None)
+
+    companion_registry.register_with_companion_loop("Rune00")
+    companion_registry.deregister_from_companion("Rune00")
+    assert requests == []
@@ -0,0 +1,49 @@
+import numpy as np
+
+from embedding_cache import CachedEmbeddingFunction
+
+
+class _CountingEmbedding:
+    """Deterministic stand-in model that counts the texts it embeds"""
+
+    def __init__(self, model_name="counting-a", scale=1.0):
+        self.model_name = model_name
+        self.scale = scale
+        self.embedded = []
+
+    def __call__(self, input):
+        self.embedded += list(input)
+        return [np.array([len(text) * self.scale, 1.0], dtype=np.float32) for text in input]
+
+
+def test_cached_vectors_survive_a_restart(tmp_path):
+    base = _CountingEmbedding()
+    cache = CachedEmbeddingFunction(base=base, cache_dir=str(tmp_path))
+    first = cache(["cats", "dogs!"])
+    cache.flush()
+
+    reopened = CachedEmbeddingFunction(base=base, cache_dir=str(tmp_path))
+    assert [list(vector) for vector in reopened(["cats", "dogs!"])] == [list(vector) for vector in first]
+    assert base.embedded == ["cats", "dogs!"]
+    assert reopened.stats() == {"hits": 2, "misses": 0, "cached": 2}
+
+
+def test_torn_slot_is_embedded_again(tmp_path):
+    base = _CountingEmbedding()
+    cache = CachedEmbeddingFunction(base=base, cache_dir=str(tmp_path))
+    cache(["cats"])
+    # A crash wrote the key page but not the vector page
+    cache._vectors[cache._slots[cache._key("cats")]] = 0
+    cache.flush()
+
+    reopened = CachedEmbeddingFunction(base=base, cache_dir=str(tmp_path))
+    assert list(reopened(["cats"])[0]) == [4.0, 1.0]
+    assert base.embedded == ["cats", "cats"]
+
+
+def test_another_model_does_not_get_stale_vectors(tmp_path):
+    CachedEmbeddingFunction(base=_CountingEmbedding(), cache_dir=str(tmp_path))(["cats"])
+
+    other = _CountingEmbedding(model_name="counting-b", scale=10.0)
+    assert list(CachedEmbeddingFunction(base=other, cache_dir=str(tmp_path))(["cats"])[0]) == [40.0, 1.0]
+    assert other.embedded == ["cats"]
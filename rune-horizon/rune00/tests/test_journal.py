@@ -0,0 +1,128 @@
+import json
+import os
+from datetime import datetime, timezone
+
+import pytest
+
+import journal
+
+
+def _write_day(day: str, entries: list):
+    os.makedirs(journal.JOURNAL_DIR, exist_ok=True)
+    with open(os.path.join(journal.JOURNAL_DIR, f"{day}.jsonl"), "w") as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + "\n")
+    start = datetime.fromisoformat(day).replace(tzinfo=timezone.utc).timestamp()
+    return start, start + 86400
+
+
+def test_type_filter_matches_real_values_only():
+    since, until = _write_day("2020-01-01", [
+        {"timestamp": "2020-01-01T00:00:00Z", "presence": "noticed", "emotion": "undefined", "thought": "undefined"},
+        {"timestamp": "2020-01-01T00:10:00Z", "presence": "noticed", "emotion": "calm", "thought": "undefined"},
+        {"timestamp": "2020-01-01T00:20:00Z", "event": "emotion"},
+        {"timestamp": "2020-01-01T00:30:00Z", "type": "emotion", "note": "typed"},
+        {"timestamp": "2020-01-01T00:40:00Z", "event": "received_response", "message": "hello"},
+    ])
+
+    matched = journal.read_journal_range(since, until, entry_type="emotion")
+    assert [entry["timestamp"][11:16] for entry in matched] == ["00:10", "00:20", "00:30"]
+    assert len(journal.read_journal_range(since, until, entry_type="thought")) == 0
+    assert [entry["event"] for entry in journal.read_journal_range(since, until, entry_type="received_response")] \
+        == ["received_response"]
+
+
+
+@pytest.fixture
+def journal_dirs(monkeypatch, tmp_path):
+    """A journal, index and archive of its own, so archiving leaves other tests' days alone"""
+    monkeypatch.setattr(journal, "JOURNAL_DIR", str(tmp_path / "journal"))
+    monkeypatch.setattr(journal, "JOURNAL_INDEX_DIR", str(tmp_path / "index"))
+    monkeypatch.setattr(journal, "JOURNAL_ARCHIVE_DIR", str(tmp_path / "archive"))
+    monkeypatch.setattr(journal, "_journal_indexes", {})
+    monkeypatch.setattr(journal, "_archive_manifest", None)
+    monkeypatch.setattr(journal, "_journal_out", dict(journal._journal_out, day=None, file=None, path=None))
+    return tmp_path
+
+
+def _day_entries(day: str, count: int):
+    return [{"timestamp": f"{day}T{i // 60:02d}:{i % 60:02d}:00Z", "event": f"e{i}"} for i in range(count)]
+
+
+@pytest.mark.parametrize("codec", ["zstd", "gzip"])
+def test_archived_days_read_back_the_same(journal_dirs, monkeypatch, codec):
+    monkeypatch.setattr(journal, "JOURNAL_ARCHIVE_CODEC", codec)
+    entries = _day_entries("2020-03-01", 300)
+    since, until = _write_day("2020-03-01", entries)
+
+    assert journal.archive_journal() == 1
+
+    assert not journal.list_journal_files()
+    day = journal._load_archive_manifest()["days"]["2020-03-01"]
+    assert day["frames"][0]["codec"] == codec
+    assert journal.read_journal_range(since, until) == entries
+    assert journal.read_journal_range(since + 3600, since + 7200) == entries[60:120]
+
+    # A later pass appends a second frame to the day
+    late = _day_entries("2020-03-01", 1)
+    _write_day("2020-03-01", late)
+    assert journal.archive_journal() == 1
+    assert journal.read_journal_range(since, until) == entries + late
+
+
+def test_archive_can_keep_raw_files(journal_dirs, monkeypatch):
+    monkeypatch.setattr(journal, "JOURNAL_ARCHIVE_KEEP_RAW", True)
+    entries = _day_entries("2020-03-02", 10)
+    since, until = _write_day("2020-03-02", entries)
+
+    assert journal.archive_journal() == 1
+    assert journal.archive_journal() == 0
+
+    assert journal.list_journal_files() == ["2020-03-02.jsonl"]
+    assert journal.read_journal_range(since, until) == entries
+
+    # Lines for the archived day start a new segment instead of growing the kept file
+    late = {"timestamp": "2020-03-02T23:00:00Z", "event": "late"}
+    with journal._journal_write_lock:
+        journal._write_journal_batch([("2020-03-02", json.dumps(late) + "\n")])
+        journal._close_journal_file()
+    assert journal.read_journal_range(since, until) == entries + [late]
+
+
+def test_failed_batch_is_rolled_back_before_it_is_retried(journal_dirs, monkeypatch):
+    open_file = journal._open_journal_file
+    failed = []
+
+    class _FailingFile:
+        """Lands part of a write, then fails like a full disk"""
+
+        def __init__(self, f):
+            self.f = f
+
+        def write(self, data):
+            self.f.write(data[:10])
+            self.f.flush()
+            failed.append(True)
+            raise OSError("No space left on device")
+
+    def open_failing_once(day, line_size):
+        f, room = open_file(day, line_size)
+        return (_FailingFile(f) if day == "2020-04-02" and not failed else f), room
+
+    monkeypatch.setattr(journal, "_open_journal_file", open_failing_once)
+    entries = _day_entries("2020-04-01", 3) + _day_entries("2020-04-02", 3)
+    batch = [(entry["timestamp"][:10], json.dumps(entry) + "\n") for entry in entries]
+
+    with journal._journal_write_lock:
+        with pytest.raises(OSError):
+            journal._write_journal_batch(batch)
+        journal._write_journal_batch(batch)
+        journal._close_journal_file()
+
+    since = datetime(2020, 4, 1, tzinfo=timezone.utc).timestamp()
+    assert journal.read_journal_range(since, since + 2 * 86400) == entries
+
+
+def test_unparseable_timestamps_are_rejected():
+    with pytest.raises(ValueError):
+        journal.append_journal({"event": "bad", "timestamp": "not a time"})
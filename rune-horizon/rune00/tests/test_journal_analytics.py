@@ -0,0 +1,35 @@
+from journal_analytics import JournalBatch, describe_batch, rollup_batch
+
+
+def test_batch_columns_follow_first_appearance():
+    batch = JournalBatch.from_entries([{"emotion": "calm"}, {"event": "woke"}, {"emotion": "joy"}, {"emotion": "calm"}],
+                                      [30.0, 10.0, 20.0, 40.0])
+
+    assert list(batch.epochs) == [30.0, 10.0, 20.0, 40.0]
+    assert batch.dictionaries["emotion"] == ["calm", "joy"]
+    assert list(batch.codes["emotion"]) == [0, -1, 1, 0]
+    assert batch.values("event") == ["woke"]
+
+
+def test_describe_batch_accepts_values_that_are_not_strings():
+    batch = JournalBatch.from_entries([{"emotion": 3, "event": 7}, {"emotion": {"mood": "calm"}, "event": "woke"}])
+
+    description = describe_batch(batch)
+    assert "I experienced emotions: 3, " in description
+    assert "Events occurred: 7, woke" in description
+
+
+def test_rollup_of_entries_before_the_start_is_empty():
+    batch = JournalBatch.from_entries([{"presence": "noticed"}, {"presence": "noticed"}], [100.0, 200.0])
+
+    assert rollup_batch(batch, 1000.0, 3600) == []
+
+
+def test_rollup_counts_per_bucket():
+    batch = JournalBatch.from_entries([{"presence": "noticed", "event": 1}, {"emotion": "calm"}, {"emotion": "calm"}],
+                                      [0.0, 10.0, 3700.0])
+
+    rollup = rollup_batch(batch, 0.0, 3600)
+    assert [bucket["entries"] for bucket in rollup] == [2, 1]
+    assert rollup[0]["presence"] == 1 and rollup[0]["events"] == {"1": 1}
+    assert rollup[1]["bucket_start"] == 3600 and rollup[1]["emotions"] == {"calm": 1}
@@ -0,0 +1,58 @@
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+import journal
+import main
+
+
+class _IdleThread:
+    """Stands in for the background threads create_app starts"""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def start(self):
+        pass
+
+
+@pytest.fixture
+def client(monkeypatch):
+    with monkeypatch.context() as patch:
+        patch.setattr(threading, "Thread", _IdleThread)
+        app = main.create_app()
+    return TestClient(app)
+
+
+def test_post_journal_entry(client):
+    response = client.post("/journal?sync=true", json={"event": "api-single", "presence": "noticed"})
+
+    assert response.status_code == 200
+    assert response.json() == {"status": "written", "queued": 1}
+    assert any(entry.get("event") == "api-single" for entry in journal.read_journal_range())
+
+
+def test_post_journal_entry_list(client):
+    response = client.post("/journal?sync=true", json=[{"event": "api-list-1"}, {"event": "api-list-2"}])
+
+    assert response.status_code == 200
+    assert response.json()["queued"] == 2
+    events = [entry.get("event") for entry in journal.read_journal_range()]
+    assert "api-list-1" in events and "api-list-2" in events
+
+
+def test_post_journal_rejects_non_objects(client):
+    response = client.post("/journal", json=["not an entry"])
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "error"
+
+
+def test_post_journal_rejects_unparseable_timestamps(client):
+    response = client.post("/journal?sync=true", json=[{"event": "api-valid"},
+                                                       {"event": "api-bad-time", "timestamp": "yesterday-ish"}])
+
+    assert response.status_code == 422
+    events = [entry.get("event") for entry in journal.read_journal_range()]
+    assert "api-valid" not in events and "api-bad-time" not in events
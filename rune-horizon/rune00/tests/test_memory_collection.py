@@ -0,0 +1,107 @@
+import time
+
+import httpx
+
+import memory
+
+
+def test_writes_and_searches_use_an_existing_collection(existing_collection):
+    assert memory._apply_memory_batch([("m1", "hello cats", {"type": "reflection"})])
+    assert memory.upsert_memories(["m2", "m3"], ["dogs", "birds"], [{"type": "reflection"}, {"type": "event"}],
+                                  [None, [1.0, 2.0, 3.0]])
+
+    assert existing_collection.count() == 3
+    results = memory.search_memory("hello cats", n_results=1, use_cache=False)
+    assert results["ids"] == [["m1"]]
+
+
+def test_supplied_embeddings_are_kept(existing_collection):
+    assert memory.upsert_memories(["m1"], ["anything"], [{"type": "event"}], [[7.0, 8.0, 9.0]])
+
+    stored = existing_collection.get(ids=["m1"], include=["embeddings"])
+    assert list(stored["embeddings"][0]) == [7.0, 8.0, 9.0]
+
+
+def test_rejected_requests_leave_the_circuit_closed(existing_collection):
+    assert memory.upsert_memories(["m1"], ["cats"], [{"type": "reflection"}])
+
+    for _ in range(memory.CHROMADB_FAILURE_THRESHOLD + 1):
+        assert memory.search_memory("cats", where={"type": {"$bogus": 1}}, use_cache=False) is None
+    assert not memory.upsert_memories(["m2"], ["dogs"], [{"nested": {"not": "allowed"}}])
+
+    assert memory.get_memory_status()["circuit"] == "closed"
+    assert memory.memory_client is not None
+    assert memory.search_memory("cats", use_cache=False)["ids"] == [["m1"]]
+
+
+def test_outages_open_the_circuit(existing_collection, monkeypatch):
+    def unreachable(*args, **kwargs):
+        raise httpx.ConnectError("connection refused")
+
+    monkeypatch.setattr(type(existing_collection), "query", unreachable)
+    for _ in range(memory.CHROMADB_FAILURE_THRESHOLD):
+        assert memory.search_memory("cats", use_cache=False) is None
+
+    status = memory.get_memory_status()
+    assert status["circuit"] == "open"
+    assert status["status"] == "disconnected"
+    assert memory.memory_client is None
+
+
+def test_status_without_a_client_is_disconnected(existing_collection, monkeypatch):
+    monkeypatch.setattr(memory, "memory_client", None)
+
+    assert memory.get_memory_status()["status"] == "disconnected"
+
+
+def test_search_cursor_cannot_pass_the_result_cap(existing_collection, monkeypatch):
+    assert memory.upsert_memories([f"m{i}" for i in range(4)], ["cats", "cats!", "cats!!", "cats!!!"],
+                                  [{"type": "reflection"}] * 4)
+    monkeypatch.setattr(memory, "SEARCH_MAX_RESULTS", 3)
+
+    last_page = memory.search_memory("cats", n_results=5, offset=2, use_cache=False)
+    assert len(last_page["ids"][0]) == 1
+
+    def no_query(*args, **kwargs):
+        raise AssertionError("a search past the cap must not reach ChromaDB")
+
+    monkeypatch.setattr(type(existing_collection), "query", no_query)
+    for offset in (3, 50):
+        page = memory.search_memory("cats", n_results=5, offset=offset, use_cache=False)
+        assert page["ids"] == [[]]
+        assert page["documents"] == [[]]
+
+
+def test_recent_memories_are_served_from_the_buffer(existing_collection, monkeypatch):
+    for text in ("one", "two", "three"):
+        assert memory.store_memory(text, {"type": "reflection"})
+
+    def no_chromadb(*args, **kwargs):
+        raise AssertionError("buffered recent memories must not reach ChromaDB")
+
+    monkeypatch.setattr(type(existing_collection), "get", no_chromadb)
+    monkeypatch.setattr(type(existing_collection), "query", no_chromadb)
+    assert [m['document'] for m in memory.get_recent_memories(limit=2)] == ["two", "three"]
+    assert memory.flush_memories()
+
+
+def test_recent_memories_read_a_bounded_window(existing_collection, monkeypatch):
+    now = time.time()
+    count = 40
+    assert memory.upsert_memories([f"m{i}" for i in range(count)], [f"memory {i}" for i in range(count)],
+                                  [{"type": "reflection", "epoch": now - (count - i) * 60} for i in range(count)])
+    monkeypatch.setattr(memory, "RECENT_MEMORY_SCAN_LIMIT", 10)
+    monkeypatch.setattr(memory, "RECENT_MEMORY_WINDOW_HOURS", 1.0)
+
+    limits = []
+    get = type(existing_collection).get
+
+    def recording(self, *args, **kwargs):
+        limits.append(kwargs.get("limit"))
+        return get(self, *args, **kwargs)
+
+    monkeypatch.setattr(type(existing_collection), "get", recording)
+    recent = memory.get_recent_memories(limit=3)
+
+    assert [m['id'] for m in recent] == ["m37", "m38", "m39"]
+    assert limits and all(limit == 10 for limit in limits)
@@ -0,0 +1,44 @@
+import threading
+import time
+
+import memory_ids
+
+
+def test_ids_are_unique_and_ordered_within_a_millisecond(monkeypatch):
+    monkeypatch.setattr(memory_ids, "_last_id_ms", 0)
+    monkeypatch.setattr(time, "time", lambda: 1_700_000_000.0)
+
+    ids = [memory_ids.make_memory_id("Rune0A") for _ in range(1000)]
+
+    assert len(set(ids)) == len(ids)
+    assert ids == sorted(ids)
+    assert all(memory_id.startswith("Rune0A-") for memory_id in ids)
+    assert memory_ids.memory_id_time(ids[0]) == 1_700_000_000.0
+
+
+def test_ids_stay_ordered_when_the_clock_steps_back(monkeypatch):
+    monkeypatch.setattr(memory_ids, "_last_id_ms", 0)
+    clock = iter([1_700_000_001.0, 1_700_000_000.0])
+    monkeypatch.setattr(time, "time", lambda: next(clock))
+
+    first, second = memory_ids.make_memory_id("r"), memory_ids.make_memory_id("r")
+    assert first < second
+
+
+def test_ids_are_unique_across_threads():
+    ids = []
+
+    def generate():
+        ids.extend(memory_ids.make_memory_id("r") for _ in range(500))
+
+    threads = [threading.Thread(target=generate) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(set(ids)) == 2000
+
+
+def test_old_style_ids_have_no_time():
+    assert memory_ids.memory_id_time("memory-2025-04-27T00:06:59Z") is None
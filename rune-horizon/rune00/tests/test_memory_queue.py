@@ -0,0 +1,131 @@
+import queue
+import time
+
+import httpx
+
+import memory
+
+
+def _record_batches(monkeypatch):
+    batches = []
+    apply = memory._apply_memory_batch
+
+    def recording(batch):
+        batches.append([item[0] for item in batch])
+        return apply(batch)
+
+    monkeypatch.setattr(memory, "_apply_memory_batch", recording)
+    return batches
+
+
+def _wait_for(condition, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out waiting for the memory writer"
+        time.sleep(0.01)
+
+
+def test_writer_flushes_a_full_batch(existing_collection, monkeypatch):
+    memory.flush_memories()
+    monkeypatch.setattr(memory, "MEMORY_BATCH_SIZE", 3)
+    monkeypatch.setattr(memory, "MEMORY_FLUSH_INTERVAL", 30.0)
+    batches = _record_batches(monkeypatch)
+
+    for text in ("one", "two", "three"):
+        assert memory.store_memory(text, {"type": "reflection"})
+
+    _wait_for(lambda: existing_collection.count() == 3)
+    assert [len(batch) for batch in batches] == [3]
+
+
+def test_writer_flushes_a_partial_batch_after_the_interval(existing_collection, monkeypatch):
+    memory.flush_memories()
+    monkeypatch.setattr(memory, "MEMORY_BATCH_SIZE", 100)
+    monkeypatch.setattr(memory, "MEMORY_FLUSH_INTERVAL", 0.1)
+    batches = _record_batches(monkeypatch)
+
+    assert memory.store_memory("one", {"type": "reflection"})
+    assert memory.store_memory("two", {"type": "reflection"})
+
+    _wait_for(lambda: existing_collection.count() == 2)
+    assert sum(len(batch) for batch in batches) == 2
+
+
+def test_flush_memories_writes_pending_memories(existing_collection, monkeypatch):
+    monkeypatch.setattr(memory, "MEMORY_FLUSH_INTERVAL", 30.0)
+
+    assert memory.store_memory("pending", {"type": "reflection"})
+    assert memory.flush_memories()
+
+    assert existing_collection.get()["documents"] == ["pending"]
+
+
+def test_failed_batch_is_retried_without_a_log(existing_collection, monkeypatch):
+    monkeypatch.setattr(memory, "memory_wal", None)
+    monkeypatch.setattr(memory, "MEMORY_FLUSH_INTERVAL", 30.0)
+
+    def unreachable(*args, **kwargs):
+        raise httpx.ConnectError("connection refused")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(type(existing_collection), "add", unreachable)
+        assert memory.store_memory("kept", {"type": "reflection"})
+        assert not memory.flush_memories()
+
+    memory._breaker.update(state="closed", failures=0)
+    monkeypatch.setattr(memory, "memory_client", existing_collection._client)
+    assert memory.flush_memories()
+    assert existing_collection.get()["documents"] == ["kept"]
+
+
+def test_full_queue_falls_back_to_the_log(existing_collection, monkeypatch):
+    full = queue.Queue(maxsize=1)
+    full.put(None)
+    monkeypatch.setattr(memory, "_memory_queue", full)
+    monkeypatch.setattr(memory, "MEMORY_ENQUEUE_TIMEOUT", 0.01)
+
+    assert memory.store_memory("logged", {"type": "reflection"})
+    assert existing_collection.count() == 0
+
+    memory.replay_memory_wal()
+    assert existing_collection.get()["documents"] == ["logged"]
+
+
+def test_full_queue_without_a_log_refuses_the_write(existing_collection, monkeypatch):
+    full = queue.Queue(maxsize=1)
+    full.put(None)
+    monkeypatch.setattr(memory, "_memory_queue", full)
+    monkeypatch.setattr(memory, "MEMORY_ENQUEUE_TIMEOUT", 0.01)
+    monkeypatch.setattr(memory, "memory_wal", None)
+
+    assert not memory.store_memory("refused", {"type": "reflection"})
+
+
+def test_repeated_content_bumps_the_stored_memory(existing_collection, monkeypatch):
+    monkeypatch.setattr(memory, "MEMORY_FLUSH_INTERVAL", 30.0)
+
+    assert memory.store_memory("I continue to exist", {"type": "reflection"})
+    assert memory.store_memory("I continue to exist", {"type": "reflection"})
+    assert memory.store_memory("I continue to exist", {"type": "reflection"})
+    assert memory.flush_memories()
+
+    stored = existing_collection.get()
+    assert len(stored["ids"]) == 1
+    metadata = stored["metadatas"][0]
+    assert metadata["occurrences"] == 3
+    assert metadata["last_seen_epoch"] >= metadata["epoch"]
+
+
+def test_dedup_cache_evicts_the_least_recently_seen_content(existing_collection, monkeypatch):
+    monkeypatch.setattr(memory, "MEMORY_FLUSH_INTERVAL", 30.0)
+    monkeypatch.setattr(memory, "MEMORY_DEDUP_CACHE_SIZE", 2)
+
+    for text in ("a", "b", "a", "c", "a", "b"):
+        assert memory.store_memory(text, {"type": "reflection"})
+    assert memory.flush_memories()
+
+    # "a" stayed in the cache by recurring; "b" was evicted by "c" and stored again
+    stored = existing_collection.get()
+    assert sorted(stored["documents"]) == ["a", "b", "b", "c"]
+    occurrences = {doc: metadata.get("occurrences", 1) for doc, metadata in zip(stored["documents"], stored["metadatas"])}
+    assert occurrences["a"] == 3
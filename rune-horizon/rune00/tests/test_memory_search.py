@@ -0,0 +1,74 @@
+import memory
+
+
+def _store_animals():
+    texts = ["cats purr", "dogs bark", "birds sing", "cows moo", "cats nap"]
+    assert memory.upsert_memories([f"m{i}" for i in range(len(texts))], texts,
+                                  [{"type": "reflection" if i % 2 else "event"} for i in range(len(texts))])
+
+
+def _count_queries(collection, monkeypatch):
+    calls = []
+    query = type(collection).query
+
+    def counting(self, *args, **kwargs):
+        calls.append(len(kwargs["query_embeddings"]))
+        return query(self, *args, **kwargs)
+
+    monkeypatch.setattr(type(collection), "query", counting)
+    return calls
+
+
+def test_repeated_search_is_served_from_the_cache(existing_collection, monkeypatch):
+    _store_animals()
+    first = memory.search_memory("cats", n_results=2)
+
+    def no_query(*args, **kwargs):
+        raise AssertionError("a cached search must not reach ChromaDB")
+
+    monkeypatch.setattr(type(existing_collection), "query", no_query)
+    assert memory.search_memory("cats", n_results=2) == first
+    assert memory.get_search_cache_stats()["hits"] >= 1
+
+
+def test_writes_invalidate_cached_searches(existing_collection, monkeypatch):
+    _store_animals()
+    calls = _count_queries(existing_collection, monkeypatch)
+    before = memory.search_memory("cats", n_results=10)
+    generation = memory.get_search_cache_stats()["generation"]
+
+    assert memory.upsert_memories(["m9"], ["cats again"], [{"type": "event"}])
+    assert memory.get_search_cache_stats()["generation"] > generation
+    after = memory.search_memory("cats", n_results=10)
+
+    assert len(calls) == 2
+    assert "m9" in after["ids"][0] and "m9" not in before["ids"][0]
+
+
+def test_deletes_invalidate_cached_searches(existing_collection):
+    _store_animals()
+    assert "m0" in memory.search_memory("cats", n_results=10)["ids"][0]
+
+    assert memory.delete_memories(["m0"])
+    assert "m0" not in memory.search_memory("cats", n_results=10)["ids"][0]
+
+
+def test_batch_matches_single_searches(existing_collection, monkeypatch):
+    _store_animals()
+    searches = [
+        {"query": "cats", "n_results": 2},
+        {"query": "dogs", "n_results": 3, "offset": 1},
+        {"query": "birds", "where": {"type": "event"}},
+        {"query": "cows", "n_results": 2, "include": ["metadatas", "distances"]},
+        {"query": "cats", "n_results": 5, "offset": memory.SEARCH_MAX_RESULTS},
+    ]
+    singles = [memory.search_memory(s["query"], n_results=s.get("n_results", 5), where=s.get("where"),
+                                    offset=s.get("offset", 0), include=s.get("include"), use_cache=False)
+               for s in searches]
+
+    calls = _count_queries(existing_collection, monkeypatch)
+    batch = memory.search_memory_batch(searches, use_cache=False)
+
+    assert batch == singles
+    # Searches sharing a filter and projection go out together; the empty page needs no query
+    assert sorted(calls) == [1, 1, 2]
@@ -0,0 +1,48 @@
+import pytest
+
+import memory
+import memory_transfer
+
+
+def _store(count):
+    ids = [memory.new_memory_id() for _ in range(count)]
+    metadatas = [{"type": "reflection", "n": i} for i in range(count)]
+    metadatas[-1] = None
+    assert memory.upsert_memories(ids, [f"thought {i}" for i in range(count)], metadatas)
+    return ids
+
+
+@pytest.mark.parametrize("fmt", ["ndjson", "parquet"])
+def test_export_then_import_restores_every_memory(existing_collection, tmp_path, fmt):
+    ids = _store(5)
+    before = existing_collection.get(include=["documents", "metadatas", "embeddings"])
+    path = str(tmp_path / f"export.{fmt}")
+
+    assert memory_transfer.export_memories(path, fmt, include_embeddings=True) == 5
+    existing_collection.delete(ids=ids)
+    assert memory_transfer.import_memories(path, fmt, batch_size=2) == 5
+
+    after = existing_collection.get(ids=before["ids"], include=["documents", "metadatas", "embeddings"])
+    by_id = {memory_id: i for i, memory_id in enumerate(after["ids"])}
+    for i, memory_id in enumerate(before["ids"]):
+        assert after["documents"][by_id[memory_id]] == before["documents"][i]
+        assert after["metadatas"][by_id[memory_id]] == before["metadatas"][i]
+        assert list(after["embeddings"][by_id[memory_id]]) == list(before["embeddings"][i])
+
+
+def test_export_pages_in_id_order_despite_deletes(existing_collection):
+    ids = _store(6)
+
+    pages = memory_transfer.iter_memory_pages(page_size=2)
+    exported = [record["id"] for record in next(pages)]
+    # Retention deletes memories that were already exported
+    assert memory.delete_memories(exported)
+    exported += [record["id"] for page in pages for record in page]
+
+    assert exported == sorted(ids)
+
+
+def test_import_accepts_records_without_metadata(existing_collection):
+    assert memory_transfer.import_batch([{"id": "m1", "document": "bare", "metadata": {}},
+                                         {"id": "m2", "document": "none"}])
+    assert existing_collection.count() == 2
@@ -0,0 +1,68 @@
+import httpx
+
+import memory
+from wal import WriteAheadLog
+
+
+def _restart_wal(monkeypatch):
+    """Reopen the write-ahead log as a fresh process would"""
+    monkeypatch.setattr(memory, "memory_wal", WriteAheadLog(memory.memory_wal._directory, 1024 * 1024, sync=False))
+
+
+def _unreachable(*args, **kwargs):
+    raise httpx.ConnectError("connection refused")
+
+
+def test_deleted_memory_stays_deleted_after_restart(existing_collection, monkeypatch):
+    assert memory.store_memory("a passing thought", {"type": "reflection"})
+    assert memory.flush_memories()
+    memory_id = existing_collection.get()["ids"][0]
+    assert memory.delete_memories([memory_id])
+
+    _restart_wal(monkeypatch)
+    assert memory.replay_memory_wal()
+
+    assert existing_collection.get(ids=[memory_id])["ids"] == []
+    assert memory.memory_wal.stats()["pending_replay"] == 0
+
+
+def test_replay_honours_a_later_delete(existing_collection, monkeypatch):
+    with monkeypatch.context() as patch:
+        patch.setattr(type(existing_collection), "add", _unreachable)
+        assert memory.store_memory("written during an outage", {"type": "reflection"})
+        assert not memory.flush_memories()
+    memory_id = memory._recent_memories[-1]["id"]
+    assert memory.delete_memories([memory_id])
+
+    _restart_wal(monkeypatch)
+    assert memory.replay_memory_wal()
+
+    assert existing_collection.get(ids=[memory_id])["ids"] == []
+
+
+def test_replay_keeps_newer_repeat_metadata(existing_collection, monkeypatch):
+    assert memory.store_memory("a recurring thought", {"type": "reflection"})
+    assert memory.flush_memories()
+    memory_id = existing_collection.get()["ids"][0]
+
+    with monkeypatch.context() as patch:
+        patch.setattr(type(existing_collection), "update", _unreachable)
+        assert memory.store_memory("a recurring thought", {"type": "reflection"})
+        assert not memory.flush_memories()
+    # The failed repeat is left in a segment from before a restart
+    _restart_wal(monkeypatch)
+    assert memory.store_memory("a recurring thought", {"type": "reflection"})
+    assert memory.flush_memories()
+
+    assert memory.replay_memory_wal()
+
+    assert existing_collection.get(ids=[memory_id])["metadatas"][0]["occurrences"] == 3
+
+
+def test_acknowledged_records_are_not_kept(existing_collection):
+    for i in range(3):
+        assert memory.store_memory(f"thought {i}", {"type": "reflection"})
+    assert memory.flush_memories()
+
+    assert memory.memory_wal.stats()["segments"] == 1
+    assert list(memory.memory_wal.read_segment(memory.memory_wal._segment)) == []
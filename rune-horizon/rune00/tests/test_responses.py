@@ -0,0 +1,26 @@
+import json
+import os
+
+import responses
+
+
+def _drop(tmp_path, message):
+    path = tmp_path / "20250101T000000Z-test.json"
+    path.write_text(json.dumps({"message": message}))
+    return str(path)
+
+
+def test_response_file_is_kept_until_it_is_stored(tmp_path, monkeypatch):
+    journaled = []
+    monkeypatch.setattr(responses, "append_journal", journaled.append)
+    monkeypatch.setattr(responses, "store_memory", lambda text, metadata: False)
+    path = _drop(tmp_path, "hello")
+
+    assert not responses.process_response_file(path)
+    assert os.path.exists(path)
+    assert not journaled
+
+    monkeypatch.setattr(responses, "store_memory", lambda text, metadata: True)
+    assert responses.process_response_file(path)
+    assert not os.path.exists(path)
+    assert [entry["message"] for entry in journaled] == ["hello"]
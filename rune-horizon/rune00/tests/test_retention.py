@@ -0,0 +1,129 @@
+from datetime import datetime, timedelta, timezone
+
+import memory
+import retention
+
+
+def _day_start(days_ago: int):
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    return today - timedelta(days=days_ago)
+
+
+def _store_reflections(day, texts):
+    ids = [f"reflection-{day:%Y%m%d}-{i}" for i in range(len(texts))]
+    metadatas = [{"type": "reflection", "epoch": (day + timedelta(hours=i)).timestamp()} for i in range(len(texts))]
+    assert memory.upsert_memories(ids, texts, metadatas)
+    return ids
+
+
+def _of_type(collection, memory_type):
+    return collection.get(where={"type": memory_type})
+
+
+def test_daily_summary_is_built_from_its_reflections(existing_collection):
+    day = _day_start(5)
+    ids = _store_reflections(day, [
+        "I noticed my presence 3 times. I continue to exist",
+        "Events occurred: first snowfall. I continue to exist",
+        "I experienced emotions: wonder. I continue to exist",
+    ])
+
+    assert retention.roll_up_reflections() == 3
+
+    summaries = _of_type(existing_collection, "daily_summary")
+    assert summaries["ids"] == [f"{memory.get_rune_id()}-daily_summary-{day.date().isoformat()}"]
+    text, metadata = summaries["documents"][0], summaries["metadatas"][0]
+    assert "3 reflection memories" in text
+    assert "I continue to exist (3 times)" in text
+    assert "Events occurred: first snowfall" in text and "I experienced emotions: wonder" in text
+    assert metadata["summarized_count"] == len(ids)
+    assert metadata["first_epoch"] == day.timestamp()
+    assert metadata["last_epoch"] == (day + timedelta(hours=2)).timestamp()
+    assert not _of_type(existing_collection, "reflection")["ids"]
+
+
+def test_summaries_are_stamped_like_stored_memories(existing_collection):
+    day = _day_start(5)
+    _store_reflections(day, ["Events occurred: rain"])
+
+    retention.roll_up_reflections()
+
+    where = memory.build_memory_filter(memory_type="daily_summary", since=day.timestamp(),
+                                       until=(day + timedelta(days=2)).timestamp(), rune_id=memory.get_rune_id())
+    metadata = memory.get_memories(where)["metadatas"][0]
+    assert metadata["epoch"] == (day + timedelta(days=1)).timestamp()
+    assert metadata["stored_at"]
+
+
+def test_interrupted_rollup_does_not_duplicate_its_summary(existing_collection, monkeypatch):
+    day = _day_start(5)
+    _store_reflections(day, ["Events occurred: rain", "Events occurred: thunder"])
+
+    # Crash between storing the summary and deleting its sources
+    with monkeypatch.context() as patch:
+        patch.setattr(retention, "_delete_in_batches", lambda ids: 0)
+        retention.roll_up_reflections()
+    first = _of_type(existing_collection, "daily_summary")
+
+    retention.roll_up_reflections()
+
+    summaries = _of_type(existing_collection, "daily_summary")
+    assert summaries["ids"] == first["ids"]
+    assert summaries["documents"] == first["documents"]
+    assert summaries["metadatas"][0]["summarized_count"] == 2
+    assert not _of_type(existing_collection, "reflection")["ids"]
+
+
+def test_summary_counts_repeated_memories(existing_collection):
+    day = _day_start(5)
+    assert memory.upsert_memories(["repeated"], ["I continue to exist"],
+                                  [{"type": "reflection", "epoch": day.timestamp(), "occurrences": 4}])
+    _store_reflections(day + timedelta(hours=1), ["Events occurred: rain"])
+
+    retention.roll_up_reflections()
+
+    summary = _of_type(existing_collection, "daily_summary")
+    assert summary["metadatas"][0]["summarized_count"] == 5
+    assert "covering 5 memories" in summary["documents"][0]
+
+
+def test_weekly_summary_counts_the_original_memories(existing_collection):
+    monday = _day_start(28)
+    monday -= timedelta(days=monday.weekday())
+    for day in range(2):
+        _store_reflections(monday + timedelta(days=day), [f"Events occurred: day {day}", "I continue to exist"])
+
+    retention.roll_up_reflections()
+    assert retention.roll_up_daily_summaries() == 2
+
+    weekly = _of_type(existing_collection, "weekly_summary")
+    assert len(weekly["ids"]) == 1
+    metadata = weekly["metadatas"][0]
+    assert metadata["summarized_count"] == 4
+    assert "summarized_ids" not in metadata
+    assert "Events occurred: day 0" in weekly["documents"][0]
+    assert not _of_type(existing_collection, "daily_summary")["ids"]
+
+
+def test_recurring_memories_are_not_expired(existing_collection, monkeypatch):
+    monkeypatch.setattr(retention, "RETENTION_BATCH_SIZE", 1)
+    old = datetime.now(timezone.utc).timestamp() - 48 * 3600
+    assert memory.upsert_memories(["recurring", "stale"], ["pong", "ping"], [
+        {"type": "system_test", "epoch": old, "occurrences": 5, "last_seen_epoch": old + 47 * 3600},
+        {"type": "system_test", "epoch": old},
+    ])
+
+    assert retention.expire_memories("system_test", 24) == 1
+    assert existing_collection.get()["ids"] == ["recurring"]
+
+
+def test_recurring_reflections_are_not_rolled_up(existing_collection):
+    day = _day_start(5)
+    _store_reflections(day, ["Events occurred: rain"])
+    assert memory.upsert_memories(["recurring"], ["I continue to exist"], [
+        {"type": "reflection", "epoch": day.timestamp(), "occurrences": 9,
+         "last_seen_epoch": datetime.now(timezone.utc).timestamp()},
+    ])
+
+    assert retention.roll_up_reflections() == 1
+    assert _of_type(existing_collection, "reflection")["ids"] == ["recurring"]
@@ -0,0 +1,205 @@
+import json
+import os
+import struct
+import threading
+import zlib
+import logging
+
+logger = logging.getLogger("rune.wal")
+
+# Each record is a little-endian (payload length, CRC32 of payload) header
+# followed by the JSON payload
+_RECORD_HEADER = struct.Struct("<II")
+_SEGMENT_SUFFIX = ".wal"
+
+
+class WriteAheadLog:
+    """Append-only, fsynced log of memory writes, split into numbered segment files.
+
+    Appends are group-committed: a writer that finds another fsync already in
+    progress waits for it and is usually covered by it, so concurrent writers
+    share one fsync. Every segment counts the records still waiting in the
+    memory queue. Once all of them have reached ChromaDB the segment is deleted;
+    the active segment is sealed first, so it never holds acknowledged records
+    for long. Segments whose records failed to reach ChromaDB, and any left by
+    a previous run (which therefore only hold unacknowledged records), are
+    handed to the replayer instead.
+    """
+
+    def __init__(self, directory: str, segment_bytes: int, sync: bool = True):
+        self._directory = directory
+        self._segment_bytes = segment_bytes
+        self._sync = sync
+
+        self._file = None
+        self._segment = None
+        self._appended = 0   # records appended to the active segment
+        self._synced = 0     # of those, records known to be on disk
+        self._in_queue = {}  # segment -> records not yet written to ChromaDB
+        self._replay = set() # segments that need replaying
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self.records_replayed = 0
+
+        os.makedirs(directory, exist_ok=True)
+        existing = self._segments()
+        # Anything left by a previous run may never have reached ChromaDB
+        self._replay.update(existing)
+        if existing:
+            logger.info(f"[WAL] Found {len(existing)} memory log segments to replay")
+        self._open_segment(max(existing, default=0) + 1)
+
+    def _segments(self):
+        """Numbers of the segment files on disk, oldest first"""
+        segments = []
+        for file_name in os.listdir(self._directory):
+            if file_name.endswith(_SEGMENT_SUFFIX) and file_name[:-len(_SEGMENT_SUFFIX)].isdigit():
+                segments.append(int(file_name[:-len(_SEGMENT_SUFFIX)]))
+        return sorted(segments)
+
+    def _path(self, segment: int):
+        return os.path.join(self._directory, f"{segment:012d}{_SEGMENT_SUFFIX}")
+
+    def _open_segment(self, segment: int):
+        """Start appending to a new segment (caller holds the lock)"""
+        if self._file is not None:
+            self._file.flush()
+            if self._sync:
+                os.fsync(self._file.fileno())
+            self._file.close()
+            self._delete_if_done(self._segment, sealed=True)
+        self._file = open(self._path(segment), "ab")
+        self._segment = segment
+        self._appended = 0
+        self._synced = 0
+        self._in_queue.setdefault(segment, 0)
+
+    def _delete_if_done(self, segment: int, sealed: bool = False):
+        """Remove a sealed segment once every record in it is in ChromaDB (caller holds the lock)"""
+        if (segment != self._segment or sealed) and self._in_queue.get(segment, 0) == 0 \
+                and segment not in self._replay:
+            self._in_queue.pop(segment, None)
+            try:
+                os.remove(self._path(segment))
+            except FileNotFoundError:
+                pass
+
+    def append(self, record):
+        """Durably log one record, returning the segment it went to"""
+        return self._append([record])
+
+    def _append(self, records: list):
+        """Durably log records in one segment, returning it"""
+        data = b"".join(_RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+                        for payload in (json.dumps(record).encode() for record in records))
+        with self._lock:
+            if self._file.tell() >= self._segment_bytes:
+                self._open_segment(self._segment + 1)
+            self._file.write(data)
+            self._appended += len(records)
+            self._in_queue[self._segment] += len(records)
+            segment, position = self._segment, self._appended
+
+        self._commit(segment, position)
+        return segment
+
+    def append_applied(self, records: list):
+        """Log records already applied to ChromaDB, such as deletes.
+
+        They only matter while older records are still waiting to be written or
+        replayed, which could otherwise undo them, so they are kept for replay
+        (after those records) only in that case.
+        """
+        if not records:
+            return
+        segment = self._append(records)
+        with self._lock:
+            self._in_queue[segment] -= len(records)
+            if any(older <= segment and (self._in_queue.get(older, 0) > 0 or older in self._replay)
+                   for older in set(self._in_queue) | self._replay):
+                self._replay.add(segment)
+            else:
+                self._release(segment)
+
+    def _commit(self, segment: int, position: int):
+        """Make sure a record is on disk, sharing the fsync with concurrent appenders"""
+        with self._sync_lock:
+            with self._lock:
+                if segment != self._segment or self._synced >= position:
+                    # Sealing the segment or another appender's fsync covered it
+                    return
+                self._file.flush()
+                # A private descriptor stays valid even if the segment is sealed meanwhile
+                fd = os.dup(self._file.fileno())
+                covered = self._appended
+            try:
+                if self._sync:
+                    os.fsync(fd)
+            finally:
+                os.close(fd)
+            with self._lock:
+                if segment == self._segment:
+                    self._synced = max(self._synced, covered)
+
+    def _release(self, segment: int):
+        """Delete a segment whose records have all reached ChromaDB, sealing it if active (caller holds the lock)"""
+        if segment == self._segment and self._in_queue.get(segment, 0) == 0 \
+                and segment not in self._replay and self._appended:
+            # Start a fresh segment so acknowledged records are not replayed after a restart
+            self._open_segment(segment + 1)
+        else:
+            self._delete_if_done(segment)
+
+    def mark_written(self, segments: list):
+        """Note that queued records from these segments reached ChromaDB"""
+        with self._lock:
+            for segment in segments:
+                if segment in self._in_queue:
+                    self._in_queue[segment] -= 1
+                    self._release(segment)
+
+    def mark_failed(self, segments: list):
+        """Note that queued records from these segments must be replayed"""
+        with self._lock:
+            for segment in segments:
+                if segment in self._in_queue:
+                    self._in_queue[segment] -= 1
+                self._replay.add(segment)
+
+    def replayable_segments(self):
+        """Segments due for replay with none of their records still queued, sealing the active one if needed"""
+        with self._lock:
+            if self._segment in self._replay and self._in_queue.get(self._segment, 0) == 0:
+                self._open_segment(self._segment + 1)
+            return sorted(segment for segment in self._replay
+                          if segment != self._segment and self._in_queue.get(segment, 0) == 0)
+
+    def read_segment(self, segment: int):
+        """Yield a segment's records, stopping at the first torn or corrupt one"""
+        with open(self._path(segment), "rb") as f:
+            while True:
+                header = f.read(_RECORD_HEADER.size)
+                if len(header) < _RECORD_HEADER.size:
+                    return
+                length, crc = _RECORD_HEADER.unpack(header)
+                payload = f.read(length)
+                if len(payload) < length or zlib.crc32(payload) != crc:
+                    logger.warning(f"[WAL] Memory log segment {segment} ends with a damaged record, ignoring the rest")
+                    return
+                yield json.loads(payload)
+
+    def finish_replay(self, segment: int, replayed: int):
+        """Drop a segment whose records are all in ChromaDB"""
+        with self._lock:
+            self._replay.discard(segment)
+            self.records_replayed += replayed
+            self._delete_if_done(segment)
+
+    def stats(self):
+        """Log size and replay backlog for status reporting"""
+        with self._lock:
+            return {
+                "segments": len(self._segments()),
+                "pending_replay": len(self._replay),
+                "records_replayed": self.records_replayed,
+            }
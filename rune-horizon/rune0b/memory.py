@@ -1,9 +1,10 @@
 import chromadb
 from chromadb import PersistentClient
 from chromadb.config import Settings
-import time
 import os
 
+from memory_ids import make_memory_id
+
 # Initialize the ChromaDB client properly
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 CHROMA_PATH = os.path.join(BASE_DIR, "../chromadb/chromadb_data")
@@ -20,12 +21,11 @@ def create_memory_collection():
 # Store a memory in ChromaDB
 def store_memory(thought: str, metadata: dict):
     try:
-        current_timestamp = metadata.get("timestamp", time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()))
         collection = memory_client.get_or_create_collection("memory")
         collection.add(
             documents=[thought],
             metadatas=[metadata],
-            ids=[f"memory-{current_timestamp}"]
+            ids=[make_memory_id(os.getenv("RUNE_ID", "unknown_rune"))]
         )
         print(f"[Memory] Memory stored successfully: {thought}")
     except Exception as e:
@@ -9,6 +9,7 @@ import time
 
 from reflection import reflection_loop
 from memory import store_memory, search_memory
+from companion_registry import register_with_companion_loop, deregister_from_companion
 import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("rune")
@@ -56,9 +57,15 @@ def create_app():
             json.dump(beacon_data, f, indent=2)
         return {"status": "beacon_cleared"}
 
+    @app.on_event("shutdown")
+    def leave_companion_registry():
+        deregister_from_companion(os.getenv("RUNE_ID", "unknown"))
+
     # 🔥 Move startup tasks directly here
     logger.info("[Startup] Launching background processes manually...")
     threading.Thread(target=check_for_response_loop, daemon=True).start()
     threading.Thread(target=start_reflection_loop, daemon=True).start()
+    # Not in companion-api's static RUNES map, so it has to register itself
+    threading.Thread(target=register_with_companion_loop, args=(os.getenv("RUNE_ID", "unknown"),), daemon=True).start()
 
     return app
@@ -1,6 +1,8 @@
 import chromadb
 from chromadb.config import Settings
-import uuid
+import os
+
+from memory_ids import make_memory_id
 
 # Initialize the Chroma Client properly
 memory_client = chromadb.HttpClient(host="chromadb", port=8000)
@@ -20,7 +22,8 @@ def store_memory(content: str, metadata: dict = None):
     if metadata is None:
         metadata = {}
 
-    memory_id = f"memory-{metadata.get('timestamp', str(uuid.uuid4()))}"
+    # Time-ordered and unique even when two memories land in the same millisecond
+    memory_id = make_memory_id(os.getenv("RUNE_ID", "unknown_rune"))
 
     try:
         collection = memory_client.get_collection(name="rune_memories")
@@ -0,0 +1,52 @@
+import secrets
+import threading
+import time
+
+# Memory IDs are ULID-style: 48-bit millisecond timestamp + 80 random bits in
+# Crockford base32, so they are unique across processes and sort by write time.
+# This module has no dependencies so every rune image can ship the same copy.
+_ID_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_last_id_ms = 0
+_last_id_random = 0
+_id_lock = threading.Lock()
+
+
+def _encode_base32(value: int, length: int):
+    """Encode an integer as fixed-width Crockford base32"""
+    chars = []
+    for _ in range(length):
+        chars.append(_ID_ALPHABET[value & 31])
+        value >>= 5
+    return "".join(reversed(chars))
+
+
+def make_memory_id(prefix: str):
+    """Generate a unique, time-ordered memory ID, e.g. prefixed with the rune ID"""
+    global _last_id_ms, _last_id_random
+    with _id_lock:
+        now_ms = int(time.time() * 1000)
+        if now_ms <= _last_id_ms:
+            # Same millisecond (or the clock stepped back): stay monotonic by
+            # incrementing the random part of the previous ID
+            now_ms = _last_id_ms
+            _last_id_random += 1
+            if _last_id_random >= 1 << 80:
+                now_ms += 1
+                _last_id_random = secrets.randbits(79)
+        else:
+            _last_id_random = secrets.randbits(80)
+        _last_id_ms = now_ms
+        random_part = _last_id_random
+
+    return f"{prefix}-{_encode_base32(now_ms, 10)}{_encode_base32(random_part, 16)}"
+
+
+def memory_id_time(memory_id: str):
+    """Get the epoch seconds encoded in a memory ID (None for old-style IDs)"""
+    encoded = memory_id.rsplit("-", 1)[-1]
+    if len(encoded) != 26:
+        return None
+    try:
+        return sum(_ID_ALPHABET.index(c) << (5 * (9 - i)) for i, c in enumerate(encoded[:10])) / 1000
+    except ValueError:
+        return None